@@ -15,7 +15,9 @@ from pycqed.init.config import setup_dict
 from scipy.interpolate import griddata
 from mpl_toolkits.axes_grid1 import make_axes_locatable
 import h5py
+import sqlite3
 from scipy.signal import argrelextrema
+from pycqed.utilities import data_catalog
 # to allow backwards compatibility with old a_tools code
 from .tools.file_handling import *
 from .tools.data_manipulation import *
@@ -34,6 +36,11 @@ except:
         datadir = None
     print('Data directory set to:', datadir)
 
+# Measurement folders are looked up in an indexed catalog of the data
+# directory (see pycqed.utilities.data_catalog). Set to False to scan the
+# directories instead.
+use_data_catalog = True
+
 ######################################################################
 #     Filehandling tools
 ######################################################################
@@ -98,7 +105,24 @@ def is_equal(ts0, ts1, or_equal=False):
     return (dstamp0+tstamp0) == (dstamp1+tstamp1)
 
 
+def _full_timestamp(timestamp):
+    '''
+    Converts a timestamp to the "YYYYmmddHHMMSS" format used in the
+    data catalog.
+    '''
+    if timestamp is None:
+        return None
+    return ''.join(verify_timestamp(timestamp))
+
+
 def return_last_n_timestamps(n, contains=''):
+    if use_data_catalog:
+        try:
+            catalog = data_catalog.get_catalog(datadir)
+            catalog.refresh()
+            return catalog.timestamps(contains=contains, n=n, order='DESC')
+        except sqlite3.Error as e:
+            logging.warning('Data catalog not available: {}'.format(e))
     timestamps = []
     for i in range(n):
         if i == 0:
@@ -141,6 +165,16 @@ def latest_data(contains='', older_than=None, newer_than=None, or_equal=False,
         logging.warning('No data found in datadir')
         return None
 
+    if use_data_catalog:
+        try:
+            return _latest_data_from_catalog(
+                search_dir, contains=contains, older_than=older_than,
+                newer_than=newer_than, or_equal=or_equal,
+                return_timestamp=return_timestamp, raise_exc=raise_exc,
+                return_all=return_all)
+        except sqlite3.Error as e:
+            logging.warning('Data catalog not available: {}'.format(e))
+
     daydirs.sort()
 
     measdirs = []
@@ -190,6 +224,37 @@ def latest_data(contains='', older_than=None, newer_than=None, or_equal=False,
                 search_dir, daydir, measdir)
 
 
+def _latest_data_from_catalog(search_dir, contains='', older_than=None,
+                              newer_than=None, or_equal=False,
+                              return_timestamp=False, raise_exc=False,
+                              return_all=False):
+    '''
+    Implementation of latest_data using the data catalog.
+    '''
+    catalog = data_catalog.get_catalog(search_dir)
+    catalog.refresh()
+    older_than = _full_timestamp(older_than)
+    newer_than = _full_timestamp(newer_than)
+    latest = catalog.latest(contains=contains, older_than=older_than,
+                            newer_than=newer_than, or_equal=or_equal)
+    if latest is None:
+        if raise_exc is True:
+            raise Exception('No fitting data found.')
+        else:
+            return False
+    daydir, measdir = latest
+    if return_all:
+        measdirs = catalog.day_measurements(
+            daydir, contains=contains, older_than=older_than,
+            newer_than=newer_than, or_equal=or_equal)
+        return search_dir, daydir, measdirs
+    if return_timestamp is False:
+        return os.path.join(search_dir, daydir, measdir)
+    else:
+        return str(daydir)+str(measdir[:6]), os.path.join(
+            search_dir, daydir, measdir)
+
+
 def data_from_time(timestamp, folder=None):
     '''
     returns the full path of the data specified by its timestamp in the
@@ -197,6 +262,13 @@ def data_from_time(timestamp, folder=None):
     '''
     if (folder is None):
         folder = datadir
+
+    if use_data_catalog:
+        try:
+            return _data_from_time_from_catalog(timestamp, folder)
+        except sqlite3.Error as e:
+            logging.warning('Data catalog not available: {}'.format(e))
+
     daydirs = os.listdir(folder)
 
     if len(daydirs) == 0:
@@ -219,6 +291,30 @@ def data_from_time(timestamp, folder=None):
         raise NameError('Timestamp is not unique: %s ' % (measdirs))
 
 
+def _data_from_time_from_catalog(timestamp, folder):
+    '''
+    Implementation of data_from_time using the data catalog.
+    '''
+    daystamp, tstamp = verify_timestamp(timestamp)
+    catalog = data_catalog.get_catalog(folder)
+    measdirs = catalog.find(daystamp, tstamp)
+    if (len(measdirs) != 1 or not
+            os.path.isdir(os.path.join(folder, daystamp, measdirs[0]))):
+        # the catalog may be outdated for this day
+        catalog.index_day(daystamp)
+        measdirs = catalog.find(daystamp, tstamp)
+
+    if len(measdirs) == 0:
+        if not os.path.isdir(os.path.join(folder, daystamp)):
+            raise KeyError("Requested day '%s' not found" % daystamp)
+        raise KeyError("Requested data '%s_%s' not found"
+                       % (daystamp, tstamp))
+    elif len(measdirs) == 1:
+        return os.path.join(folder, daystamp, measdirs[0])
+    else:
+        raise NameError('Timestamp is not unique: %s ' % (measdirs))
+
+
 def measurement_filename(directory=os.getcwd(), file_id=None, ext='hdf5'):
     dirname = os.path.split(directory)[1]
     if file_id is None:
@@ -579,6 +675,234 @@ def get_data_from_timestamp_list(timestamps,
     return out_data
 
 
+def _decode_h5_value(val):
+    '''
+    Converts byte strings (and arrays of byte strings) read from an hdf5
+    file to python strings.
+    '''
+    if type(val) == bytes:
+        return val.decode('utf-8')
+    if type(val) == np.ndarray and val.dtype.kind in ('S', 'O'):
+        return [v.decode('utf-8') if type(v) == bytes else v for v in val]
+    return val
+
+
+def _h5_item_value(item):
+    if isinstance(item, h5py.Dataset):
+        return item[()]
+    return item
+
+
+# indices in measured_values of the named values supported by
+# get_data_from_ma_v2
+_special_outputs = {'amp': 0, 'phase': 1, 'I': 0, 'Q': 1,
+                    'I_raw': 0, 'Q_raw': 1, 'I_cal': 2, 'Q_cal': 3}
+
+
+def _extract_params_from_file(data_file, folder, param_names):
+    '''
+    Extracts the parameters param_names from an open (Version 2) data file.
+    Only the attributes and dataset columns that are needed are read.
+    The parameter names are interpreted in the same way as in
+    get_data_from_ma_v2.
+    '''
+    g = data_file['Experimental Data']
+    if _decode_h5_value(g.attrs.get('datasaving_format', b'')) != \
+            'Version 2':
+        raise ValueError('Only the "Version 2" datasaving format is '
+                         'supported by the bulk loader')
+    parameter_names = _decode_h5_value(g.attrs['sweep_parameter_names'])
+    value_names = _decode_h5_value(g.attrs['value_names'])
+    n_pars = len(parameter_names)
+    dset = g['Data']
+
+    def measured_values():
+        return dset[:, n_pars:n_pars+len(value_names)].T
+
+    def sweep_points():
+        if n_pars == 1:
+            return dset[:, 0]
+        return dset[:, :n_pars].T
+
+    measurementstring = os.path.split(folder)[1]
+    named_outputs = {
+        'sweep_points': sweep_points,
+        'measured_values': measured_values,
+        'all_data': measured_values,
+        'parameter_names': lambda: parameter_names,
+        'parameter_units': lambda: _decode_h5_value(
+            g.attrs['sweep_parameter_units']),
+        'value_names': lambda: value_names,
+        'value_units': lambda: _decode_h5_value(g.attrs['value_units']),
+        'folder': lambda: folder,
+        'measurementstring': lambda: measurementstring[7:],
+        'timestamp_string': lambda: (os.path.split(
+            os.path.split(folder)[0])[1] + '_' + measurementstring[:6])}
+
+    data = od()
+    for param in param_names:
+        value = None
+        if param in named_outputs:
+            value = named_outputs[param]()
+        elif param in _special_outputs:
+            value = dset[:, n_pars+_special_outputs[param]]
+        elif param == 'fit_params':
+            fit_grp = data_file['Analysis']
+            fit_keys = [key for key in fit_grp.keys()
+                        if 'Fitted Params' in key]
+            fit_grp = fit_grp[fit_keys[-1]]
+            keys = [key for key in fit_grp.keys() if key != 'covar']
+            value = {key: fit_grp[key].attrs['value'] for key in keys}
+            value.update({key+'_err': fit_grp[key].attrs['stderr']
+                          for key in keys})
+            free_vars = sum(1 for key in keys if fit_grp[key].attrs['vary'])
+            dofs = dset.shape[0] - free_vars - 1
+            value.update({'chi_squared': fit_grp.attrs['chisqr'],
+                          'chi_squared_reduced': fit_grp.attrs['chisqr']/dofs,
+                          'chi_squared_dofs': dofs})
+        elif '.' not in param:
+            if param in g:
+                value = np.double(g[param][()])
+            elif param in data_file.get('Analysis', {}):
+                value = np.double(_h5_item_value(data_file['Analysis'][param]))
+        else:
+            path = param.split('.')
+            if path[0] in data_file.get('Instrument settings', {}):
+                value = _decode_h5_value(
+                    data_file['Instrument settings'][path[0]].attrs[path[1]])
+            else:
+                if path[0] in data_file.get('Analysis', {}):
+                    temp = data_file['Analysis']
+                else:
+                    temp = data_file
+                for key in path[:-1]:
+                    temp = temp[key]
+                if path[-1] in temp.attrs:
+                    value = _decode_h5_value(temp.attrs[path[-1]])
+                elif path[-1] in temp:
+                    value = _h5_item_value(temp[path[-1]])
+        if value is None:
+            warnings.warn('The data file attribute %s does not exist or '
+                          'hasn''t been coded for extraction.' % (param))
+        data[param] = value
+    return data
+
+
+def _load_params_from_folder(args):
+    '''
+    Worker function of load_data_from_timestamp_list. Returns the extracted
+    data and None, or None and an error message if the file could not
+    be read.
+    '''
+    folder, param_names = args
+    try:
+        filepath = measurement_filename(folder)
+        with h5py.File(filepath, 'r') as data_file:
+            return _extract_params_from_file(data_file, folder,
+                                             param_names), None
+    except Exception as e:
+        return None, '{}: {}'.format(type(e).__name__, e)
+
+
+def load_data_from_timestamp_list(timestamps, param_names,
+                                  numeric_params=None, max_workers=None,
+                                  return_dataframe=False, verbose=True):
+    '''
+    Loads parameters from many datasets at once.
+
+    Faster alternative to get_data_from_timestamp_list for "Version 2"
+    datafiles. Only the requested attributes and dataset columns are read
+    (directly with h5py, without creating a MeasurementAnalysis) and the
+    files are read in parallel using a pool of processes. Files that do not
+    exist or cannot be read are skipped.
+
+    Args:
+        timestamps (list): timestamps of the datasets
+        param_names (list or dict): names of the parameters to extract,
+            interpreted as in get_data_from_ma_v2. If a dict is given the
+            values are the parameter names and the keys the names used in
+            the output.
+        numeric_params (list): (output) names of parameters that are
+            converted to floats
+        max_workers (int): number of processes used, if 1 the files are read
+            in the current process. None uses the number of cpus.
+            Starting the processes takes long on Windows (every process
+            imports pycqed again), so the pool only pays off for hundreds
+            of files. On Windows it also requires the calling script to be
+            protected by an 'if __name__ == "__main__":' guard.
+        return_dataframe (bool): if True returns a pandas DataFrame indexed
+            by timestamp instead of a dictionary
+    Returns:
+        OrderedDict with a column (array or list) per parameter and the
+        successfully loaded timestamps under "timestamps", or a DataFrame.
+    '''
+    if type(timestamps) is str:
+        timestamps = [timestamps]
+    if type(param_names) is dict:
+        out_names = list(param_names.keys())
+        file_param_names = list(param_names.values())
+    else:
+        out_names = list(param_names)
+        file_param_names = list(param_names)
+
+    folders = []
+    loaded_timestamps = []
+    removed_timestamps = []
+    for timestamp in timestamps:
+        try:
+            folders.append(get_folder(timestamp))
+            loaded_timestamps.append(timestamp)
+        except Exception:
+            removed_timestamps.append(timestamp)
+
+    jobs = [(folder, file_param_names) for folder in folders]
+    if max_workers == 1 or len(jobs) <= 1:
+        results = [_load_params_from_folder(job) for job in jobs]
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            results = list(executor.map(
+                _load_params_from_folder, jobs,
+                chunksize=max(1, len(jobs)//(8*(max_workers or 4)))))
+
+    data = od([(name, []) for name in out_names])
+    good_timestamps = []
+    for timestamp, (result, error) in zip(loaded_timestamps, results):
+        if result is None:
+            logging.warning('Could not load timestamp {}: {}'.format(
+                timestamp, error))
+            removed_timestamps.append(timestamp)
+            continue
+        good_timestamps.append(timestamp)
+        for name, param in zip(out_names, file_param_names):
+            data[name].append(result[param])
+
+    if len(removed_timestamps) > 0 and verbose:
+        print('timestamps removed by filtering:', removed_timestamps)
+
+    for name in out_names:
+        try:
+            if numeric_params is not None and name in numeric_params:
+                data[name] = np.array(data[name], dtype=float)
+            elif all(np.isscalar(val) for val in data[name]):
+                data[name] = np.array(data[name])
+        except ValueError:
+            # e.g. arrays of different lengths, kept as a list
+            pass
+
+    if return_dataframe:
+        df = pd.DataFrame(index=good_timestamps)
+        for name in out_names:
+            if type(data[name]) == np.ndarray and data[name].ndim == 1:
+                df[name] = data[name]
+            else:
+                df[name] = pd.Series(list(data[name]), index=good_timestamps,
+                                     dtype=object)
+        return df
+    data['timestamps'] = good_timestamps
+    return data
+
+
 def convert_instr_str_list_to_numeric_array(string_list):
     return np.double(string_list[:])
 
@@ -717,6 +1041,24 @@ def get_timestamps_in_range(timestamp_start, timestamp_end=None,
         datetime_end = datetime.datetime.today()
     else:
         datetime_end = datetime_from_timestamp(timestamp_end)
+
+    if use_data_catalog:
+        if label is None:
+            label = ''
+        try:
+            catalog = data_catalog.get_catalog(datadir)
+            catalog.refresh()
+            timestamps = catalog.timestamps(
+                contains=label,
+                newer_than=_full_timestamp(
+                    timestamp_from_datetime(datetime_start)),
+                older_than=_full_timestamp(
+                    timestamp_from_datetime(datetime_end)),
+                or_equal=True, order='ASC')
+            return ['{}_{}'.format(ts[:8], ts[8:]) for ts in timestamps]
+        except sqlite3.Error as e:
+            logging.warning('Data catalog not available: {}'.format(e))
+
     days_delta = (datetime_end.date() - datetime_start.date()).days
     all_timestamps = []
     for day in reversed(list(range(days_delta+1))):
@@ -750,40 +1092,44 @@ def get_timestamps_in_range(timestamp_start, timestamp_end=None,
 
 
 def get_mean_df(label, starting_timestamp, ending_timestamp,
-                return_raw_dataframes=False):
+                return_raw_dataframes=False, max_workers=1):
     '''
     Returns a dataframe containing the mean and standard error of mean (sem)
     of all datasets that match a certain label.
     Function assumes that the the datasets have identical sweep points.
+    By default the datasets are loaded in the current process, for many
+    datasets they can be loaded in parallel by setting max_workers, see
+    load_data_from_timestamp_list.
 
     if return raw_dataframes
     '''
-    # Import within function statement to prevent circular import
-    from pycqed.analysis import measurement_analysis as MA
     timestamps = get_timestamps_in_range(timestamp_start=starting_timestamp,
                                          timestamp_end=ending_timestamp,
                                          label=label)
-    for i, timestamp in enumerate(timestamps):
-        ana = MA.MeasurementAnalysis(timestamp=timestamp, auto=False,
-                                     close_file=True, close_fig=True)
-        ana.get_naming_and_values()
-        if i == 0:  # Initialize appropriate number of dataframes
-            n_variables = len(ana.value_names)
-            dataframes = [pd.DataFrame() for i in range(n_variables)]
-        for j in range(len(ana.value_names)):
-            dataframes[j][timestamp] = ana.measured_values[j]
-        ana.finish()
+    data = load_data_from_timestamp_list(
+        timestamps, ['parameter_names', 'value_names', 'sweep_points',
+                     'measured_values'], max_workers=max_workers,
+        verbose=False)
+    timestamps = data['timestamps']
+    value_names = data['value_names'][-1]
+    parameter_names = data['parameter_names'][-1]
+    sweep_points = data['sweep_points'][-1]
+    dataframes = [pd.DataFrame() for i in range(len(value_names))]
+    for timestamp, measured_values in zip(timestamps,
+                                          data['measured_values']):
+        for j in range(len(value_names)):
+            dataframes[j][timestamp] = measured_values[j]
 
     # Create the combined dataframe
     mean_df = pd.DataFrame()
     # Add sweep points to dataframe
-    for i, par_name in enumerate(ana.parameter_names):
-        if len(ana.parameter_names) != 1:
-            mean_df[par_name] = ana.sweep_points[i]
+    for i, par_name in enumerate(parameter_names):
+        if len(parameter_names) != 1:
+            mean_df[par_name] = sweep_points[i]
         else:
-            mean_df[par_name] = ana.sweep_points
+            mean_df[par_name] = sweep_points
     # Add the mean and sem to the dataframe
-    for i, val_name in enumerate(ana.value_names):
+    for i, val_name in enumerate(value_names):
         mean_df[val_name+'_mean'] = dataframes[i].mean(axis=1)
         mean_df[val_name+'_sem'] = dataframes[i].sem(axis=1)
 
@@ -32,9 +32,20 @@ imp.reload(dm_tools)
 class MeasurementAnalysis(object):
 
     def __init__(self, TwoD=False, folder=None, auto=True,
-                 cmap_chosen='viridis',**kw):
+                 cmap_chosen='viridis', result=None, **kw):
+        '''
+        The data is loaded from the folder, if no folder is given the
+        latest (labeled) measurement is used. Alternatively the
+        MeasurementResult returned by MC.run can be passed as result, the
+        data is then taken from memory and the datafile is only opened
+        when needed (e.g. to save fit results).
+        '''
+        self.result = result
         if folder is None:
-            self.folder = a_tools.get_folder(**kw)
+            if result is not None:
+                self.folder = result.folder
+            else:
+                self.folder = a_tools.get_folder(**kw)
         else:
             self.folder = folder
 
@@ -48,14 +59,25 @@ class MeasurementAnalysis(object):
     def load_hdf5data(self, folder=None, file_only=False, **kw):
         if folder is None:
             folder = self.folder
-        self.h5filepath = a_tools.measurement_filename(folder)
         h5mode = kw.pop('h5mode', 'r+')
-        self.data_file = h5py.File(self.h5filepath, h5mode)
+        result = getattr(self, 'result', None)
+        if result is not None and folder == result.folder:
+            # the datafile is opened when data_file is first used
+            self.h5filepath = result.filepath
+            self._h5mode = h5mode
+            self._data_file = None
+        else:
+            self.h5filepath = a_tools.measurement_filename(folder)
+            self.data_file = h5py.File(self.h5filepath, h5mode)
         if not file_only:
-            for k in list(self.data_file.keys()):
-                if type(self.data_file[k]) == h5py.Group:
-                    self.name = k
-            self.g = self.data_file['Experimental Data']
+            if self._data_file is None:
+                self.name = result.name
+                self.g = result.experimental_data()
+            else:
+                for k in list(self.data_file.keys()):
+                    if type(self.data_file[k]) == h5py.Group:
+                        self.name = k
+                self.g = self.data_file['Experimental Data']
             self.measurementstring = os.path.split(folder)[1]
             self.timestamp = os.path.split(os.path.split(folder)[0])[1] \
                 + '/' + self.measurementstring[:6]
@@ -63,10 +85,20 @@ class MeasurementAnalysis(object):
                 + '_' + self.measurementstring[:6]
             self.measurementstring = self.measurementstring[7:]
             self.default_plot_title = self.measurementstring
-        return self.data_file
+        return self._data_file
+
+    @property
+    def data_file(self):
+        if self._data_file is None:
+            self._data_file = h5py.File(self.h5filepath, self._h5mode)
+        return self._data_file
+
+    @data_file.setter
+    def data_file(self, data_file):
+        self._data_file = data_file
 
     def finish(self, close_file=True, **kw):
-        if close_file:
+        if close_file and self._data_file is not None:
             self.data_file.close()
 
     def analysis_h5data(self, name='analysis'):
@@ -5527,8 +5559,16 @@ class DoubleFrequency(object):
 
 
 class SWAPN_cost(object):
-    def __init__(self, auto=True, label='SWAPN', cost_func='sum', timestamp=None, stepsize=10):
-            if timestamp is None:
+    def __init__(self, auto=True, label='SWAPN', cost_func='sum', timestamp=None, stepsize=10,
+                 result=None):
+            # result is the MeasurementResult of the SWAPN measurement, if
+            # given the data is taken from memory
+            self.result = result
+            if result is not None:
+                self.folder = result.folder
+                self.scan_start = result.timestamp
+                self.scan_stop = self.scan_start
+            elif timestamp is None:
                 self.folder = a_tools.latest_data(label)
                 splitted = self.folder.split('\\')
                 self.scan_start = splitted[-2]+'_'+splitted[-1][:6]
@@ -5549,13 +5589,18 @@ class SWAPN_cost(object):
 
     def analysis(self):
             print(self.scan_start,self.scan_stop,self.opt_dict,self.pdict,self.nparams)
-            sawpn_scan = ca.quick_analysis(t_start=self.scan_start,
-                                            t_stop=self.scan_stop,
-                                            options_dict=self.opt_dict,
-                                            params_dict_TD=self.pdict,
-                                            numeric_params=self.nparams)
-            x = sawpn_scan.TD_dict['sweep_points'][0]
-            y = sawpn_scan.TD_dict['I'][0]
+            if self.result is not None:
+                # sweep points and the first measured value ('amp')
+                x = np.asarray(self.result[:, 0], dtype=np.float64)
+                y = np.asarray(self.result[:, 1], dtype=np.float64)
+            else:
+                sawpn_scan = ca.quick_analysis(t_start=self.scan_start,
+                                                t_stop=self.scan_stop,
+                                                options_dict=self.opt_dict,
+                                                params_dict_TD=self.pdict,
+                                                numeric_params=self.nparams)
+                x = sawpn_scan.TD_dict['sweep_points'][0]
+                y = sawpn_scan.TD_dict['I'][0]
 
             if self.cost_func == 'sum':
                 self.cost_val = np.sum(np.power(y[:-4], np.divide(1, x[:-4])))/float(len(y[:-4]))
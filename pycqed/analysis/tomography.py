@@ -67,10 +67,20 @@ class TomoAnalysis_JointRO():
 
         self.basis_vector = self._calculate_matrix_set(
             self.measurement_basis, n_qubits)
+        self.basis_vector_numpy = np.array(
+            [basis.full() for basis in self.basis_vector])
         self.readout_vector = self._calculate_matrix_set(
             self.readout_basis, n_qubits)
-        self.rotation_vector = self._calculate_matrix_set(
-            self.rotation_matrixes, n_qubits)
+        # the len(rotation_matrixes) ** n_qubits rotations are only built
+        # when used, see rotation_vector
+        self._rotation_vector = None
+
+    @property
+    def rotation_vector(self):
+        if self._rotation_vector is None:
+            self._rotation_vector = self._calculate_matrix_set(
+                self.rotation_matrixes, self.n_qubits)
+        return self._rotation_vector
 
     def execute_linear_tomo(self):
         """
@@ -87,17 +97,18 @@ class TomoAnalysis_JointRO():
         # re-add beta0
         basis_decomposition[0] = 1
         # now recreate the rho
-        rho = sum([basis_decomposition[i] * self.basis_vector[i] /
-                   (2 ** self.n_qubits)
-                   for i in range(len(basis_decomposition))])
+        rho = qtp.Qobj(np.einsum('k,kij->ij', basis_decomposition,
+                                 self.basis_vector_numpy) /
+                       (2 ** self.n_qubits),
+                       dims=self.basis_vector[0].dims)
         return (basis_decomposition, rho)
 
     def execute_max_likelihood(self, use_weights=True, show_time=False,
                                ftol=0.01, xtol=0.001, full_output=0,
-                               max_iter=1000):
+                               max_iter=1000, solver='powell', gtol=1e-8):
         """
-        Performs a max likelihood optimization using fmin_powell in order to
-        get the closest physically realisable state.
+        Performs a max likelihood optimization in order to get the closest
+        physically realisable state.
 
         This is done by constructing a lower triangular matrix T consisting of
         4 ** n qubits params
@@ -105,53 +116,51 @@ class TomoAnalysis_JointRO():
         Keyword arguments:
         use_weights : default(true) Weighs the quadrature data by the std in
                       betas obtained
+        solver : default('powell') the optimizer used
+            'powell' : scipy fmin_powell, derivative free
+            'lbfgs' : scipy L-BFGS-B using the analytic gradient of the
+                      likelihood, much faster for 3 or more qubits
         --- arguments for scipy fmin_powel method below, see
             the powel documentation
+            (ftol and xtol are only used by the 'powell' solver)
+        gtol : default(1e-8) tolerance on the projected gradient, only used
+            by the 'lbfgs' solver
         """
+        if solver not in ('powell', 'lbfgs'):
+            raise ValueError('solver "{}" not recognized, use "powell" or '
+                             '"lbfgs"'.format(solver))
         # first we calculate the measurement matrices
         tstart = time.time()
-        measurement_vector = []
-        n_rot = len(self.rotation_matrixes) ** self.n_qubits
-        # initiate with equal weights
-        self.weights = np.ones(self.n_quadratures * n_rot)
-        for quadrature in range(self.n_quadratures):
-            betas = self._calibrate_betas(
-                self.measurements_cal[quadrature * self.n_states:
-                                      (1 + quadrature) * self.n_states])
-            # determine the weights based on betas absolote difference and
-            # accuracy
-            if (use_weights):
-                self.weights[
-                    quadrature * n_rot:(1+quadrature) * n_rot] = (
-                    max(betas) - min(betas)) / np.var(betas)
-            for rotation_index, rotation in enumerate(self.rotation_vector):
-                measurement_vector.append(
-                    betas[0] * rotation.dag()
-                    * self.readout_vector[0] * rotation)
-                for i in range(1, len(betas)):
-                    measurement_vector[n_rot * quadrature + rotation_index] += betas[
-                        i] * rotation.dag() * self.readout_vector[i] * rotation
-        # save it in the object for use in optimization
-        self.measurement_vector = measurement_vector
-        self.measurement_vector_numpy = [
-            vec.full() for vec in measurement_vector]
+        self._calculate_measurement_operators(use_weights)
         tlinear = time.time()
         # find out the starting rho by the linear tomo
         discard, rho0 = self.execute_linear_tomo()
         # now fetch the starting t_params from the cholesky decomp of rho
         tcholesky = time.time()
-        T0 = np.linalg.cholesky(scipy.linalg.sqrtm((rho0.dag() * rho0).full()))
-        t0 = np.zeros(4 ** self.n_qubits, dtype='complex')
+        # (some scipy versions return sqrtm in extended precision)
+        T0 = np.linalg.cholesky(np.asarray(
+            scipy.linalg.sqrtm((rho0.dag() * rho0).full()), dtype=complex))
+        t0 = np.zeros(4 ** self.n_qubits)
         di = np.diag_indices(2 ** self.n_qubits)
         tri = np.tril_indices(2 ** self.n_qubits, -1)
-        t0[0:2 ** self.n_qubits] = T0[di]
+        t0[0:2 ** self.n_qubits] = T0[di].real
         t0[2**self.n_qubits::2] = T0[tri].real
         t0[2**self.n_qubits+1::2] = T0[tri].imag
         topt = time.time()
         # minimize the likelihood function using scipy
-        t_optimal = scipy.optimize.fmin_powell(
-            self._max_likelihood_optimization_function, t0, maxiter=max_iter,
-            full_output=full_output, ftol=ftol, xtol=xtol)
+        if solver == 'powell':
+            t_optimal = scipy.optimize.fmin_powell(
+                self._max_likelihood_optimization_function, t0,
+                maxiter=max_iter, full_output=full_output, ftol=ftol,
+                xtol=xtol)
+            if full_output:
+                t_optimal = t_optimal[0]
+        else:
+            res = scipy.optimize.minimize(
+                self._max_likelihood_optimization_function_and_gradient, t0,
+                jac=True, method='L-BFGS-B',
+                options={'maxiter': max_iter, 'gtol': gtol})
+            t_optimal = res.x
         if show_time is True:
             print(" Time to calc rotation matrixes %.2f " % (tlinear-tstart))
             print(" Time to do linear tomo %.2f " % (tcholesky-tlinear))
@@ -173,6 +182,12 @@ class TomoAnalysis_JointRO():
             return self.measurement_basis_labels
 
     def build_rho_from_triangular_params(self, t_params):
+        T_mat = self._build_triangular_matrix(t_params)
+        rho = np.dot(np.conj(T_mat.T),  T_mat) / \
+            np.trace(np.dot(np.conj(T_mat.T),  T_mat))
+        return rho
+
+    def _build_triangular_matrix(self, t_params):
         # build the lower triangular matrix T
         T_mat = np.zeros(
             (2 ** self.n_qubits, 2 ** self.n_qubits), dtype="complex")
@@ -181,9 +196,7 @@ class TomoAnalysis_JointRO():
         tri = np.tril_indices(2 ** self.n_qubits, -1)
         T_mat[tri] = t_params[2**self.n_qubits::2]
         T_mat[tri] += 1j * t_params[2**self.n_qubits+1::2]
-        rho = np.dot(np.conj(T_mat.T),  T_mat) / \
-            np.trace(np.dot(np.conj(T_mat.T),  T_mat))
-        return rho
+        return T_mat
 
 
 ##############################################################
@@ -192,6 +205,38 @@ class TomoAnalysis_JointRO():
 #
 ##############################################################
 
+    def _calculate_measurement_operators(self, use_weights=True):
+        """
+        Calculates the measurement operators and the weights used in the
+        maximum likelihood optimization.
+
+        The operator of rotation R for a quadrature with calibrated betas is
+            sum_b betas[b] * R^dag P_b R
+        with P_b the readout operators. As every R^dag P_b R is a signed
+        basis operator this is the corresponding row of the coefficient
+        matrix applied to the basis operators.
+        Sets self.measurement_vector_numpy, an array of shape
+        (n_quadratures * n_rotations, 2**n_qubits, 2**n_qubits), and
+        self.weights.
+        """
+        n_rot = len(self.rotation_matrixes) ** self.n_qubits
+        # initiate with equal weights
+        self.weights = np.ones(self.n_quadratures * n_rot)
+        if (use_weights):
+            for quadrature in range(self.n_quadratures):
+                betas = self._calibrate_betas(
+                    self.measurements_cal[quadrature * self.n_states:
+                                          (1 + quadrature) * self.n_states])
+                # determine the weights based on betas absolote difference
+                # and accuracy
+                self.weights[
+                    quadrature * n_rot:(1+quadrature) * n_rot] = (
+                    max(betas) - min(betas)) / np.var(betas)
+        coefficient_matrix = self._calculate_coefficient_matrix()
+        self.measurement_vector_numpy = np.einsum(
+            'kb,bij->kij', coefficient_matrix, self.basis_vector_numpy)
+        return self.measurement_vector_numpy
+
     def _max_likelihood_optimization_function(self, t_params):
         """
         Optimization function that is evaluated many times in the maximum
@@ -205,15 +250,47 @@ class TomoAnalysis_JointRO():
         Requires:
         self.weights :  weights per measurement vector used in calculating the
         loss
+        self.measurement_vector_numpy : array of the measurement operators
         """
         rho = self.build_rho_from_triangular_params(t_params)
-        L = 0 + 0j
-        for i in range(len(self.measurement_vector)):
-            expectation = np.trace(
-                np.dot(self.measurement_vector_numpy[i], rho))
-            L += ((expectation -
-                   self.measurements_tomo[i]) ** 2) * self.weights[i]
-        return L
+        # tr(M_i rho) for all measurement operators at once
+        expectations = np.einsum('kij,ji->k', self.measurement_vector_numpy,
+                                 rho).real
+        residuals = expectations - self.measurements_tomo
+        return np.sum(self.weights * residuals ** 2)
+
+    def _max_likelihood_optimization_function_and_gradient(self, t_params):
+        """
+        Returns the value of _max_likelihood_optimization_function and its
+        gradient with respect to the t_params.
+
+        With A = T^dag T and rho = A / tr(A) the derivative of the loss L
+        with respect to T is given by
+            dL = 2 Re tr(H T^dag dT),  H = (sum_i g_i M_i - c I) / tr(A)
+        with g_i = dL/d<M_i> = 2 w_i (<M_i> - m_i) and c = sum_i g_i <M_i>.
+        """
+        d = 2 ** self.n_qubits
+        T_mat = self._build_triangular_matrix(t_params)
+        A = np.dot(np.conj(T_mat.T), T_mat)
+        norm = np.trace(A).real
+        rho = A / norm
+        expectations = np.einsum('kij,ji->k', self.measurement_vector_numpy,
+                                 rho).real
+        residuals = expectations - self.measurements_tomo
+        loss = np.sum(self.weights * residuals ** 2)
+
+        g = 2 * self.weights * residuals
+        H = np.einsum('k,kij->ij', g, self.measurement_vector_numpy)
+        H[np.diag_indices(d)] -= np.dot(g, expectations)
+        H /= norm
+        # D[i, j] is the derivative of tr(H T^dag dT) to T[i, j]
+        D = np.dot(H, np.conj(T_mat.T)).T
+        grad = np.zeros(len(t_params))
+        grad[0:d] = 2 * D[np.diag_indices(d)].real
+        tri = np.tril_indices(d, -1)
+        grad[d::2] = 2 * D[tri].real
+        grad[d+1::2] = -2 * D[tri].imag
+        return loss, grad
 
     def _calibrate_betas(self, measurements_cal):
         """
@@ -246,8 +323,14 @@ class TomoAnalysis_JointRO():
         """
         coefficient_matrix = np.zeros(
             (self.n_quadratures * len(self.rotation_matrixes) ** self.n_qubits,
-             4 ** self.n_qubits))
+             len(self.measurement_basis) ** self.n_qubits))
         n_rotations = len(self.rotation_matrixes) ** self.n_qubits
+        # places[r, b] and signs[r, b] give the basis operator the readout
+        # operator b is mapped to by rotation r
+        places, signs = get_coefficient_indices(
+            self.n_qubits, self.rotation_matrixes, self.readout_basis,
+            self.measurement_basis)
+        rows = np.arange(n_rotations)[:, None]
         # Now fill in 2 ** self.n_qubits betas into the coefficient matrix on
         # each row
         for quadrature in range(self.n_quadratures):
@@ -255,12 +338,8 @@ class TomoAnalysis_JointRO():
             self.betas = self._calibrate_betas(
                 self.measurements_cal[quadrature * self.n_states:
                                       (1 + quadrature) * self.n_states])
-            for rotation_index in range(n_rotations):
-                for beta_index in range(2 ** self.n_qubits):
-                    (place, sign) = self._get_basis_index_from_rotation(
-                        beta_index, rotation_index)
-                    coefficient_matrix[
-                        n_rotations * quadrature + rotation_index, place] = sign * self.betas[beta_index]
+            coefficient_matrix[n_rotations * quadrature + rows, places] = \
+                signs * self.betas
         return coefficient_matrix
 
     def _get_basis_index_from_rotation(self, beta_index, rotation_index):
@@ -268,7 +347,7 @@ class TomoAnalysis_JointRO():
         Returns the position and sign of one of the betas in the coefficient
         matrix by checking to which basis matrix the readout matrix is mapped
         after rotation
-        This is used in _calculate_coefficient_matrix
+        This is the explicit (slow) equivalent of get_coefficient_indices
         """
         m = self.rotation_vector[rotation_index].dag(
         ) * self.readout_vector[beta_index] * self.rotation_vector[rotation_index]
@@ -302,6 +381,81 @@ def _calculate_matrix_set(starting_set, n_qubits):
         return starting_set
 
 
+_coefficient_indices_cache = {}
+
+
+def _matrix_set_key(matrix_set):
+    # + 0. removes negative zeros
+    matrices = np.array([np.asarray(qtp.Qobj(m).full()) for m in matrix_set])
+    return (np.round(matrices, 10) + 0.).tobytes()
+
+
+def single_qubit_coefficient_indices(rotation_matrixes, readout_basis,
+                                     measurement_basis):
+    """
+    Returns the index in measurement_basis and the sign of R^dag P R for
+    every single qubit rotation R and readout operator P, as two int arrays
+    of shape (len(rotation_matrixes), len(readout_basis)).
+    Requires the rotations to be Cliffords, i.e. that R^dag P R is
+    (plus or minus) one of the basis operators.
+    """
+    rotations = np.array([qtp.Qobj(m).full() for m in rotation_matrixes])
+    readouts = np.array([qtp.Qobj(m).full() for m in readout_basis])
+    basis = np.array([qtp.Qobj(m).full() for m in measurement_basis])
+    rotated = np.einsum('rji,bjk,rkl->rbil',
+                        rotations.conj(), readouts, rotations)
+    # overlap with the basis operators tr(B^dag m)
+    overlaps = np.einsum('kij,rbij->rbk', basis.conj(), rotated)
+    indices = np.argmax(np.abs(overlaps), axis=2)
+    signs = np.zeros(indices.shape, dtype=int)
+    for (r, b), k in np.ndenumerate(indices):
+        for sign in [1, -1]:
+            if np.allclose(rotated[r, b], sign * basis[k]):
+                signs[r, b] = sign
+        if signs[r, b] == 0:
+            raise Exception(
+                'No basis vector found corresponding to the measurement '
+                'rotation. Check that you have used Clifford Gates!')
+    return indices, signs
+
+
+def get_coefficient_indices(n_qubits, rotation_matrixes, readout_basis,
+                            measurement_basis):
+    """
+    Returns the position and sign of the betas in the coefficient matrix of
+    the tomography, as two int arrays of shape
+    (len(rotation_matrixes) ** n_qubits, len(readout_basis) ** n_qubits).
+    places[r, b] is the index in the n-qubit basis vector of the operator
+    the readout operator b is mapped to by rotation r, signs[r, b] its sign.
+
+    A tensor product of single qubit Cliffords maps a tensor product of
+    Paulis to the tensor product of the single qubit images, so the indices
+    follow from the single qubit indices without building the n-qubit
+    operators. The result is cached per n_qubits and set of matrixes.
+    """
+    key = (n_qubits, _matrix_set_key(rotation_matrixes),
+           _matrix_set_key(readout_basis), _matrix_set_key(measurement_basis))
+    if key not in _coefficient_indices_cache:
+        indices_1q, signs_1q = single_qubit_coefficient_indices(
+            rotation_matrixes, readout_basis, measurement_basis)
+        n_rot, n_ro = indices_1q.shape
+        n_basis = len(measurement_basis)
+        rotation_index = np.arange(n_rot ** n_qubits)[:, None]
+        readout_index = np.arange(n_ro ** n_qubits)[None, :]
+        places = np.zeros((n_rot ** n_qubits, n_ro ** n_qubits), dtype=int)
+        signs = np.ones((n_rot ** n_qubits, n_ro ** n_qubits), dtype=int)
+        # the operator of qubit q (the q-th factor of the tensor product)
+        # is digit q of the index, counting from the least significant
+        # digit (see _calculate_matrix_set)
+        for q in range(n_qubits):
+            r_q = rotation_index // n_rot ** q % n_rot
+            b_q = readout_index // n_ro ** q % n_ro
+            places += indices_1q[r_q, b_q] * n_basis ** q
+            signs *= signs_1q[r_q, b_q]
+        _coefficient_indices_cache[key] = (places, signs)
+    return _coefficient_indices_cache[key]
+
+
 #########################
 # Tomo helper functions #
 #########################
@@ -207,25 +207,8 @@ class HeterodyneInstrument(Instrument):
             # print(np.size(d))
             dat = d[0][0]+1j*d[1][0]
         elif 'UHFQC' in self.acquisition_instr():
-            t0 = time.time()
-            self._acquisition_instr.awgs_0_enable(1)
-            try:
-                temp = self._acquisition_instr.awgs_0_enable()
-            except:
-                temp = self._acquisition_instr.awgs_0_enable()
-            del temp
-
-            while self._acquisition_instr.awgs_0_enable() == 1:
-                time.sleep(0.01)
-            channels = [0, 1]
-            data = ['']*len(channels)
-            for i, channel in enumerate(channels):
-                dataset = eval(
-                    "self._acquisition_instr.quex_rl_data_{}()".format(channel))
-                data[i] = dataset[0]['vector']
+            data = self._acquisition_instr.acquisition([0, 1])
             dat = data[0]+1j*data[1]
-            t1 = time.time()
-            #print("time for UHFQC polling", t1-t0)
         return dat
 
         # return s21
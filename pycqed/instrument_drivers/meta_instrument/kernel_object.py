@@ -11,6 +11,7 @@ from pycqed.measurement.kernel_functions import kernel_generic, htilde_bounce, \
     heaviside, kernel_generic2
 
 import pycqed.measurement.kernel_functions as kf
+from pycqed.measurement.waveform_control import kernel_distortion_module as kdm
 
 
 class Distortion(Instrument):
@@ -24,6 +25,15 @@ class Distortion(Instrument):
     def __init__(self, name, **kw):
         super().__init__(name, **kw)
 
+        # Cached kernels of the individual components, stored as
+        # {component: (parameter values, kernel)}
+        self._component_kernels = {}
+        # Cached external kernels, stored as {path: (mtime, kernel)}
+        self._external_kernels = {}
+        # Modification times of the external kernels used for the
+        # precalculated kernel
+        self._precalculated_kernel_mtimes = None
+
         self.add_parameter('channel',
                            initial_value=1,
                            vals=vals.Ints(),
@@ -38,7 +48,7 @@ class Distortion(Instrument):
         self.add_parameter('kernel_dir_path',
                            initial_value='kernels/',
                            vals=vals.Strings(),
-                           parameter_class=ManualParameter,
+                           parameter_class=ConfigParameter,
                            docstring='Path for loading external kernels,' +
                            'such as room temperature correction kernels.')
 
@@ -142,27 +152,61 @@ class Distortion(Instrument):
     def get_idn(self):
         return self.name
 
+    # Kernel function and the parameters (as kwarg: parameter name) of the
+    # components of the kernel object
+    _components = {
+        'bounce_1': (kf.bounce_kernel, {'amp': 'bounce_amp_1',
+                                        'time': 'bounce_tau_1',
+                                        'length': 'bounce_length_1'}),
+        'bounce_2': (kf.bounce_kernel, {'amp': 'bounce_amp_2',
+                                        'time': 'bounce_tau_2',
+                                        'length': 'bounce_length_2'}),
+        'skin': (kf.skin_kernel, {'alpha': 'skineffect_alpha',
+                                  'length': 'skineffect_length'}),
+        'decay_1': (kf.decay_kernel, {'amp': 'decay_amp_1',
+                                      'tau': 'decay_tau_1',
+                                      'length': 'decay_length_1'}),
+        'decay_2': (kf.decay_kernel, {'amp': 'decay_amp_2',
+                                      'tau': 'decay_tau_2',
+                                      'length': 'decay_length_2'})}
+
+    def _get_component_kernel(self, component):
+        """
+        Returns the kernel of a component, only recalculated if the
+        parameters of the component changed.
+        """
+        kernel_func, par_names = self._components[component]
+        kw = {arg: self.get(par_name) for arg, par_name in par_names.items()}
+        key = tuple(sorted(kw.items()))
+        cached = self._component_kernels.get(component)
+        if cached is None or cached[0] != key:
+            cached = (key, kernel_func(**kw))
+            self._component_kernels[component] = cached
+        return cached[1].copy()
+
+    def _config_parameter_changed(self, parameter_name):
+        """
+        Called by a ConfigParameter when its value changes, removes the
+        cached kernels that depend on it.
+        """
+        for component, (_, par_names) in self._components.items():
+            if parameter_name in par_names.values():
+                self._component_kernels.pop(component, None)
+
     def get_bounce_kernel_1(self):
-        return kf.bounce_kernel(amp=self.bounce_amp_1(),
-                                time=self.bounce_tau_1(),
-                                length=self.bounce_length_1())
+        return self._get_component_kernel('bounce_1')
 
     def get_bounce_kernel_2(self):
-        return kf.bounce_kernel(amp=self.bounce_amp_2(),
-                                time=self.bounce_tau_2(),
-                                length=self.bounce_length_2())
+        return self._get_component_kernel('bounce_2')
 
     def get_skin_kernel(self):
-        return kf.skin_kernel(alpha=self.skineffect_alpha(),
-                              length=self.skineffect_length())
+        return self._get_component_kernel('skin')
 
     def get_decay_kernel_1(self):
-        return kf.decay_kernel(amp=self.decay_amp_1(), tau=self.decay_tau_1(),
-                               length=self.decay_length_1())
+        return self._get_component_kernel('decay_1')
 
     def get_decay_kernel_2(self):
-        return kf.decay_kernel(amp=self.decay_amp_2(), tau=self.decay_tau_2(),
-                               length=self.decay_length_2())
+        return self._get_component_kernel('decay_2')
 
     # def get_poly_kernel(self):
     #     return poly_kernel(a=self.poly_a(),
@@ -178,7 +222,13 @@ class Distortion(Instrument):
         """
         kernels = kernel_list[0]
         for k in kernel_list[1:]:
-            kernels = np.convolve(k, kernels)[:max(len(k), len(kernels))]
+            if kdm.is_identity_kernel(k):
+                # convolving with a delta function only pads with zeros
+                kernels = np.concatenate(
+                    [kernels, np.zeros(max(0, len(k)-len(kernels)))])
+            else:
+                kernels = kdm.convolve(k, kernels)[
+                    :max(len(k), len(kernels))]
         return kernels
 
     def kernel_to_cache(self, cache):
@@ -196,17 +246,41 @@ class Distortion(Instrument):
                        self.get_decay_kernel_2()]
         cache.update({'OPT_chevron.tmp': self.convolve_kernel(kernel_list)})
 
-    def get_corrections_kernel(self):
-
-        kernel_list_before = self.kernel_list()
+    def _external_kernel_paths(self):
+        return [os.path.join(self.kernel_dir_path(), k_name)
+                for k_name in self.kernel_list()]
 
-        external_kernels = []
-        for k_name in kernel_list_before:
-            f_name = os.path.join(self.kernel_dir_path(), k_name)
+    def _load_external_kernel(self, f_name):
+        """
+        Loads an external kernel, files are only read again if they
+        were modified.
+        """
+        mtime = os.path.getmtime(f_name)
+        cached = self._external_kernels.get(f_name)
+        if cached is None or cached[0] != mtime:
             print('Loading {}'.format(f_name))
+            cached = (mtime, np.loadtxt(f_name))
+            self._external_kernels[f_name] = cached
+        return cached[1]
 
-            kernel_vec = np.loadtxt(f_name)
-            external_kernels.append(kernel_vec)
+    def _get_external_kernel_mtimes(self):
+        """
+        Returns the modification times of the external kernel files, used
+        to determine if the precalculated kernel is still valid.
+        """
+        mtimes = []
+        for f_name in self._external_kernel_paths():
+            try:
+                mtimes.append((f_name, os.path.getmtime(f_name)))
+            except OSError:
+                mtimes.append((f_name, None))
+        return mtimes
+
+    def get_corrections_kernel(self):
+
+        external_kernels = []
+        for f_name in self._external_kernel_paths():
+            external_kernels.append(self._load_external_kernel(f_name))
 
         kernel_object_kernels = [
             self.get_bounce_kernel_1(),
@@ -230,11 +304,16 @@ class Distortion(Instrument):
     def _get_kernel(self):
         """
         Returns the kernel.
+        Also recalculates the kernel if one of the external kernel files
+        was modified.
         """
-        if self.config_changed():
+        mtimes = self._get_external_kernel_mtimes()
+        if (self.config_changed() or
+                mtimes != self._precalculated_kernel_mtimes):
             print('{} configuration changed, recalculating kernels'.format(
                   self.name))
             self._precalculated_kernel = self.get_corrections_kernel()
+            self._precalculated_kernel_mtimes = mtimes
             self._config_changed = False
 
         return self._precalculated_kernel
@@ -281,6 +360,8 @@ class ConfigParameter(ManualParameter):
         self.validate(value)
         if value != self._latest()['value']:
             self._instrument._config_changed = True
+            if hasattr(self._instrument, '_config_parameter_changed'):
+                self._instrument._config_parameter_changed(self.name)
         self._save_val(value)
 
     def get(self):
@@ -880,11 +880,12 @@ class Tektronix_driven_transmon(CBox_driven_transmon):
         if slice_scan:
             swf_temp = swf.AWG_amp(self.fluxing_channel(), self.AWG)
             swf_temp.set_parameter(amps[0])
-            MC.run('Chevron_slice_%s'%self.name)
-            ma.TD_Analysis(auto=True)
+            result = MC.run('Chevron_slice_%s'%self.name)
+            ma.TD_Analysis(auto=True, result=result)
         else:
-            MC.run('Chevron_2D_%s'%self.name, mode='2D')
-            ma.Chevron_2D(auto=True)
+            result = MC.run('Chevron_2D_%s'%self.name, mode='2D')
+            ma.Chevron_2D(auto=True, timestamp=result.timestamp)
+        return result
 
     def measure_BusT1(self, times, MC=None):
 
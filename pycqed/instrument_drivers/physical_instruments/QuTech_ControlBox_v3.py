@@ -7,13 +7,7 @@ from ._controlbox import Assembler
 from . import QuTech_ControlBoxdriver as qcb
 from ._controlbox import defHeaders_CBox_v3 as defHeaders
 
-# cython drivers for encoding and decoding
-import pyximport
-pyximport.install(setup_args={"script_args": ["--compiler=msvc"],
-                              "include_dirs": np.get_include()},
-                  reload_support=True)
-# important codec is after pyximport.install
-from ._controlbox import codec as c
+from ._controlbox import numpy_codec as c
 
 '''
 @author: Xiang Fu
@@ -364,16 +358,18 @@ class QuTech_ControlBox_v3(qcb.QuTech_ControlBox):
 
     def load_instructions(self, asm_filename, PrintHex=False):
         '''
-        @param instructions : the instructions, an array of 32-bit instructions
+        @param asm_filename : the asm file to assemble, or a list of 32-bit
+            instructions as returned by qasm_to_asm.compile_qasm
         @return stat : 0 if the upload succeeded and 1 if the upload failed.
 
         Additionally it starts by setting the core state to idle before
         uploading instructions and ends by setting the core state to active.
         '''
-
-        asm = Assembler.Assembler(asm_filename)
-
-        instructions = asm.convert_to_instructions()
+        if isinstance(asm_filename, str):
+            asm = Assembler.Assembler(asm_filename)
+            instructions = asm.convert_to_instructions()
+        else:
+            instructions = list(asm_filename)
         if len(instructions) > self.instr_mem_size():
             raise MemoryError(
                 'asm file contains too many "{}" instructions,'.format(
@@ -8,14 +8,10 @@ import logging
 from qcodes.instrument.visa import VisaInstrument
 from qcodes.utils import validators as vals
 
-# cython drivers for encoding and decoding
-import pyximport
-pyximport.install(setup_args={"script_args": ["--compiler=msvc"],
-                              "include_dirs": np.get_include()},
-                  reload_support=True)
-
 from ._controlbox import defHeaders  # File containing bytestring commands
-from ._controlbox import codec as c  # must be below pyximport.install
+# vectorized encoding and decoding, replaces the cython codec.pyx
+from ._controlbox import numpy_codec as c
+from ._controlbox.stream_decoder import StreamDecoder
 
 
 class QuTech_ControlBox(VisaInstrument):
@@ -26,7 +22,7 @@ class QuTech_ControlBox(VisaInstrument):
     This is a direct port of the 'old' qtlab driver.
 
     Requirements:
-    defHeaders.py,  codec.pyx and working cython installation
+    defHeaders.py and numpy_codec.py
     '''
 
     def __init__(self, name, address, reset=False, run_tests=False, **kw):
@@ -246,42 +242,17 @@ class QuTech_ControlBox(VisaInstrument):
     def decode_message(self, data_bytes, data_bits_per_byte=7,
                        bytes_per_value=2, signed_integer=False):
         '''
-        Exists for legacy use (only used in integration streaming mode)
-        recommend using the cython version otherwise.
-        '''
-        message_bytes = bytearray(data_bytes[:-2])
-        # checksum = c.calculate_checksum(message_bytes)
-        # if checksum != message_bytes[-1]:
-        #     raise ValueError('Checksum does not match message')
-        if type(data_bits_per_byte) == int:
-            data_bits_per_byte = [data_bits_per_byte]
-        if type(bytes_per_value) == int:
-            bytes_per_value = [bytes_per_value]
-        if type(signed_integer) == bool:
-            signed_integer = [signed_integer]*len(bytes_per_value)
-        assert(len(data_bits_per_byte) == len(bytes_per_value))
-
-        bytes_per_iteration = sum(bytes_per_value)
-        message_length = len(message_bytes)/bytes_per_iteration
-        values = np.zeros([message_length, len(bytes_per_value)])
-        cum_bytes_per_val = np.cumsum(bytes_per_value)
-
-        for i in range(message_length):
-            iteration_bytes = message_bytes[i*bytes_per_iteration:
-                                            (i+1)*bytes_per_iteration]
-            j = 0
-            for j in range(len(bytes_per_value)):
-                if j == 0:
-                    byte_val = iteration_bytes[:(cum_bytes_per_val[j])]
-                else:
-                    byte_val = iteration_bytes[(cum_bytes_per_val[j-1]):
-                                               (cum_bytes_per_val[j])]
-                val = self.decode_byte(byte_val,
-                                       data_bits_per_byte=data_bits_per_byte[
-                                           j],
-                                       signed_integer=signed_integer[j])
-                values[i, j] = val
-        return values
+        Decodes a message of records consisting of one or more fields (only
+        used in integration streaming mode), the arguments are either
+        ints/bools or lists with one entry per field.
+        Returns an array of shape (nr_records, nr_fields).
+
+        See also c.decode_records.
+        '''
+        return c.decode_records(data_bytes,
+                                data_bits_per_byte=data_bits_per_byte,
+                                bytes_per_value=bytes_per_value,
+                                signed_integer=signed_integer)
 
     def create_message(self, cmd, data_bytes=None,
                        EOM=defHeaders.EndOfMessageHeader):
@@ -540,64 +511,66 @@ class QuTech_ControlBox(VisaInstrument):
                                  verify_execution=False)
         return stat
 
-    def get_streaming_results(self, nr_samples=10000):
-        succes = False
+    def get_streaming_results(self, nr_samples=10000, callback=None):
+        '''
+        Acquires nr_samples records in integration streaming mode.
+
+        Returns an array of shape (3, nr_samples) containing the integration
+        results of ch0 and ch1 and the rolling counter.
+        callback is called with every block of records (an array of shape
+        (nr_records, 4)) as soon as it is decoded, see also
+        iter_streaming_results.
+        '''
         t0 = time.time()
-        termination_send = False
-        message = bytearray()
-        # Request the data
+        decoder = StreamDecoder(nr_samples, callback=callback)
+        print('Starting streaming data acquisition')
+        for block in self.iter_streaming_results(nr_samples, decoder):
+            pass
+        print('Acquiring data took: %s s' % (time.time()-t0))
+        return decoder.get_data()[:3, :]
+
+    def iter_streaming_results(self, nr_samples=10000, decoder=None):
+        '''
+        Generator that starts integration streaming and yields the decoded
+        records (arrays of shape (nr_records, 4)) as they arrive.
 
+        Streaming is stopped after nr_samples records have been received,
+        the generator returns when the end of the stream is received.
+        Decoding and the check for lost data (rolling counter) are done
+        incrementally by the decoder, a StreamDecoder.
+        '''
+        if decoder is None:
+            decoder = StreamDecoder(nr_samples)
         log_message = c.create_message(
             defHeaders.ReadIntStreamingResults)
         stat, log = self.serial_write(log_message)
-
         if not stat:
             raise Exception('Requesting stream failed')
-        # Taking data like crazy!
-        print('Starting streaming data acquisition')
-        i = 0
-        while not succes:
-            i += 1
-            in_wait = self.visa_handle.bytes_in_buffer
-            if in_wait > 0:
-                message.extend(self._read_raw(in_wait))
-            elif termination_send:
-                if in_wait == 0:  # This is to prevent slow message check
-                    if message[-1] == ord(defHeaders.EndOfMessageHeader):
-                        succes = True
-                        print('EOM found stopping acquisition')
 
-            elif len(message)/10 > nr_samples:
-                stat = self.send_stop_streaming()
-
-                print('Streaming terminated, taking final data')
-                termination_send = True
-
-        t1 = time.time()
-        print('Acquiring data took: %s s' % (t1-t0))
-
-        # Has to use the slower (non cython) legacy version of the decoder
-        # because of unsigned integers and different shapes of databytes
-        decoded_data = self.decode_message(message,
-                                           data_bits_per_byte=[7, 7, 7, 7],
-                                           bytes_per_value=[4, 4, 1, 1],
-                                           signed_integer=[True, True,
-                                                           False, False])
-        data = decoded_data.transpose()[:3, :]
-
-        t2 = time.time()
-        # print 'Decoding data took %.4f s' % (t2-t1)
-        # Detect missing bytes upon decoding
-
-        for i in range(np.shape(data)[1]):
-            if not np.mod(i, 128) == data[2, i]:
-                print(data[:, i])
-                raise Exception('Data lost at entry %.4f' % i)
-                # print  ValueError('Data lost at entry %s' %i)
-        t3 = time.time()
-        print('Verifying data integrity took %.4f s' % (t3-t2))
-
-        return data
+        termination_send = False
+        t_last_data = time.time()
+        try:
+            while not decoder.finished:
+                in_wait = self._bytes_in_buffer()
+                if in_wait > 0:
+                    t_last_data = time.time()
+                    block = decoder.feed(self._read_raw(in_wait))
+                    if len(block) > 0:
+                        yield block
+                elif time.time()-t_last_data > self._timeout:
+                    raise Exception('Measurement timed out')
+                else:
+                    time.sleep(0.0001)
+
+                if (not termination_send and
+                        decoder.nr_records >= nr_samples):
+                    self.send_stop_streaming()
+                    termination_send = True
+        finally:
+            # also stop the stream when data is lost or the generator
+            # is closed early
+            if not termination_send and not decoder.finished:
+                self.send_stop_streaming()
 
     def set_awg_lookuptable(self, awg_nr, table_nr, dac_ch, lut,
                             length=None, units='V'):
@@ -1354,6 +1327,9 @@ class QuTech_ControlBox(VisaInstrument):
             raise Exception
         return mes[0]
 
+    def _bytes_in_buffer(self):
+        return self.visa_handle.bytes_in_buffer
+
     def serial_read(self, timeout=5, read_all=False, read_N=0):
         '''
         Reads on the serial port until EndOfMessageHeader is received.
@@ -10,6 +10,8 @@ from qcodes.instrument.base import Instrument
 from qcodes.utils import validators as vals
 from fnmatch import fnmatch
 from qcodes.instrument.parameter import ManualParameter
+from pycqed.instrument_drivers.physical_instruments.ZurichInstruments import \
+    zi_acquisition as zi_acq
 #from instrument_drivers.physical_instruments.ZurichInstruments import UHFQuantumController as ZI_UHFQC
 
 
@@ -155,6 +157,19 @@ class UHFQC(Instrument):
                    label='RO normalization offset (V)',
                    initial_value=0.0,
                    parameter_class=ManualParameter)
+        self.add_parameter('acquisition_timeout',
+                           units='s',
+                           label='Acquisition timeout (s)',
+                           initial_value=10,
+                           vals=vals.Numbers(min_value=0),
+                           parameter_class=ManualParameter)
+        self.add_parameter('acquisition_poll_time',
+                           units='s',
+                           label='Polling interval of an acquisition (s)',
+                           initial_value=1e-3,
+                           vals=vals.Numbers(min_value=0),
+                           parameter_class=ManualParameter)
+        self.acquisition_timings = {}
         if init:
             self.load_default_settings()
         t1 = time.time()
@@ -441,6 +456,30 @@ class UHFQC(Instrument):
             self._daq.unsubscribe(p)
         self._daq.unsubscribe('/' + self._device + '/auxins/0/sample')
 
+    def acquisition(self, channels=[0, 1], mode='rl', start=None,
+                    timeout=None):
+        '''
+        Runs the AWG program once and returns the results of the channels.
+        Completion is detected by subscribing to the AWG enable node and
+        the results of all channels are fetched at once. The time spent in
+        every phase is stored in acquisition_timings.
+
+        Input arguments:
+            channels:       (list) result channels to return
+            mode:           (str) 'rl' for the result logger, 'iavg' for
+                            the input averager
+            start:          (function) called once the UHFQC is armed,
+                            e.g. AWG.start
+            timeout:        (float) time in s to wait for the program to
+                            finish, defaults to acquisition_timeout
+        '''
+        if timeout is None:
+            timeout = self.acquisition_timeout()
+        data, self.acquisition_timings = zi_acq.acquire(
+            self._daq, self._device, channels, mode=mode, start=start,
+            timeout=timeout, poll_time=self.acquisition_poll_time())
+        return data
+
     def create_parameter_files(self):
         #this functions retrieves all possible settable and gettable parameters from the device.
         #Additionally, iot gets all minimum and maximum values for the parameters by trial and error
@@ -0,0 +1,77 @@
+'''
+Single acquisitions with the UHFQC.
+
+For an acquisition the AWG of the UHFQC runs its program once and clears
+the awgs/0/enable node when it is done. Instead of repeatedly reading the
+enable node, the node is subscribed to, such that the data server pushes
+the change and it is picked up by polling. The results of all requested
+channels are then read from the data server with a single get.
+'''
+import time
+import numpy as np
+
+result_nodes = {'rl': 'quex/rl/data/{}',
+                'iavg': 'quex/iavg/data/{}'}
+
+
+def acquire(daq, device, channels, mode='rl', start=None, timeout=10,
+            poll_time=0.001):
+    '''
+    Runs the AWG program of the UHFQC once and returns the results.
+
+    Args:
+        daq: ziDAQServer connected to the device
+        device (str): device id, e.g. 'dev2178'
+        channels (list): result channels to return
+        mode (str): 'rl' for the result logger (integration results) or
+            'iavg' for the input averager
+        start (function): called once the UHFQC is armed, e.g. to start
+            the AWG that triggers the UHFQC
+        timeout (float): time in s to wait for the program to finish
+        poll_time (float): recording time in s of every poll
+    Returns:
+        data (list): result vector of every channel
+        timings (dict): time in s spent in the 'arm', 'start', 'wait' and
+            'fetch' phases of the acquisition
+    '''
+    t0 = time.time()
+    enable_path = '/{}/awgs/0/enable'.format(device)
+    daq.subscribe(enable_path)
+    try:
+        # clears events that were received before the acquisition
+        daq.sync()
+        daq.setInt(enable_path, 1)
+        # reading the node ensures the AWG is enabled before it is triggered
+        daq.getInt(enable_path)
+        t1 = time.time()
+        if start is not None:
+            start()
+        t2 = time.time()
+        finished = False
+        while not finished:
+            dataset = daq.poll(poll_time, 1, 4, True)
+            for path, node_data in dataset.items():
+                if (path.lower() == enable_path.lower() and
+                        np.any(np.asarray(node_data['value']) == 0)):
+                    finished = True
+            if not finished and time.time() - t2 > timeout:
+                raise Exception('UHFQC acquisition did not finish within '
+                                '{} s'.format(timeout))
+    finally:
+        daq.unsubscribe(enable_path)
+    t3 = time.time()
+
+    paths = ['/{}/{}'.format(device, result_nodes[mode].format(c))
+             for c in channels]
+    dataset = daq.get(','.join(paths), True, 0)
+    dataset = {path.lower(): node_data
+               for path, node_data in dataset.items()}
+    data = []
+    for path in paths:
+        if path.lower() not in dataset:
+            raise Exception('No data received for {}'.format(path))
+        data.append(dataset[path.lower()][0]['vector'])
+    t4 = time.time()
+
+    timings = {'arm': t1-t0, 'start': t2-t1, 'wait': t3-t2, 'fetch': t4-t3}
+    return data, timings
@@ -2,6 +2,8 @@
 from sys import exit
 import logging
 import tempfile
+import hashlib
+from collections import OrderedDict
 
 
 def is_number(s):
@@ -398,177 +400,294 @@ class Assembler():
 
         return tag_addr_dict
 
-    def convert_to_instructions(self):
-        # self.AppendTail()
-        tag_addr_dict = self.ParseLabel()
+    def convert_to_instructions(self, use_cache=True):
+        '''
+        Reads the asm file and assembles it into a list of 32-bit
+        instructions, see assemble.
+        '''
+        try:
+            with open(self.asmfilename, 'r', encoding="utf-8") as Asm_File:
+                program = Asm_File.read()
+        except OSError:
+            print('\tError: Fail to open file ' + self.asmfilename + ".")
+            raise
+        logging.info("open file {} successfully.".format(self.asmfilename))
+        return assemble(program, use_cache=use_cache)
 
-        Asm_File = open(self.asmfilename, 'r', encoding="utf-8")
-        logging.info("open file", self.asmfilename, "successfully.")
 
-        cur_addr = 0
-        instructions = []
+#######################################################
+# Single pass assembler                               #
+#######################################################
+"""
+The functions below assemble a program in a single pass. Instructions are
+encoded using integer bit operations by the encoders in the _encoders
+dispatch table, branches to labels that are not yet defined are encoded
+with a zero offset and patched when the end of the program is reached.
 
-        for line in Asm_File:
-            line = line.split('#', 1)[0]  # remove anything after '#' symbole
-            line = line.strip(' \t\n\r')  # remove whitespace
+The fields of the 32-bit instructions are
+    opcode (6) | FDC (3) | 23 bits depending on the instruction
+"""
 
-            if (len(line) == 0):  # skip empty line and comment
-                continue
+_opcodes = {name: int(code, 2) for name, code in
+            Assembler.InstOpCode.items()}
+_functs = {name: int(code, 2) for name, code in
+           Assembler.InstfunctCode.items()}
+_strip_chars = string.punctuation.translate({ord('-'): None})
 
-            cur_addr = len(instructions) + 1
+# EndOfFileLoop:
+#   wait 1000
+#   trigger 0000001 1000
+#   beq r0, r0, EndOfFileLoop
+# is appended at the end of every program. It loops forever and the marker
+# 7 will always be high
+end_of_file_loop = [int('c08003e8', 16), int('a08203e8', 16),
+                    int('12007ffd', 16)]
 
-            head, sep, tail = line.partition(':')
-            if (sep == ":"):
-                instr = tail
-                if (len(tail) == 0):
-                    continue
-            else:
-                instr = head
 
-            # the following translate function should be tested.
-            elements = [rawEle.strip(string.punctuation.translate(
-                        {ord('-'): None})) for rawEle in instr.split()]
+def _header(name, FDC):
+    return _opcodes[name] << 26 | FDC << 23
 
-            if (elements[0].lower() == 'lui'):     # lui rt, pos, byte_data
-                # print('parsing lui instruction.')
-                instructions.append(int(self.LuiFormat(elements[1],
-                                                       elements[2],
-                                                       elements[3]), 2))
-
-            elif (elements[0].lower() == 'mov'):      # mov rt, imm32
-                # print('parsing mov instruction.')
-                instr4 = self.MovFormat(elements[1], elements[2])
-                for i in instr4:
-                    instructions.append(int(i, 2))
-
-            elif (elements[0].lower() == 'add'):   # add rd, rs, rt
-                # print('parsing add instruction.')
-                if (elements[1][0] != 'r' or elements[2][0] != 'r' or
-                        elements[3][0] != 'r'):
-                    raise ValueError('Add instruction only receive three registers'
-                                     ' as input.')
-                    exit()
-
-                instructions.append(int(self.AddFormat(elements[1],
-                                                       elements[2],
-                                                       elements[3]), 2))
-
-            elif (elements[0].lower() == 'sub'):   # sub rd, rs, rt
-                # print('parsing sub instruction.')
-                if (elements[1][0] != 'r' or elements[2][0] != 'r' or
-                        elements[3][0] != 'r'):
-                    raise ValueError('Sub instruction only receive three'
-                                     'registers as input.')
-                    exit()
-
-                instructions.append(int(self.SubFormat(elements[1],
-                                                       elements[2],
-                                                       elements[3]), 2))
-
-            elif (elements[0].lower() == 'beq'):   # beq rs, rt, off
-                # print('parsing beq instruction.')
-
-                if (elements[1][0] != 'r' or elements[2][0] != 'r'):
-                    raise ValueError('beq instruction only receive registers as'
-                                     ' the first two parameter.')
-                    exit()
-
-                if elements[3].strip().lower() in tag_addr_dict:
-                    target_addr = tag_addr_dict[elements[3].strip().lower()] -\
-                        (cur_addr + 1)
-                else:
-                    raise ValueError("beq. Cannot find the branch target label: ",
-                                     elements[3].strip().lower())
-                    exit()
-
-                instructions.append(int(self.BeqFormat(elements[1],
-                                                       elements[2],
-                                                       target_addr), 2))
-
-            elif (elements[0].lower() == 'bne'):   # bne rs, rt, off
-                # print('parsing bne instruction.')
-
-                if (elements[1][0] != 'r' or elements[2][0] != 'r'):
-                    raise ValueError('bne instruction only receive registers as '
-                                     'the first two parameter.')
-                    exit()
-
-                if elements[3].strip().lower() in tag_addr_dict:
-                    target_addr = tag_addr_dict[elements[3].strip().lower()] -\
-                        (cur_addr + 1)
-                    # print("bne, target_addr: ", target_addr)
-                else:
-                    raise ValueError("bne. Cannot find the branch target label: ",
-                                     elements[3].strip().lower())
-                    exit()
-
-                instructions.append(int(self.BneFormat(elements[1],
-                                                       elements[2],
-                                                       target_addr), 2))
-
-            elif (elements[0].lower() == 'addi'):  # addi rt, rs, imm
-                # print('parsing addi instruction.')
-
-                if (elements[1][0] != 'r' or elements[2][0] != 'r'):
-                    raise ValueError('addi instruction only receive registers as '
-                                     'the first two parameter.')
-                    exit()
-
-                instructions.append(int(self.AddiFormat(elements[1],
-                                                        elements[2],
-                                                        elements[3]), 2))
-
-            elif (elements[0].lower() == 'waitreg'):   # WaitReg rs
-                # print('parsing WaitReg instruction.')
-
-                if (elements[1][0] != 'r'):
-                    raise ValueError('WaitReg instruction only a register as the '
-                                     'parameter.')
-                    exit()
-
-                instructions.append(int(self.WaitRegFormat(elements[1]), 2))
-
-            elif (elements[0].lower() == 'pulse'):   # Pulse awg0, awg1, awg2
-                # print('parsing Pulse instruction.')
-                instructions.append(int(self.PulseFormat(elements[1],
-                                                         elements[2],
-                                                         elements[3]), 2))
-
-            elif (elements[0].lower() == 'measure'):   # Measure
-                # print('parsing Measure instruction.')
-                if (len(elements) > 1):
-                    print("Parameters in the measure instruction is omitted.")
-
-                instructions.append(int(self.MeasureFormat(), 2))
-
-            elif (elements[0].lower() == 'wait'):   # Wait imm
-                # print('parsing Wait instruction.')
-                instructions.append(int(self.WaitFormat(elements[1]), 2))
-
-            elif (elements[0].lower() == 'trigger'):   # Trigger mask, duration
-                # print('parsing Trigger instruction.')
-                instructions.append(int(self.TriggerFormat(elements[1],
-                                                           elements[2]), 2))
-
-            elif (elements[0].lower() == 'nop'):
-                # print('parsing nop instruction.')
-                instructions.append(int(self.NopFormat(), 2))
 
-            else:
-                raise ValueError('Error: unsupported instruction "{}" found on line "{}". '.format(
-                    elements[0], line))
-                Asm_File.close()
+def _to_int(x):
+    try:
+        return int(x)
+    except (ValueError, TypeError):
+        raise ValueError('{} is not an integer.'.format(x))
 
-        Asm_File.close()
 
-        # Append the following instructions at the end of the file
-        # It loops forever and the marker 7 will always be high
-        # EndOfFileLoop:
-        #   wait 1000
-        #   trigger 0000001 1000
-        #   beq r0, r0, EndOfFileLoop
-        instructions.append(int('c08003e8', 16))
-        instructions.append(int('a08203e8', 16))
-        instructions.append(int('12007ffd', 16))
-
-        return instructions
+def _reg(register):
+    reg_num = _to_int(register.strip('r'))
+    if reg_num < 0 or reg_num > 15:
+        raise ValueError("Register number is out of range.")
+    return reg_num
+
+
+def _check_regs(name, registers, nr_regs):
+    if any(r[:1] != 'r' for r in registers[:nr_regs]):
+        raise ValueError('{} instruction only receives registers as the '
+                         'first {} parameter(s).'.format(name, nr_regs))
+
+
+def _imm(x, n):
+    # two's complement of width n
+    return _to_int(x) % 2**n
+
+
+def _encode_lui(rt, pos, byte_data):
+    pos = _to_int(pos)
+    if pos < 0 or pos > 3:
+        raise ValueError("Position input is out of range ({0,1,2,3} "
+                         "expected).")
+    byte_data = _to_int(byte_data)
+    if byte_data < 0 or byte_data > 255:
+        raise ValueError("Byte data is out of range (0~255 expected).")
+    rt = _reg(rt)
+    return [_header('lui', 0b100) | rt << 19 | rt << 15 | 1 << (11 + pos) |
+            byte_data]
+
+
+def _encode_mov(rt, imm32):
+    imm32 = _imm(imm32, 32)
+    return [_encode_lui(rt, i, imm32 >> (8*i) & 0xff)[0] for i in range(4)]
+
+
+def _encode_add(rd, rs, rt, funct='add'):
+    _check_regs(funct, [rd, rs, rt], 3)
+    return [_header(funct, 0b100) | _reg(rs) << 19 | _reg(rt) << 15 |
+            _reg(rd) << 11 | _functs[funct]]
+
+
+def _encode_sub(rd, rs, rt):
+    return _encode_add(rd, rs, rt, funct='sub')
+
+
+def _encode_branch(name, rs, rt, offset):
+    _check_regs(name, [rs, rt], 2)
+    return [_header(name, 0b100) | _reg(rs) << 19 | _reg(rt) << 15 |
+            _imm(offset, 15)]
+
+
+def _encode_immediate(name, rt, rs, imm15):
+    _check_regs(name, [rt, rs], 2)
+    return [_header(name, 0b100) | _reg(rs) << 19 | _reg(rt) << 15 |
+            _imm(imm15, 15)]
+
+
+def _encode_waitreg(rs):
+    _check_regs('waitreg', [rs], 1)
+    return [_header('waitreg', 0b001) | _reg(rs) << 19 | _functs['waitreg']]
+
+
+def _encode_pulse(awg0, awg1, awg2):
+    codewords = 0
+    for awg in [awg0, awg1, awg2]:
+        if len(awg) != 4 or awg.strip('01'):
+            raise ValueError('The pulse codeword "{}" should be 4 bits.'
+                             .format(awg))
+        codewords = codewords << 4 | int(awg, 2)
+    return [_header('pulse', 0b001) | codewords << 11 | _functs['pulse']]
+
+
+def _encode_measure(*args):
+    if len(args) > 0:
+        print("Parameters in the measure instruction is omitted.")
+    return [_header('measure', 0b011) | _functs['measure']]
+
+
+def _encode_wait(imm15):
+    return [_header('wait', 0b001) | _imm(imm15, 15)]
+
+
+def _encode_trigger(mask, imm11):
+    if len(mask) != 7 or mask.strip('01'):
+        raise ValueError('The mask "{}" should be 7 bits, only containing 1 '
+                         'or 0. With the MSb indicating marker 1, and the LSb '
+                         'indicating marker 7.'.format(mask))
+    imm11 = _to_int(imm11)
+    if imm11 < 0 or imm11 > 2047:
+        raise ValueError("the value of the duration time is out of range "
+                         "(accepted: integer in 0~2047).")
+    # In the core of 3.1.0, the MSb works for the trigger 7.
+    mask = int(mask[::-1], 2)
+    return [_header('trigger', 0b001) | mask << 11 | imm11]
+
+
+def _encode_nop():
+    return [0]
+
+
+# name: (encoder, number of arguments)
+_encoders = {
+    'lui': (_encode_lui, 3),
+    'mov': (_encode_mov, 2),
+    'add': (_encode_add, 3),
+    'sub': (_encode_sub, 3),
+    'beq': (lambda rs, rt, off: _encode_branch('beq', rs, rt, off), 3),
+    'bne': (lambda rs, rt, off: _encode_branch('bne', rs, rt, off), 3),
+    'addi': (lambda rt, rs, imm: _encode_immediate('addi', rt, rs, imm), 3),
+    'ori': (lambda rt, rs, imm: _encode_immediate('ori', rt, rs, imm), 3),
+    'waitreg': (_encode_waitreg, 1),
+    'pulse': (_encode_pulse, 3),
+    'measure': (_encode_measure, None),
+    'wait': (_encode_wait, 1),
+    'trigger': (_encode_trigger, 2),
+    'nop': (_encode_nop, 0)}
+
+_branches = {'beq', 'bne'}
+
+
+def _parse_line(line):
+    '''
+    Returns the label (or None) and the list of elements of a line.
+    '''
+    line = line.split('#', 1)[0]  # remove anything after '#' symbole
+    head, sep, tail = line.partition(':')
+    if sep == ':':
+        label, instr = head.strip().lower(), tail
+    else:
+        label, instr = None, head
+    return label, [raw.strip(_strip_chars) for raw in instr.split()]
+
+
+def _parse_tokens(tokens):
+    '''
+    Same as _parse_line for a line that is already split into tokens, a
+    label is a first token ending with ':'.
+    '''
+    tokens = list(tokens)
+    label = None
+    if tokens and tokens[0].endswith(':'):
+        label = tokens.pop(0)[:-1].strip().lower()
+    return label, [str(t).strip(_strip_chars) for t in tokens]
+
+
+def _lines(program):
+    if isinstance(program, str):
+        return [_parse_line(line) for line in program.splitlines()]
+    return [_parse_line(line) if isinstance(line, str) else
+            _parse_tokens(line) for line in program]
+
+
+def _assemble(program, append_tail=True):
+    labels = {}
+    fixups = []  # (index, label, line) of branches to undefined labels
+    instructions = []
+    for label, elements in _lines(program):
+        if label is not None:
+            labels[label] = len(instructions)
+        if len(elements) == 0 or elements[0] == '':
+            continue
+        name = elements[0].lower()
+        if name not in _encoders:
+            raise ValueError(
+                'Error: unsupported instruction "{}" found on line "{}". '
+                .format(elements[0], ' '.join(elements)))
+        encoder, nr_args = _encoders[name]
+        args = elements[1:] if nr_args is None else elements[1:1+nr_args]
+        if nr_args is not None and len(args) < nr_args:
+            raise ValueError('{} instruction expects {} arguments, got "{}"'
+                             .format(name, nr_args, ' '.join(elements)))
+        if name in _branches:
+            target = args[2].strip().lower()
+            if target in labels:
+                # offset relative to the next instruction
+                args[2] = labels[target] - (len(instructions) + 1)
+            else:
+                fixups.append((len(instructions), target, name))
+                args[2] = 0
+        try:
+            instructions.extend(encoder(*args))
+        except ValueError as detail:
+            raise ValueError('{} instruction format error: {}'.format(
+                name.capitalize(), detail.args))
+
+    # back-patch the forward branches
+    for index, target, name in fixups:
+        if target not in labels:
+            raise ValueError("{}. Cannot find the branch target label: {}"
+                             .format(name, target))
+        instructions[index] |= _imm(labels[target] - (index + 1), 15)
+    if append_tail:
+        instructions.extend(end_of_file_loop)
+    return instructions
+
+
+_assembly_cache = OrderedDict()
+max_assembly_cache_size = 512
+
+
+def program_hash(program):
+    '''
+    Hash of a program given as text or as a list of lines/token lists.
+    '''
+    if isinstance(program, str):
+        data = program
+    else:
+        data = repr([line if isinstance(line, str) else list(line)
+                     for line in program])
+    return hashlib.sha1(data.encode('utf-8')).hexdigest()
+
+
+def assemble(program, append_tail=True, use_cache=True):
+    '''
+    Assembles a program into a list of 32-bit instructions.
+
+    Args:
+        program (str or list): the program as text or as a list of lines,
+            every line is either a string or a list of tokens, e.g.
+            ['Loop:', 'wait', '10'] or ['beq', 'r0', 'r0', 'Loop'].
+        append_tail (bool): append the end of file loop (see
+            end_of_file_loop) as done by Assembler.convert_to_instructions.
+        use_cache (bool): look up the program in a cache of assembled
+            programs, keyed on the hash of the program.
+    '''
+    if not use_cache:
+        return _assemble(program, append_tail)
+    key = (program_hash(program), append_tail)
+    if key in _assembly_cache:
+        _assembly_cache.move_to_end(key)
+    else:
+        _assembly_cache[key] = _assemble(program, append_tail)
+        if len(_assembly_cache) > max_assembly_cache_size:
+            _assembly_cache.popitem(last=False)
+    return list(_assembly_cache[key])
@@ -1,17 +1,30 @@
 import sys
+import numpy as np
 from . import defHeaders_CBox_v3 as defHeaders
+from . import defHeaders as defHeaders_v2
+from . import numpy_codec as c
 from .. import QuTech_ControlBox_v3 as qcb3
 
 
 '''
 This mock driver is used to print commands into hex format without connection
 to a real CBox.
+
+It also emulates the integration streaming mode, records are generated in
+blocks of stream_block_size records every time the buffer is polled.
+Records with an index in stream_dropped_records are left out to emulate
+data loss.
 '''
 
 
 class Mock_QuTech_ControlBox(qcb3.QuTech_ControlBox_v3):
     def __init__(self, os_par=sys.stdout, *args, **kwargs):
         self.SetupStream(os_par)
+        self.stream_block_size = 100
+        self.stream_dropped_records = set()
+        self._streaming = False
+        self._stream_index = 0
+        self._stream_buffer = bytearray()
         super(Mock_QuTech_ControlBox, self).__init__(*args, **kwargs)
 
         print('Mock driver has been initialized.')
@@ -49,8 +62,42 @@ class Mock_QuTech_ControlBox(qcb3.QuTech_ControlBox_v3):
         self.outstream.write('Command: %s\n' %
                            self.format_hex_string(command.hex()))
 
+        if command == c.create_message(
+                defHeaders_v2.ReadIntStreamingResults):
+            self._streaming = True
+            self._stream_index = 0
+            self._stream_buffer = bytearray()
+        elif command == c.create_message(
+                defHeaders_v2.EndOfStreamingHeader):
+            self._streaming = False
+            self._stream_buffer += c.calculate_checksum(command)
+            self._stream_buffer += defHeaders_v2.EndOfMessageHeader
+
+        if not verify_execution:
+            return True
         return (True, bytes.fromhex('7F'))
 
+    def _bytes_in_buffer(self):
+        if self._streaming:
+            index = self._stream_index + np.arange(self.stream_block_size)
+            self._stream_index += self.stream_block_size
+            index = np.array([i for i in index
+                              if i not in self.stream_dropped_records],
+                             dtype=int)
+            fields = [(index, 4), (-index, 4), (index % 128, 1),
+                      (np.zeros(len(index), dtype=int), 1)]
+            records = np.concatenate(
+                [np.frombuffer(c.encode_array(v, 7, bpv),
+                               dtype=np.uint8).reshape(len(index), bpv)
+                 for v, bpv in fields], axis=1)
+            self._stream_buffer += records.tobytes()
+        return len(self._stream_buffer)
+
+    def _read_raw(self, size):
+        message = bytes(self._stream_buffer[:size])
+        del self._stream_buffer[:size]
+        return message
+
     def format_hex_string(self, hexstr):
         assert(len(hexstr) % 2 == 0)
         hexstr = hexstr.upper()
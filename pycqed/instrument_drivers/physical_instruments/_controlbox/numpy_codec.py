@@ -0,0 +1,224 @@
+'''
+Encoder and decoder for the CBox protocol using numpy.
+
+Drop-in replacement for the cython module codec.pyx that does not require a
+compiled build. Instead of looping over the values, messages are converted
+to a uint8 array using np.frombuffer and all values are decoded at once
+using reshaping and bit operations.
+
+The protocol is described in the docstring of encode_byte.
+'''
+import numpy as np
+
+
+def create_message(cmd=None, data_bytes=bytes(), EOM=b"\x7F"):
+    '''
+    Input arguments:
+                  cmd         = None
+        bytes     data_bytes  = bytes()
+        bytes     EOM         = b'\x7F'
+
+    Creates bytes to send as a message.
+    Starts with a command, then adds the data bytes and ends with EOM.
+    '''
+    message = bytes()
+    if cmd is not None:
+        message += cmd
+    message += data_bytes
+    message += EOM
+    return message
+
+
+def encode_byte(value, data_bits_per_byte=7, expected_number_of_bytes=2):
+    '''
+    input arguments
+    int value                    : value to be encoded
+    int data_bits_per_byte       : specify bits/byte used in encoding
+    int expected_number_of_bytes : number of bytes expected by CBox
+
+    returns
+    bytes data_bytes             : the encoded value
+
+
+    From "250 MSPs Control Box Design Specification" version May 2015
+    by Jacob de Sterke
+
+    full_byte encoding:
+    In this mode each protocol byte contains 7 bits or the data to be
+    transferred.
+
+    |7|6|5|4|3|2|1|0|
+     | | > > > > > > > data bits
+     |
+     always 1
+
+    nibble_byte encoding:
+    In this mode each protocol byte contains only four bits (a nibble) of
+    the data to be transferred.
+    |7|6|5|4|3|2|1|0|
+    | | | | | > > >  data bits
+    | | > > > unused bits (should be set to zero for consistency)
+    |
+    always 1
+
+    The most significant bits are sent first, negative values are encoded
+    in two's complement.
+    '''
+    return encode_array([value], data_bits_per_byte,
+                        expected_number_of_bytes)
+
+
+def encode_array(values, data_bits_per_byte=7, bytes_per_value=2):
+    '''
+    Input arguments
+        int*   values                      : array of values to be encoded
+        int    data_bits_per_byte = 7      : specify bits/byte used in encoding
+        int    bytes_per_value    = 2      : number of bytes expected per value
+
+    Encodes an array of values, every value is encoded as in encode_byte.
+    '''
+    values = np.asarray(values, dtype=np.int64).reshape(-1, 1)
+    mask = (1 << data_bits_per_byte) - 1
+    shifts = data_bits_per_byte * np.arange(bytes_per_value - 1, -1, -1)
+    data_bytes = ((values >> shifts) & mask) | 0x80
+    return data_bytes.astype(np.uint8).tobytes()
+
+
+def _as_uint8(data_bytes):
+    if isinstance(data_bytes, np.ndarray):
+        return data_bytes.astype(np.uint8, copy=False).ravel()
+    return np.frombuffer(bytes(data_bytes), dtype=np.uint8)
+
+
+def _decode_values(value_bytes, data_bits_per_byte, signed_integer):
+    '''
+    Decodes a (n, bytes_per_value) uint8 array to n int64 values.
+    '''
+    bytes_per_value = value_bytes.shape[1]
+    mask = (1 << data_bits_per_byte) - 1
+    shifts = data_bits_per_byte * np.arange(bytes_per_value - 1, -1, -1)
+    # the data bits of different bytes do not overlap, the sum is an OR
+    values = np.sum((value_bytes.astype(np.int64) & mask) << shifts, axis=1)
+    if signed_integer:
+        nr_bits = data_bits_per_byte * bytes_per_value
+        values[values >= 1 << (nr_bits - 1)] -= 1 << nr_bits
+    return values
+
+
+def decode_byte(data_bytes, data_bits_per_byte=7, signed_integer=True):
+    '''
+    Input arguments:
+        bytearray data_bytes
+        int       data_bits_per_byte : 7
+        bool      signed_integer     : True
+    returns
+        int       value
+
+    Inverse function of encode byte. Protocol is described in docstring
+    of encode_byte().
+    '''
+    value_bytes = _as_uint8(data_bytes).reshape(1, -1)
+    return int(_decode_values(value_bytes, data_bits_per_byte,
+                              signed_integer)[0])
+
+
+def decode_message(data_bytes, data_bits_per_byte=7, bytes_per_value=2,
+                   signed_integer=True):
+    '''
+    Input arguments:
+        bytearray data_bytes         :
+        int       data_bits_per_byte : 7
+        int       bytes_per_value    : 2
+        bool      signed_integer     : True
+
+    returns numpy array of type int
+
+    Decodes a message consisting of values of equal size. The last byte
+    (EndOfMessage) is removed, incomplete values at the end of the message
+    (such as the checksum) are ignored.
+    '''
+    message_bytes = _as_uint8(data_bytes)[:-1]
+    message_length = len(message_bytes) // bytes_per_value
+    value_bytes = message_bytes[:message_length * bytes_per_value].reshape(
+        message_length, bytes_per_value)
+    return _decode_values(value_bytes, data_bits_per_byte, signed_integer)
+
+
+def decode_records(data_bytes, data_bits_per_byte=7, bytes_per_value=2,
+                   signed_integer=True, strip_bytes=2):
+    '''
+    Input arguments:
+        bytearray data_bytes         :
+        int(s)    data_bits_per_byte : 7
+        int(s)    bytes_per_value    : 2
+        bool(s)   signed_integer     : True
+        int       strip_bytes        : 2
+
+    returns numpy array of type int with shape (nr_records, nr_fields)
+
+    Decodes a message consisting of records of multiple fields, e.g. the
+    integration streaming mode which sends records of two signed 4 byte
+    integration results and two unsigned 1 byte counters using
+        data_bits_per_byte=[7, 7, 7, 7], bytes_per_value=[4, 4, 1, 1],
+        signed_integer=[True, True, False, False]
+    Scalar arguments apply to all fields. The last strip_bytes bytes
+    (checksum and EndOfMessage) are removed and an incomplete record at
+    the end of the message is ignored.
+    '''
+    if np.isscalar(bytes_per_value):
+        bytes_per_value = [bytes_per_value]
+    nr_fields = len(bytes_per_value)
+    if np.isscalar(data_bits_per_byte):
+        data_bits_per_byte = [data_bits_per_byte] * nr_fields
+    if np.isscalar(signed_integer):
+        signed_integer = [signed_integer] * nr_fields
+    if not (len(data_bits_per_byte) == len(signed_integer) == nr_fields):
+        raise ValueError('The number of fields in data_bits_per_byte, '
+                         'bytes_per_value and signed_integer differ')
+
+    message_bytes = _as_uint8(data_bytes)
+    if strip_bytes:
+        message_bytes = message_bytes[:-strip_bytes]
+    bytes_per_record = sum(bytes_per_value)
+    nr_records = len(message_bytes) // bytes_per_record
+    record_bytes = message_bytes[:nr_records * bytes_per_record].reshape(
+        nr_records, bytes_per_record)
+
+    values = np.empty((nr_records, nr_fields), dtype=np.int64)
+    offset = 0
+    for j in range(nr_fields):
+        values[:, j] = _decode_values(
+            record_bytes[:, offset:offset + bytes_per_value[j]],
+            data_bits_per_byte[j], signed_integer[j])
+        offset += bytes_per_value[j]
+    return values
+
+
+def decode_boolean_array(data_bytes, data_bits_per_byte=4):
+    '''
+    Used in the qubit state logging mode
+
+    Every byte contains data_bits_per_byte qubit states in the least
+    significant bits, the first state in the most significant of those.
+    The first half of the states belongs to ch0, the second to ch1.
+    '''
+    message_bytes = _as_uint8(data_bytes)[:-2]  # remove checksum and eom
+    # bits in order of transmission, most significant bit first
+    bits = np.unpackbits(message_bytes)
+    positions = (8 * np.arange(len(message_bytes))[:, None] +
+                 data_bits_per_byte + np.arange(data_bits_per_byte))
+    values = bits[positions.ravel()].astype(float)
+    ch0_values = values[:len(values)//2]
+    ch1_values = values[len(values)//2:]
+    return ch0_values, ch1_values
+
+
+def calculate_checksum(input_command):
+    '''
+    Input arguments
+        bytes input_command
+
+    Calculates checksum by taking the XOR of all bytes in input_command
+    '''
+    checksum = int(np.bitwise_xor.reduce(_as_uint8(input_command)))
+    return bytes([checksum | 128])  # set MSbit
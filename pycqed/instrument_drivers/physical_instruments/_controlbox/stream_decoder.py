@@ -0,0 +1,137 @@
+'''
+Incremental decoder for the integration streaming mode of the CBox.
+
+In integration streaming mode the CBox continuously sends records of two
+signed integration results and two unsigned counters, the first of which
+is a rolling counter (mod 128) that is used to detect lost data. The stream
+is terminated by a checksum and the EndOfMessage byte after an
+EndOfStreamingHeader is sent.
+
+The StreamDecoder decodes the complete records in every block of bytes as
+it arrives, verifies the rolling counter and stores the records in a
+preallocated array, such that memory use does not grow with the length of
+the stream and data can be processed while it is being acquired.
+'''
+import logging
+import numpy as np
+from . import numpy_codec as c
+
+
+class StreamDecoder:
+    '''
+    Args:
+        nr_samples (int): number of records stored in the buffer.
+        ring_buffer (bool): if False the first nr_samples records are stored
+            and later records are verified but discarded. If True the buffer
+            is a ring buffer containing the last nr_samples records.
+        callback (function): called with every block of newly decoded
+            records, an int array of shape (nr_records, nr_fields).
+        data_bits_per_byte, bytes_per_value, signed_integer: layout of a
+            record, see numpy_codec.decode_records.
+        counter_field (int): field containing the rolling counter, None
+            disables the integrity check.
+        counter_modulus (int): modulus of the rolling counter.
+    '''
+
+    def __init__(self, nr_samples, ring_buffer=False, callback=None,
+                 data_bits_per_byte=7, bytes_per_value=(4, 4, 1, 1),
+                 signed_integer=(True, True, False, False),
+                 counter_field=2, counter_modulus=128,
+                 EOM=b'\x7F'):
+        self.nr_samples = int(nr_samples)
+        self.ring_buffer = ring_buffer
+        self.callback = callback
+        self.data_bits_per_byte = data_bits_per_byte
+        self.bytes_per_value = list(bytes_per_value)
+        self.signed_integer = list(signed_integer)
+        self.counter_field = counter_field
+        self.counter_modulus = counter_modulus
+        self.EOM = ord(EOM)
+        self.bytes_per_record = sum(self.bytes_per_value)
+        # (nr_fields, nr_samples) to match the layout returned by
+        # get_streaming_results
+        self.buffer = np.zeros((len(self.bytes_per_value), self.nr_samples),
+                               dtype=np.int64)
+        self.reset()
+
+    def reset(self):
+        self.nr_records = 0  # total number of records decoded
+        self.finished = False
+        self.checksum = None
+        self._remainder = np.zeros(0, dtype=np.uint8)
+
+    def feed(self, data_bytes):
+        '''
+        Decodes all complete records in data_bytes (together with the bytes
+        left over from the previous block) and returns them as an array of
+        shape (nr_records, nr_fields).
+
+        Sets finished to True when the EndOfMessage byte is received, the
+        byte before it is the checksum. Raises a ValueError if the rolling
+        counter shows that data has been lost.
+        '''
+        if self.finished:
+            raise ValueError('Stream already terminated by EndOfMessage')
+        chunk = np.frombuffer(bytes(data_bytes), dtype=np.uint8)
+        # data bytes and the checksum always have the MSB set, the only
+        # byte without it is the EndOfMessage
+        eom = np.flatnonzero(chunk == self.EOM)
+        if len(eom) > 0:
+            chunk = chunk[:eom[0]]
+            self.finished = True
+        message = np.concatenate([self._remainder, chunk])
+        if self.finished and len(message) > 0:
+            self.checksum = bytes(message[-1:])
+            message = message[:-1]
+
+        nr_new = len(message) // self.bytes_per_record
+        records = c.decode_records(
+            message[:nr_new * self.bytes_per_record],
+            data_bits_per_byte=self.data_bits_per_byte,
+            bytes_per_value=self.bytes_per_value,
+            signed_integer=self.signed_integer, strip_bytes=0)
+        self._remainder = message[nr_new * self.bytes_per_record:]
+        if self.finished and len(self._remainder) > 0:
+            logging.warning('Stream terminated with {} bytes of an incomplete '
+                            'record'.format(len(self._remainder)))
+
+        self._verify_counter(records)
+        self._store(records)
+        self.nr_records += nr_new
+        if self.callback is not None and nr_new > 0:
+            self.callback(records)
+        return records
+
+    def _verify_counter(self, records):
+        if self.counter_field is None or len(records) == 0:
+            return
+        expected = ((self.nr_records + np.arange(len(records))) %
+                    self.counter_modulus)
+        lost = np.flatnonzero(records[:, self.counter_field] != expected)
+        if len(lost) > 0:
+            raise ValueError('Data lost at entry {}, record {}'.format(
+                self.nr_records + lost[0], records[lost[0]]))
+
+    def _store(self, records):
+        if self.ring_buffer:
+            # only the last nr_samples records of the block are kept
+            first = self.nr_records + max(0, len(records) - self.nr_samples)
+            records = records[-self.nr_samples:]
+            idx = (first + np.arange(len(records))) % self.nr_samples
+            self.buffer[:, idx] = records.T
+        else:
+            nr_store = max(0, min(len(records),
+                                  self.nr_samples - self.nr_records))
+            self.buffer[:, self.nr_records:self.nr_records+nr_store] = \
+                records[:nr_store].T
+
+    def get_data(self):
+        '''
+        Returns the stored records as an array of shape
+        (nr_fields, nr_stored), in the order in which they were received.
+        '''
+        nr_stored = min(self.nr_records, self.nr_samples)
+        if self.ring_buffer and self.nr_records > self.nr_samples:
+            return np.roll(self.buffer, -(self.nr_records % self.nr_samples),
+                           axis=1)
+        return self.buffer[:, :nr_stored]
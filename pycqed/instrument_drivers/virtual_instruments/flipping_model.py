@@ -5,6 +5,75 @@ from qcodes.instrument.parameter import ManualParameter
 from pycqed.analysis.tools.data_manipulation import count_error_fractions
 
 
+def simulate_shots(n, state, P_RB, p_relax, F_discr, rng=np.random):
+    '''
+    Simulates n shots of the flipping model at once.
+
+    Args:
+        n (int): number of shots
+        state (+1 or -1): the physical state before the first shot
+        P_RB (float): probability of a flip of the state in every shot
+        p_relax (float): probability of relaxation of the -1 state before
+            every shot
+        F_discr (float): probability that the state is measured correctly
+        rng: numpy RandomState (or np.random) used to draw the shots
+    returns:
+        measured_shots, array of n values +1 or -1
+
+    Without relaxation the state after shot i is the initial state times
+    the parity of the flip events up to shot i, a cumulative XOR. With
+    relaxation the flip probability depends on the state, the state is then
+    constructed from the number of shots spent in the +1 and -1 states
+    before flipping, which are geometrically distributed.
+    '''
+    if p_relax == 0:
+        flips = rng.rand(n) < P_RB
+        parity = np.cumsum(flips) % 2
+        states = state * (1 - 2*parity)
+    else:
+        # probability of leaving the state, for -1 the state either relaxes
+        # and then flips, or does not relax and flips
+        p_leave = {1: P_RB,
+                   -1: p_relax*(1-P_RB) + (1-p_relax)*P_RB}
+        states = _states_from_run_lengths(n, state, p_leave, rng)
+
+    # Readout
+    readout_errors = rng.rand(n) > F_discr
+    return np.where(readout_errors, -states, states).astype(float)
+
+
+def _states_from_run_lengths(n, state, p_leave, rng):
+    '''
+    Constructs the states of n shots of a two state Markov chain from the
+    alternating run lengths in the states, p_leave contains the probability
+    of leaving each state in a single shot.
+    '''
+    run_lengths = []
+    run_states = []
+    nr_shots = 0
+    cur_state = state
+    first = True
+    while nr_shots < n:
+        # draw runs in blocks, a run of the -1 state and of the +1 state
+        nr_pairs = int(n * max(p_leave.values())) // 2 + 8
+        lengths = np.empty((nr_pairs, 2), dtype=np.int64)
+        for j, s in enumerate([cur_state, -cur_state]):
+            if p_leave[s] == 0:
+                lengths[:, j] = n + 1  # never leaves the state
+            else:
+                lengths[:, j] = rng.geometric(p_leave[s], nr_pairs)
+        if first:
+            # the flip at the end of a run is part of the next run
+            lengths[0, 0] -= 1
+            first = False
+        run_lengths.append(lengths.ravel())
+        run_states.append(np.tile([cur_state, -cur_state], nr_pairs))
+        nr_shots += lengths.sum()
+    states = np.repeat(np.concatenate(run_states),
+                       np.concatenate(run_lengths))
+    return states[:n]
+
+
 class FlippingModel(Instrument):
     '''
     Fully classical model of flipping due to Restless RB
@@ -61,51 +130,74 @@ class FlippingModel(Instrument):
                            label='Physical state',
                            parameter_class=ManualParameter,
                            vals=Enum(1, -1), initial_value=1)
-
+        self.add_parameter('seed', units='',
+                           label='Seed of the random number generator',
+                           set_cmd=self._set_seed,
+                           get_cmd=self._get_seed,
+                           vals=Ints())
+        self._set_seed(None)
 
         # TODO: add full butterfly
 
+    def _set_seed(self, seed):
+        self._seed = seed
+        self._rng = np.random.RandomState(seed)
+
+    def _get_seed(self):
+        return self._seed
+
     def _get_P_RB(self):
         return .5*(2*self.F_g() - 1)**self.N_cl() + .5
 
     def _measure(self):
         if self.state() == -1:
             p_relax = (1-np.exp(-self.tau_d()/self.T1()))
-            if np.random.rand() < p_relax:
+            if self._rng.rand() < p_relax:
                 self.state(self.state()*-1)
-        if np.random.rand() < self.P_RB():
+        if self._rng.rand() < self.P_RB():
             self.state(self.state()*-1)
 
-        if np.random.rand() > self.F_discr():
+        if self._rng.rand() > self.F_discr():
             self.state(self.state()*-1)
             return self.state()
         else:
             return self.state()
 
+    def _shot_probabilities(self):
+        if self.T1_sigma() != 0:
+            T1 = self._rng.normal(self.T1(), self.T1_sigma(), 1)[0]
+        else:
+            T1 = self.T1()
+        p_relax = (1-np.exp(-self.tau_d()/T1))
+        return p_relax, self.P_RB(), self.F_discr()
+
     def _measure_nshots(self):
         """
         Measures n-shots keeping all the probabilities fixed
         """
+        p_relax, P_RB, F_discr = self._shot_probabilities()
+        return simulate_shots(self.N_shots(), self.state(), P_RB=P_RB,
+                              p_relax=p_relax, F_discr=F_discr,
+                              rng=self._rng)
+
+    def _measure_nshots_loop(self):
+        """
+        Shot by shot version of _measure_nshots, used as a reference
+        """
         n = self.N_shots()
-        if self.T1_sigma() != 0:
-            T1 = np.random.normal(self.T1(), self.T1_sigma(), 1)[0]
-        else:
-            T1 = self.T1()
-        p_relax = (1-np.exp(-self.tau_d()/T1))
+        p_relax, P_RB, F_discr = self._shot_probabilities()
         state = self.state()
-        P_RB = self.P_RB()
-        F_discr = self.F_discr()
         measured_shots = np.empty(n)
 
         for i in range(n):
             # Relaxation
             if state == -1:
-                if np.random.rand() < p_relax:
+                if self._rng.rand() < p_relax:
                     state *= -1
-            if np.random.rand() < P_RB:
+            if self._rng.rand() < P_RB:
                 state *= -1
             # Readout
-            if np.random.rand() > F_discr:
+            if self._rng.rand() > F_discr:
                 measured_shots[i] = -1*state
             else:
                 measured_shots[i] = state
@@ -9,9 +9,16 @@
 
   The QX server can run on the local host computer or on any server on the network. Servers with large memory allow
   the simulation of more qubits and to speedup the simulation.
+
+  Batched mode: create_circuits and run_noisy_circuits can send the commands
+  for many circuits in a single payload (one command per line) and then
+  collect all the replies, instead of waiting for the acknowledgement of every
+  command. Multi-line payloads have not been verified against the QX server
+  yet, by default (batched=False) every command is sent in its own payload.
 """
 
 import socket
+import numpy as np
 
 
 class qx_client:
@@ -24,19 +31,37 @@ class qx_client:
     timeout = 10.0
     buffer_size = 8192
     IllegalOperationException = Exception("Illegal Operation !")
+    # persistent connections that can be reused by other clients,
+    # (host, port): socket
+    connection_pool = {}
 
     def __init__(self):
         self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.__address = None
         self.__qubits = 0
         self.__circuits = []
         # default main circuit is always there
         self.__circuits.append("default")
         self.__debug = 0
 
-    def connect(self, host="localhost", port=5555):
+    def connect(self, host="localhost", port=5555, reuse_connection=False):
+        """
+          connect to the QX server, if reuse_connection is True an open
+          connection from the connection pool is used when available and
+          the connection is added to the pool. Note that the qubits and
+          circuits on the server are not known to the new client.
+        """
+        self.__address = (host, port)
+        if reuse_connection and self.__address in self.connection_pool:
+            self.sock.close()
+            self.sock = self.connection_pool[self.__address]
+            print("[+] reusing connection to QX server.")
+            return
         print("[+] connecting to QX server...")
         self.sock.connect((host, port))
         print("[+] connection to QX server established.")
+        if reuse_connection:
+            self.connection_pool[self.__address] = self.sock
 
     def __trace(self, operation):
         """ debug utility """
@@ -71,6 +96,31 @@ class qx_client:
         self.__send(cmd)
         return self.__receive_ack()
 
+    def send_batch(self, cmds):
+        """
+          send a list of commands in a single payload and receive the
+          acknowlegements of all of them : returns the list of replies
+        """
+        if len(cmds) == 0:
+            return []
+        self.__send("".join(cmd + "\n" for cmd in cmds))
+        self.__trace("qx_client::send_batch : receiving %i acknowlegements..."
+                     % len(cmds))
+        reply = ""
+        try:
+            self.sock.settimeout(self.timeout)
+            while reply.count(self.ack) < len(cmds):
+                data = self.__receive()
+                if len(data) == 0:
+                    raise ConnectionError("connection closed by QX server")
+                reply += data
+        except socket.timeout:
+            raise Exception("timeout while waiting for server reply, "
+                            "received %i of %i acknowlegements" %
+                            (reply.count(self.ack), len(cmds)))
+        replies = reply.split(self.ack)[:len(cmds)]
+        return [r.lstrip() + self.ack for r in replies]
+
     def create_qubits(self, n):
         """
           create a quantum register of n qubits
@@ -158,6 +208,28 @@ class qx_client:
         # add    the circuit to our local circuit list
         self.__circuits.append(name)
 
+    def create_circuits(self, circuits, batched=False):
+        """
+          create many circuits at once, circuits is a list of (name, gates)
+          as returned by qasm_loader.get_circuits. If batched is True the
+          definitions of all circuits are sent in a single payload,
+          otherwise every circuit is created using create_circuit.
+        """
+        if self.__qubits == 0:   # error : qubits should be created first
+            raise self.IllegalOperationException
+        if not batched:
+            for name, gates in circuits:
+                self.create_circuit(name, gates)
+            return
+        chunk_size = 100
+        cmds = []
+        for name, gates in circuits:
+            cmds.append(".%s" % name)
+            for c in range(0, len(gates), chunk_size):
+                cmds.append(" ; ".join(gates[c:c+chunk_size]))
+        self.send_batch(cmds)
+        self.__circuits.extend(name for name, gates in circuits)
+
     def run_circuit(self, name):
         '''
           execute the circuit named 'name'
@@ -180,6 +252,41 @@ class qx_client:
             print(self.__circuits)
             raise IllegalOperationException   # circuit does not exist
 
+    def run_noisy_circuits(self, names, error_probability,
+                           error_model="depolarizing_channel", iterations=1,
+                           qubits=[0], batched=False):
+        '''
+          noisy execution of many circuits, for every circuit the measurement
+          averaging is reset, the circuit is executed 'iterations' times and
+          the measurement averages of the qubits are requested. If batched
+          is True all commands are sent in a single payload, otherwise the
+          commands are sent one by one. error_probability can be a single
+          value or a list with the error probability of every circuit.
+
+          returns an array of shape (len(names), len(qubits)) containing
+          the measurement averages
+        '''
+        if np.isscalar(error_probability):
+            error_probability = [error_probability]*len(names)
+        cmds = []
+        for name, p_error in zip(names, error_probability):
+            if name not in self.__circuits:
+                print("[~] qx_client : trying to execute ", name)
+                raise self.IllegalOperationException
+            cmds.append("reset_measurement_averaging")
+            cmds.append("run_noisy %s %s %f %i" %
+                        (name, error_model, p_error, iterations))
+            cmds.extend("measurement_average %i" % q for q in qubits)
+        if batched:
+            replies = self.send_batch(cmds)
+        else:
+            replies = [self.send_cmd(cmd) for cmd in cmds]
+        # replies per circuit: reset, run_noisy, one per qubit
+        n = 2 + len(qubits)
+        averages = [[float(replies[i*n + 2 + j].split('\n')[0])
+                     for j in range(len(qubits))] for i in range(len(names))]
+        return np.array(averages).reshape(len(names), len(qubits))
+
     def get_measurement(self, qubit):
         """
            display the measurement of qubit 'qubit' (quantum circuit programmer is responsible of measuring the qubit before)
@@ -210,8 +317,18 @@ class qx_client:
         circuits = self.send_cmd("circuits")
         # print("[+] created circuits: ", circuits)
 
+    def release(self):
+        """
+          keep the connection open in the connection pool for reuse by
+          another client without stopping the server
+        """
+        if self.__address is not None:
+            self.connection_pool[self.__address] = self.sock
+
     def disconnect(self):
         self.__trace("qx_client::disconnect : stopping qx server...")
+        if self.connection_pool.get(self.__address) is self.sock:
+            del self.connection_pool[self.__address]
         print("[+] stopping the QX server...")
         self.send_cmd("stop")
         self.sock.shutdown(socket.SHUT_RDWR)
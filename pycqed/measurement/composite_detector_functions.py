@@ -556,22 +556,8 @@ class SSRO_Fidelity_Detector_Tek(det.Soft_Detector):
                     pulse_comb='OffOff',
                     nr_samples=nr_samples)
                 SWF.prepare()
-                self.UHFQC.awgs_0_enable(1)
-                try:
-                    temp = self.UHFQC.awgs_0_enable()
-                except:
-                    temp = self.UHFQC.awgs_0_enable()
-                del temp
-                self.AWG.start()
-                while self.UHFQC.awgs_0_enable() == 1:
-                    time.sleep(0.01)
-
-                self.channels = [0, 1]
-                data = ['']*len(self.channels)
-                for i, channel in enumerate(self.channels):
-                    dataset = eval(
-                        "self.UHFQC.quex_iavg_data_{}()".format(channel))
-                    data[i] = dataset[0]['vector']
+                data = self.UHFQC.acquisition([0, 1], mode='iavg',
+                                              start=self.AWG.start)
                 # data = self.UHFQC.single_acquisition(nr_samples,
                 #                              self.poll_time, timeout=0,
                 #                              channels=set([0,1]),
@@ -588,22 +574,8 @@ class SSRO_Fidelity_Detector_Tek(det.Soft_Detector):
                     pulse_comb='OnOn',
                     nr_samples=nr_samples)
                 SWF.prepare()
-                self.UHFQC.awgs_0_enable(1)
-                try:
-                    temp = self.UHFQC.awgs_0_enable()
-                except:
-                    temp = self.UHFQC.awgs_0_enable()
-                del temp
-
-                self.AWG.start()
-
-                while self.UHFQC.awgs_0_enable() == 1:
-                    time.sleep(0.01)
-                data = ['']*len(self.channels)
-                for i, channel in enumerate(self.channels):
-                    dataset = eval(
-                        "self.UHFQC.quex_iavg_data_{}()".format(channel))
-                    data[i] = dataset[0]['vector']
+                data = self.UHFQC.acquisition([0, 1], mode='iavg',
+                                              start=self.AWG.start)
                 # data = self.UHFQC.single_acquisition(nr_samples,
                 #                              self.poll_time, timeout=0,
                 #                              channels=set([0,1]),
@@ -687,17 +659,17 @@ class SSRO_Fidelity_Detector_Tek(det.Soft_Detector):
                                                           self.weight_function_I, self.weight_function_Q],
                                                       integration_length=self.integration_length, nr_shots=min(self.nr_shots, 4094)))
         self.i += 1
-        self.MC.run(name=self.measurement_name+'_'+str(self.i))
+        result = self.MC.run(name=self.measurement_name+'_'+str(self.i))
 
         if self.analyze:
             ana = ma.SSRO_Analysis(rotate=self.soft_rotate,
                                    label=self.measurement_name,
                                    no_fits=self.raw, close_file=False,
-                                   close_fig=True, auto=True)
+                                   close_fig=True, auto=True, result=result)
             if self.optimized_weights:
                 # data_group = self.MC.data_object.create_group('Transients Data')
-                dset = ana.g.create_dataset('Transients', (nr_samples, 4),
-                                            maxshape=(nr_samples, 4))
+                dset = ana.data_file['Experimental Data'].create_dataset(
+                    'Transients', (nr_samples, 4), maxshape=(nr_samples, 4))
                 dset[:, 0] = transient0_I
                 dset[:, 1] = transient0_Q
                 dset[:, 2] = transient1_I
@@ -875,8 +847,8 @@ class CBox_trace_error_fraction_detector(det.Soft_Detector):
             self.sequence_swf.upload = False
         self.i += 1
         if self.save_raw_trace:
-            self.MC.run(self.name+'_{}'.format(self.i))
-            a = ma.MeasurementAnalysis(auto=False)
+            result = self.MC.run(self.name+'_{}'.format(self.i))
+            a = ma.MeasurementAnalysis(auto=False, result=result)
             a.get_naming_and_values()
             trace = a.measured_values[0]
             a.finish()  # close the datafile
@@ -1096,12 +1068,13 @@ class Chevron_optimization_v1(det.Soft_Detector):
 
         self.qubit.dist_dict = self.dist_dict
         self.qubit.RO_acq_averages(self.nr_averages)
-        self.qubit.measure_chevron(amps=[self.awg_amp_par()],
-                                   length=np.arange(0, 81e-9, 1e-9),
-                                   MC=self.MC_nested)
+        result = self.qubit.measure_chevron(amps=[self.awg_amp_par()],
+                                            length=np.arange(0, 81e-9, 1e-9),
+                                            MC=self.MC_nested)
 
         # # fit it
-        ma_obj = ma.chevron_optimization_v2(auto=True, label='Chevron_slice')
+        ma_obj = ma.chevron_optimization_v2(auto=True, label='Chevron_slice',
+                                            result=result)
         cost_val = ma_obj.cost_value[self.cost_function_opt]
 
         # # Return the cost function sum(min)+sum(1-max)
@@ -1167,10 +1140,11 @@ class SWAPN_optimization(det.Soft_Detector):
         self.MC_nested.set_detector_function(self.qubit.int_avg_det_rot)
         self.AWG.set('ch%d_amp' % self.qubit.fluxing_channel(),
                      self.qubit.SWAP_amp())
-        self.MC_nested.run('SWAPN_%s' % self.qubit.name)
+        result = self.MC_nested.run('SWAPN_%s' % self.qubit.name)
 
         # # fit it
-        ma_obj = ma.SWAPN_cost(auto=True, cost_func=self.cost_choice)
+        ma_obj = ma.SWAPN_cost(auto=True, cost_func=self.cost_choice,
+                               result=result)
         return ma_obj.cost_val, ma_obj.single_swap_fid
 
     def prepare(self):
@@ -12,6 +12,7 @@ from pycqed.measurement.waveform_control import element
 from pycqed.measurement.waveform_control import sequence
 
 from pycqed.instrument_drivers.virtual_instruments.pyqx import qasm_loader as ql
+from pycqed.simulations import chevron_sim as chev_lib
 
 
 class Detector_Function(object):
@@ -65,6 +66,9 @@ class None_Detector(Detector_Function):
         '''
         return np.random.random()
 
+    def acquire_data_points(self, sweep_points, **kw):
+        return np.random.random(len(sweep_points))
+
 
 class Hard_Detector(Detector_Function):
 
@@ -81,6 +85,19 @@ class Hard_Detector(Detector_Function):
 
 class Soft_Detector(Detector_Function):
 
+    '''
+    Detector that acquires a single data point per call to
+    acquire_data_point.
+
+    Detectors that can compute many points at once (e.g. simulated
+    detectors) can additionally implement
+        acquire_data_points(sweep_points)
+    where sweep_points is an array of shape (n_points, n_sweep_functions).
+    It should return an array of shape (n_points, len(value_names)).
+    The MC uses this method if all sweep functions implement
+    set_parameters.
+    '''
+
     def __init__(self, **kw):
         super().__init__(**kw)
         self.detector_control = 'soft'
@@ -129,7 +146,7 @@ class Dummy_Detector_Hard(Hard_Detector):
 class QX_Hard_Detector(Hard_Detector):
 
     def __init__(self, qxc, qasm_filenames, p_error=0.004,
-                 num_avg=128, **kw):
+                 num_avg=128, batched=False, **kw):
         super().__init__()
         self.set_kw()
         self.detector_control = 'hard'
@@ -144,6 +161,9 @@ class QX_Hard_Detector(Hard_Detector):
         self.delay = 1
         self.current = 0
         self.randomizations = []
+        # send the commands of all circuits in a single payload, not
+        # verified against the QX server yet
+        self.batched = batched
         # load files
         logging.info("QX_RB_Hard_Detector : loading qasm files...")
         # print(qasm_filenames)
@@ -157,9 +177,9 @@ class QX_Hard_Detector(Hard_Detector):
             self.randomizations.append(circuits)
             # create the circuits on the server
             #t1 = time.time()
-            for c in circuits:
-                circuit_name = c[0] + "_{}".format(i)
-                self.__qxc.create_circuit(circuit_name, c[1])
+            self.__qxc.create_circuits(
+                [(c[0] + "_{}".format(i), c[1]) for c in circuits],
+                batched=self.batched)
             t2 = time.time()
             logging.info("[+] qasm loading time :", t2-t1)
 
@@ -168,20 +188,11 @@ class QX_Hard_Detector(Hard_Detector):
         self.circuits = self.randomizations[self.current]
 
     def get_values(self):
-        # x = self.sweep_points
-        # only serves to initialize the arrays
-        # data = np.array([np.sin(x / np.pi), np.cos(x/np.pi)])
-        i = 0
-        data = np.zeros(len(self.sweep_points))
-        for c in self.circuits:
-            self.__qxc.send_cmd("reset_measurement_averaging")
-            circuit_name = c[0] + "_{}".format(self.current)
-            self.__qxc.run_noisy_circuit(circuit_name, self.p_error,
-                                         "depolarizing_channel", self.num_avg)
-            f = self.__qxc.get_measurement_average(0)
-            data[i] = f
-            # data[1][i] = f
-            i = i + 1
+        circuit_names = [c[0] + "_{}".format(self.current)
+                         for c in self.circuits]
+        data = self.__qxc.run_noisy_circuits(
+            circuit_names, self.p_error, "depolarizing_channel",
+            self.num_avg, qubits=[0], batched=self.batched)[:, 0]
         self.current = int((self.current + 1) % self.num_files)
         return (1-np.array(data))
 
@@ -850,12 +861,20 @@ class Dummy_Detector_Soft(Soft_Detector):
         time.sleep(self.delay)
         return np.array([np.sin(x/np.pi), np.cos(x/np.pi)])
 
+    def acquire_data_points(self, sweep_points, **kw):
+        n = len(sweep_points)
+        x = (self.i + np.arange(n))/15.
+        self.i += n
+        time.sleep(self.delay*n)
+        return np.array([np.sin(x/np.pi), np.cos(x/np.pi)]).T
+
 
 class QX_Detector(Soft_Detector):
 
-    def __init__(self, qxc, delay=0, **kw):
+    def __init__(self, qxc, delay=0, batched=False, **kw):
         self.set_kw()
         self.delay = delay
+        self.batched = batched
         self.detector_control = 'soft'
         self.name = 'QX_Detector'
         self.value_names = ['F']  # ['F', 'F']
@@ -882,16 +901,27 @@ class QX_Detector(Soft_Detector):
         print("[+] p error  :", p_error)
         # print("[+] errors   :",errors)
         # f = (executions-errors)/executions
-        self.__qxc.send_cmd("reset_measurement_averaging")
-        self.__qxc.run_noisy_circuit(
-            circuit_name, p_error, "depolarizing_channel", executions)
-        f = self.__qxc.get_measurement_average(0)
+        f = self.__qxc.run_noisy_circuits(
+            [circuit_name], p_error, "depolarizing_channel", executions,
+            batched=self.batched)[0, 0]
         print("[+] fidelity :", f)
         self.__qxc.send_cmd("reset_measurement_averaging")
 
         self.__cnt = self.__cnt+1
         return f
 
+    def acquire_data_points(self, sweep_points, **kw):
+        # data points i, i+1, ... execute circuit i, i+1, ... using the
+        # same error probabilities as acquire_data_point
+        cnt = self.__cnt + np.arange(len(sweep_points))
+        f = self.__qxc.run_noisy_circuits(
+            ["circuit%i" % i for i in cnt], 0.001+cnt*0.003,
+            "depolarizing_channel", 1000, batched=self.batched)[:, 0]
+        self.__qxc.send_cmd("reset_measurement_averaging")
+
+        self.__cnt = self.__cnt+len(sweep_points)
+        return f
+
 
 class Source_frequency_detector(Soft_Detector):
 
@@ -923,7 +953,7 @@ class Function_Detector(Soft_Detector):
         if self.value_units is None:
             self.value_units = [""] * len(result_keys)
 
-    def acquire_data_points(self, **kw):
+    def acquire_data_point(self, **kw):
         result = self.sweep_function(**self.msmt_kw)
         return [result[key] for key in result.keys()]
 
@@ -1384,21 +1414,9 @@ class UHFQC_input_average_detector(Hard_Detector):
 
     def get_values(self):
         self.UHFQC.quex_rl_readout(0) # resets UHFQC internal readout counters
-        self.UHFQC.awgs_0_enable(1)
-        try:
-            temp = self.UHFQC.awgs_0_enable()
-        except:
-            temp = self.UHFQC.awgs_0_enable()
-        del temp
-        if self.AWG is not None:
-            self.AWG.start()
-        while self.UHFQC.awgs_0_enable() == 1:
-            time.sleep(0.01)
-        data = ['']*len(self.channels)
-        for i, channel in enumerate(self.channels):
-            dataset = eval("self.UHFQC.quex_iavg_data_{}()".format(channel))
-            data[i] = dataset[0]['vector']
-
+        data = self.UHFQC.acquisition(
+            self.channels, mode='iavg',
+            start=self.AWG.start if self.AWG is not None else None)
         return data
 
     def prepare(self, sweep_points):
@@ -1448,27 +1466,15 @@ class UHFQC_integrated_average_detector(Hard_Detector):
     def get_values(self):
         self.AWG.stop()
         self.UHFQC.quex_rl_readout(0) # resets UHFQC internal readout counters
-        self.UHFQC.awgs_0_enable(1)
-        # probing the values to be sure communication is finished before
-        # this way of checking the UHFQC should be OK according to Niels H
-        try:
-            temp = self.UHFQC.awgs_0_enable()
-        except:
-            temp = self.UHFQC.awgs_0_enable()
-        del temp
-        # starting AWG
-        if self.AWG is not None:
-            self.AWG.start()
-
-        while self.UHFQC.awgs_0_enable() == 1:
-            time.sleep(0.01)
-        data = ['']*len(self.channels)
+        # the AWG is started once the UHFQC is armed
+        data = self.UHFQC.acquisition(
+            self.channels,
+            start=self.AWG.start if self.AWG is not None else None)
         for i, channel in enumerate(self.channels):
-            # FIXME: better to use dataset = self.UHFQC.get('quex_rl_data_{}'.format(channel))
-            dataset = eval("self.UHFQC.quex_rl_data_{}()".format(channel))
-            data[i] = dataset[0]['vector']/self.nr_averages
+            data[i] = data[i]/self.nr_averages
             if self.cross_talk_suppression:
-                data[i]=data[i]-eval("self.UHFQC.quex_trans_offset_weightfunction_{}()".format(channel))
+                data[i]=data[i]-self.UHFQC.get(
+                    'quex_trans_offset_weightfunction_{}'.format(channel))
 
         # data = self.UHFQC.single_acquisition(self.nr_sweep_points,
         #                                      self.poll_time, timeout=0,
@@ -1560,25 +1566,14 @@ class UHFQC_integration_logging_det(Hard_Detector):
 
     def get_values(self):
         self.UHFQC.quex_rl_readout(0) # resets UHFQC internal readout counters
-        self.UHFQC.awgs_0_enable(1)
-        # probing the values to be sure communication is finished before
-        try:
-            temp = self.UHFQC.awgs_0_enable()
-        except:
-            temp = self.UHFQC.awgs_0_enable()
-        del temp
-        # starting AWG
-        if self.AWG is not None:
-            self.AWG.start()
-        while self.UHFQC.awgs_0_enable() == 1:
-            time.sleep(0.01)
-
-        data = ['']*len(self.channels)
+        # the AWG is started once the UHFQC is armed
+        data = self.UHFQC.acquisition(
+            self.channels,
+            start=self.AWG.start if self.AWG is not None else None)
         for i, channel in enumerate(self.channels):
-            dataset = eval("self.UHFQC.quex_rl_data_{}()".format(channel))
-            data[i] = dataset[0]['vector']
             if self.cross_talk_suppression:
-                data[i]=data[i]-eval("self.UHFQC.quex_trans_offset_weightfunction_{}()".format(channel))
+                data[i]=data[i]-self.UHFQC.get(
+                    'quex_trans_offset_weightfunction_{}'.format(channel))
         return data
 
     def prepare(self, sweep_points):
@@ -1616,14 +1611,21 @@ class Chevron_sim(Hard_Detector):
 
     """
     Returns a simulated chevron as if it was measured.
+
+    The sweep points are the times of the evolution, the simulation_dict
+    contains the parameters of chevron_sim.chevron_slices:
+        'detuning'  : energy scale at the center (e0)
+        'g'         : coupling parameter
+        'dist_step' : step function of the distortion kernel
+        'energy'    : energy of the slice in units of e0 (default 1)
     """
 
     def __init__(self, simulation_dict, **kw):
         super(Chevron_sim, self).__init__(**kw)
         self.simulation_dict = simulation_dict
         self.name = 'Simulated Chevron'
-        self.value_names = []
-        self.value_units = []
+        self.value_names = ['Excited state population']
+        self.value_units = ['']
 
     def prepare(self, sweep_points):
         self.sweep_points = sweep_points
@@ -1631,12 +1633,17 @@ class Chevron_sim(Hard_Detector):
         self.dt = self.sweep_points[1] - self.sweep_points[0]
 
     def get_values(self):
-        return chev_lib.chevron_slice(self.simulation_dict['detuning'],
-                                      self.simulation_dict['dist_step'],
-                                      self.simulation_dict['g'],
-                                      self.t_start,
-                                      self.dt,
-                                      self.simulation_dict['dist_step'])
+        t_stop = self.sweep_points[-1]
+        population = chev_lib.chevron_slices(
+            self.simulation_dict['detuning'],
+            self.simulation_dict.get('energy', 1.),
+            self.simulation_dict['g'],
+            t_stop,
+            self.dt,
+            self.simulation_dict['dist_step'])[0]
+        # the simulation starts at t=1
+        ts = np.arange(1., t_stop+0.5*self.dt, self.dt)
+        return np.interp(self.sweep_points, ts, population)
 
 
 class ATS_integrated_average_continuous_detector(Hard_Detector):
@@ -8,6 +8,10 @@ Contains:
   object, adapted for usage with qcodes
 - name generators in the style of qtlab Data objects
 - functions to create standard data sets
+- a write buffer (BufferedDataset) that keeps the measured data in memory
+  and flushes it to a chunked dataset in slabs
+- the in-memory result of a measurement (MeasurementResult) that can be
+  passed to the analysis instead of reading the file back
 """
 
 import os
@@ -17,6 +21,7 @@ import h5py
 import numpy as np
 import pycqed as pq
 from uuid import getnode as get_mac
+from pycqed.utilities import data_catalog
 
 
 try:
@@ -141,10 +146,259 @@ class Data(h5py.File):
         self.folder, self._filename = os.path.split(self.filepath)
         if not os.path.isdir(self.folder):
             os.makedirs(self.folder)
+        if not filepath:
+            # keeps the lookups in the analysis toolbox up to date
+            data_catalog.register_measurement(qc_config['datadir'],
+                                              self.folder)
         super(Data, self).__init__(self.filepath, 'a')
         self.flush()
 
 
+class BufferedDataset:
+    '''
+    Write buffer around a resizable 2D h5py dataset.
+
+    All reads and writes go to a numpy array kept in memory. Rows that have
+    changed since the last flush are written to the underlying dataset in a
+    single slab when flush is called and either the flush interval has
+    passed or the number of changed rows exceeds max_buffered_rows.
+
+    The buffer mimics the parts of the h5py.Dataset interface used by the
+    MeasurementControl (shape, resize, indexing) so that it can be used as a
+    drop-in replacement. The shape on disk is only updated on a flush, the
+    file layout itself is unchanged.
+
+    The functions in listeners are called with the (start, stop) range of
+    rows that changed, e.g. to update a live plot incrementally.
+    '''
+
+    def __init__(self, dset, expected_rows=None, flush_interval=1.,
+                 max_buffered_rows=10000):
+        '''
+        Input:
+            dset (h5py.Dataset): 2D dataset with maxshape (None, ncols)
+            expected_rows (int): number of rows expected in the final
+                dataset, used to preallocate the buffer. The buffer grows
+                automatically if more rows are written.
+            flush_interval (float): minimum time in seconds between flushes
+            max_buffered_rows (int): number of changed rows after which the
+                buffer is flushed regardless of the flush interval
+        '''
+        self.dset = dset
+        self.flush_interval = flush_interval
+        self.max_buffered_rows = max_buffered_rows
+
+        nrows, ncols = dset.shape
+        capacity = max(nrows, expected_rows if expected_rows else 0, 1)
+        self._data = np.zeros((capacity, ncols), dtype=dset.dtype)
+        self._data[:nrows] = dset[()]
+        self._nrows = nrows
+        self._dirty_start = None
+        self._dirty_stop = None
+        self._last_flush = time.time()
+        # functions called with (start, stop) when rows change
+        self.listeners = []
+
+    @property
+    def shape(self):
+        return (self._nrows, self._data.shape[1])
+
+    @property
+    def dtype(self):
+        return self._data.dtype
+
+    @property
+    def attrs(self):
+        return self.dset.attrs
+
+    def __len__(self):
+        return self._nrows
+
+    def resize(self, shape):
+        '''
+        Changes the number of rows of the dataset. New rows are filled
+        with zeros, in the same way h5py fills resized datasets.
+        '''
+        nrows, ncols = shape
+        if ncols != self._data.shape[1]:
+            raise ValueError('Only the number of rows can be changed')
+        if nrows > len(self._data):
+            # grow geometrically to keep appending amortized O(1)
+            capacity = max(nrows, 2*len(self._data))
+            new_data = np.zeros((capacity, ncols), dtype=self._data.dtype)
+            new_data[:self._nrows] = self._data[:self._nrows]
+            self._data = new_data
+        elif nrows < self._nrows:
+            self._data[nrows:self._nrows] = 0
+        old_nrows, self._nrows = self._nrows, nrows
+        if nrows != old_nrows:
+            self._notify(min(nrows, old_nrows), nrows)
+
+    def __getitem__(self, key):
+        return np.array(self._data[:self._nrows][key])
+
+    def __setitem__(self, key, value):
+        self._data[:self._nrows][key] = value
+        start, stop = self._row_range(key)
+        self._mark_dirty(start, stop)
+        self._notify(start, stop)
+
+    def _notify(self, start, stop):
+        for listener in self.listeners:
+            listener(start, stop)
+
+    def _row_range(self, key):
+        '''
+        Returns the (start, stop) range of rows addressed by key.
+        '''
+        row_key = key
+        if isinstance(key, tuple):
+            row_key = key[0] if len(key) > 0 else slice(None)
+        if isinstance(row_key, slice):
+            start, stop, _ = row_key.indices(self._nrows)
+            return start, max(start, stop)
+        rows = np.arange(self._nrows)[row_key]
+        if np.size(rows) == 0:
+            return 0, 0
+        return int(np.min(rows)), int(np.max(rows)) + 1
+
+    def _mark_dirty(self, start, stop):
+        if self._dirty_start is None:
+            self._dirty_start, self._dirty_stop = start, stop
+        else:
+            self._dirty_start = min(self._dirty_start, start)
+            self._dirty_stop = max(self._dirty_stop, stop)
+
+    def flush(self, force=False):
+        '''
+        Writes the changed rows to the underlying dataset.
+
+        Unless force is True, the data is only written if the flush interval
+        has passed or more than max_buffered_rows rows are pending.
+        Returns True if data was written.
+        '''
+        if self._dirty_start is None and self.dset.shape[0] == self._nrows:
+            return False
+        if not force:
+            nr_dirty = (0 if self._dirty_start is None else
+                        self._dirty_stop - self._dirty_start)
+            if (time.time() - self._last_flush < self.flush_interval and
+                    nr_dirty < self.max_buffered_rows):
+                return False
+        if self.dset.shape[0] != self._nrows:
+            self.dset.resize(self.shape)
+        if self._dirty_start is not None:
+            start = self._dirty_start
+            stop = min(self._dirty_stop, self._nrows)
+            if stop > start:
+                self.dset[start:stop] = self._data[start:stop]
+        self._dirty_start = None
+        self._dirty_stop = None
+        self._last_flush = time.time()
+        return True
+
+
+class MeasurementResult(np.ndarray):
+    '''
+    Data of a measurement as returned by MeasurementControl.run.
+
+    The result is the (rows x columns) data array itself, so it can be used
+    as before, and carries the information needed to analyse it without
+    searching for and reading the datafile:
+        name (str)          : measurement name
+        filepath (str)      : path of the datafile
+        folder (str)        : folder containing the datafile
+        timestamp (str)     : timestamp of the measurement 'YYYYmmdd_HHMMSS'
+        column_names (list) : names of the columns including units
+        attrs (dict)        : attributes of the "Experimental Data" group
+                              (decoded), e.g. value_names and value_units
+
+    The metadata is propagated to arrays derived from the result (slices).
+    '''
+    _metadata = ('name', 'filepath', 'folder', 'timestamp', 'column_names',
+                 'attrs')
+
+    def __new__(cls, data, name=None, filepath=None, column_names=None,
+                attrs=None):
+        obj = np.asarray(data).view(cls)
+        obj.name = name
+        obj.filepath = filepath
+        obj.folder = None
+        obj.timestamp = None
+        if filepath is not None:
+            obj.folder = os.path.dirname(filepath)
+            obj.timestamp = (os.path.basename(os.path.dirname(obj.folder)) +
+                             '_' + os.path.basename(obj.folder)[:6])
+        obj.column_names = column_names
+        obj.attrs = attrs if attrs is not None else {}
+        return obj
+
+    def __array_finalize__(self, obj):
+        for attr in self._metadata:
+            setattr(self, attr, getattr(obj, attr, None))
+
+    def experimental_data(self):
+        '''
+        Returns a read-only stand-in for the "Experimental Data" group of
+        the datafile that is kept in memory.
+        '''
+        return MemoryGroup({'Data': MemoryDataset(np.asarray(self))},
+                           attrs=self.attrs)
+
+
+class MemoryDataset:
+    '''
+    Read-only stand-in for a h5py.Dataset holding an array in memory.
+    '''
+
+    def __init__(self, data, attrs=None):
+        self._data = data
+        self.attrs = attrs if attrs is not None else {}
+
+    @property
+    def value(self):
+        return self._data
+
+    @property
+    def shape(self):
+        return self._data.shape
+
+    @property
+    def dtype(self):
+        return self._data.dtype
+
+    def __len__(self):
+        return len(self._data)
+
+    def __getitem__(self, key):
+        return self._data[key]
+
+    def __array__(self, dtype=None):
+        return np.asarray(self._data, dtype=dtype)
+
+
+class MemoryGroup:
+    '''
+    Read-only stand-in for a h5py.Group containing MemoryDatasets.
+    '''
+
+    def __init__(self, items, attrs=None):
+        self._items = items
+        self.attrs = attrs if attrs is not None else {}
+
+    def __getitem__(self, key):
+        return self._items[key]
+
+    def __contains__(self, key):
+        return key in self._items
+
+    def __iter__(self):
+        return iter(self._items)
+
+    def keys(self):
+        return self._items.keys()
+
+
 def encode_to_utf8(s):
     '''
     Required because h5py does not support python3 strings
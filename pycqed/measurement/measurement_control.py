@@ -2,6 +2,9 @@ import types
 import logging
 import time
 import sys
+import queue
+import threading
+from collections import deque
 import numpy as np
 from scipy.optimize import fmin_powell
 from pycqed.measurement import hdf5_data as h5d
@@ -53,6 +56,8 @@ class MeasurementControl(Instrument):
 
         self.add_parameter('plotting_max_pts',
                            label='Maximum number of live plotting points',
+                           docstring=('Longer traces are shown using min/max '
+                                      'decimation.'),
                            parameter_class=ManualParameter,
                            vals=vals.Ints(1),
                            initial_value=4000)
@@ -73,6 +78,52 @@ class MeasurementControl(Instrument):
                            vals=vals.Bool(),
                            parameter_class=ManualParameter,
                            initial_value=True)
+        self.add_parameter('datasaving_flush_interval',
+                           label='Minimum time between writes to disk',
+                           units='s',
+                           parameter_class=ManualParameter,
+                           vals=vals.Numbers(min_value=0),
+                           initial_value=1.)
+        self.add_parameter('datasaving_max_buffered_pts',
+                           label='Maximum number of buffered datapoints',
+                           docstring=('Data is written to disk when more '
+                                      'than this number of points is '
+                                      'buffered, regardless of the flush '
+                                      'interval.'),
+                           parameter_class=ManualParameter,
+                           vals=vals.Ints(1),
+                           initial_value=10000)
+        self.add_parameter('datasaving_compression',
+                           docstring=('Compression filter used for the '
+                                      'experimental data, None disables '
+                                      'compression.'),
+                           parameter_class=ManualParameter,
+                           vals=vals.Enum(None, 'gzip', 'lzf'),
+                           initial_value=None)
+        self.add_parameter('soft_batch_size',
+                           label='Number of soft sweep points per batch',
+                           docstring=('Maximum number of points that are '
+                                      'evaluated in a single call if the '
+                                      'detector and sweep functions support '
+                                      'batch evaluation.'),
+                           parameter_class=ManualParameter,
+                           vals=vals.Ints(1),
+                           initial_value=1000)
+        self.add_parameter('pipelined_hard_sweeps',
+                           docstring=('If True, data storing, plotting and '
+                                      'progress printing of hard sweeps '
+                                      'with multiple iterations are done in '
+                                      'a background thread while the next '
+                                      'chunk is being acquired.'),
+                           parameter_class=ManualParameter,
+                           vals=vals.Bool(),
+                           initial_value=False)
+        self.add_parameter('pipeline_queue_size',
+                           label='Maximum number of chunks waiting to be '
+                                 'stored in pipelined mode',
+                           parameter_class=ManualParameter,
+                           vals=vals.Ints(1),
+                           initial_value=4)
 
         # pyqtgraph plotting process is reused for different measurements.
         if self.live_plot_enabled():
@@ -87,6 +138,10 @@ class MeasurementControl(Instrument):
         self._persist_dat = None
         self._persist_xlabs = None
         self._persist_ylabs = None
+        self._data_writer = None
+        # chunks stored by the data writer for which the plotmons and
+        # progress have not been updated yet
+        self._stored_chunks = deque()
 
     ##############################################
     # Functions used to control the measurements #
@@ -95,6 +150,11 @@ class MeasurementControl(Instrument):
     def run(self, name=None, mode='1D', **kw):
         '''
         Core of the Measurement control.
+
+        Returns the measured data as a MeasurementResult, an array that also
+        contains the column names and the location of the datafile. It can
+        be passed to the analysis (MeasurementAnalysis(result=...)) to
+        avoid searching for and reading back the datafile.
         '''
         # Setting to zero at the start of every run, used in soft avg
         self.soft_iteration = 0
@@ -118,15 +178,23 @@ class MeasurementControl(Instrument):
                     self.xlen = len(self.get_sweep_points())
                 except:
                     self.xlen = 1
-            if self.mode == '1D':
-                self.measure()
-            elif self.mode == '2D':
-                self.measure_2D()
-            elif self.mode == 'adaptive':
-                self.measure_soft_adaptive()
-            else:
-                raise ValueError('mode %s not recognized' % self.mode)
-            result = self.dset[()]
+            try:
+                if self.mode == '1D':
+                    self.measure()
+                elif self.mode == '2D':
+                    self.measure_2D()
+                elif self.mode == 'adaptive':
+                    self.measure_soft_adaptive()
+                else:
+                    raise ValueError('mode %s not recognized' % self.mode)
+            finally:
+                # buffered data is also written if the measurement fails
+                self.dset.flush(force=True)
+            result = h5d.MeasurementResult(
+                self.dset[()], name=self.get_measurement_name(),
+                filepath=self.data_object.filepath,
+                column_names=self.column_names,
+                attrs=self.data_group_attrs)
             self.save_MC_metadata(self.data_object)  # timing labels etc
         self.finish(result)
         return result
@@ -169,25 +237,39 @@ class MeasurementControl(Instrument):
                 req_nr_iterations = int(swp_len/pts_per_iter)
                 total_iterations = req_nr_iterations * self.soft_avg()
 
-                for i in range(total_iterations-1):
-                    start_idx, stop_idx = self.get_datawriting_indices(
-                        pts_per_iter=pts_per_iter)
-                    if start_idx == 0:
-                        self.soft_iteration += 1
-                    for i, sweep_function in enumerate(self.sweep_functions):
-                        if len(self.sweep_functions) != 1:
-                            swf_sweep_points = sweep_points[:, i]
-                            sweep_points_0 = sweep_points[:, 0]
-                        else:
-                            swf_sweep_points = sweep_points
-                            sweep_points_0 = sweep_points
-                        val = swf_sweep_points[start_idx]
-
-                        if sweep_function.sweep_control is 'soft':
-                            sweep_function.set_parameter(val)
-                    self.detector_function.prepare(
-                        sweep_points=sweep_points_0[start_idx:stop_idx])
-                    self.measure_hard()
+                if self.pipelined_hard_sweeps():
+                    self._stored_chunks.clear()
+                    self._data_writer = AsyncDataWriter(
+                        self._store_hard_data_pipelined,
+                        maxsize=self.pipeline_queue_size())
+                try:
+                    for i in range(total_iterations-1):
+                        start_idx, stop_idx = self.get_datawriting_indices(
+                            pts_per_iter=pts_per_iter)
+                        if start_idx == 0:
+                            self.soft_iteration += 1
+                        for i, sweep_function in enumerate(
+                                self.sweep_functions):
+                            if len(self.sweep_functions) != 1:
+                                swf_sweep_points = sweep_points[:, i]
+                                sweep_points_0 = sweep_points[:, 0]
+                            else:
+                                swf_sweep_points = sweep_points
+                                sweep_points_0 = sweep_points
+                            val = swf_sweep_points[start_idx]
+
+                            if sweep_function.sweep_control is 'soft':
+                                sweep_function.set_parameter(val)
+                        self.detector_function.prepare(
+                            sweep_points=sweep_points_0[start_idx:stop_idx])
+                        self.measure_hard()
+                finally:
+                    if self._data_writer is not None:
+                        # waits until all acquired chunks have been stored
+                        data_writer, self._data_writer = \
+                            self._data_writer, None
+                        data_writer.close()
+                self.update_stored_chunks()
         else:
             raise Exception('Sweep and Detector functions not '
                             + 'of the same type. \nAborting measurement')
@@ -203,10 +285,27 @@ class MeasurementControl(Instrument):
         return
 
     def measure_soft_static(self):
+        if self.batch_evaluation_supported():
+            batch_size = self.soft_batch_size()
+            for self.soft_iteration in range(self.soft_avg()):
+                for i in range(0, len(self.sweep_points), batch_size):
+                    self.batch_measurement_function(
+                        self.sweep_points[i:i+batch_size])
+            return
         for self.soft_iteration in range(self.soft_avg()):
             for i, sweep_point in enumerate(self.sweep_points):
                 self.measurement_function(sweep_point)
 
+    def batch_evaluation_supported(self):
+        '''
+        Returns True if the soft sweep can be evaluated in batches, i.e. if
+        the detector function has an "acquire_data_points" method and all
+        sweep functions have a "set_parameters" method.
+        '''
+        return (hasattr(self.detector_function, 'acquire_data_points') and
+                all(hasattr(sweep_function, 'set_parameters')
+                    for sweep_function in self.sweep_functions))
+
     def measure_soft_adaptive(self, method=None):
         '''
         Uses the adaptive function and keywords for that function as
@@ -247,13 +346,67 @@ class MeasurementControl(Instrument):
 
     def measure_hard(self):
         new_data = np.array(self.detector_function.get_values()).T
+        if self._data_writer is not None:
+            # storing is done by the writer thread while the next chunk
+            # is acquired
+            self._data_writer.put(new_data, self.iteration,
+                                  self.soft_iteration)
+            self.update_stored_chunks()
+        else:
+            stop_idx = self.store_hard_data(new_data, self.iteration,
+                                            self.soft_iteration)
+            self.update_hard_monitors(self.iteration, stop_idx,
+                                      self.soft_iteration)
+        self.iteration += 1
+        return new_data
+
+    def _store_hard_data_pipelined(self, new_data, iteration,
+                                   soft_iteration):
+        '''
+        Store function of the data writer, the plotmons are updated in the
+        main thread by update_stored_chunks.
+        '''
+        stop_idx = self.store_hard_data(new_data, iteration, soft_iteration)
+        self._stored_chunks.append((iteration, stop_idx, soft_iteration))
+
+    def update_stored_chunks(self):
+        '''
+        Updates the plotmons and progress for the chunks that have been
+        stored by the data writer.
+        '''
+        while self._stored_chunks:
+            self.update_hard_monitors(*self._stored_chunks.popleft())
+
+    def update_hard_monitors(self, iteration, stop_idx, soft_iteration):
+        '''
+        Updates the plotmons and prints the progress after a chunk of a
+        hard sweep has been stored.
+        '''
+        self.update_plotmon()
+        if self.mode == '2D':
+            self.update_plotmon_2D_hard(iteration=iteration)
+        self.print_progress(stop_idx, soft_iteration=soft_iteration)
+
+    def store_hard_data(self, new_data, iteration, soft_iteration):
+        '''
+        Stores a chunk of data acquired in a hard sweep. Returns the index
+        of the row after the chunk.
+
+        Args:
+            new_data (array): data as returned by the detector (transposed)
+            iteration (int): index of the chunk, determines where the data
+                is written
+            soft_iteration (int): soft average iteration the chunk
+                belongs to
+        '''
 
         ###########################
         # Shape determining block #
         ###########################
 
         datasetshape = self.dset.shape
-        start_idx, stop_idx = self.get_datawriting_indices(new_data)
+        start_idx, stop_idx = self.get_datawriting_indices(
+            new_data, iteration=iteration)
 
         new_datasetshape = (np.max([datasetshape[0], stop_idx]),
                             datasetshape[1])
@@ -262,16 +415,16 @@ class MeasurementControl(Instrument):
         if len(np.shape(new_data)) == 1:
             old_vals = self.dset[start_idx:stop_idx,
                                  len(self.sweep_functions)]
-            new_vals = ((new_data + old_vals*self.soft_iteration) /
-                        (1+self.soft_iteration))
+            new_vals = ((new_data + old_vals*soft_iteration) /
+                        (1+soft_iteration))
 
             self.dset[start_idx:stop_idx,
                       len(self.sweep_functions)] = new_vals
         else:
             old_vals = self.dset[start_idx:stop_idx,
                                  len(self.sweep_functions):]
-            new_vals = ((new_data + old_vals*self.soft_iteration) /
-                        (1+self.soft_iteration))
+            new_vals = ((new_data + old_vals*soft_iteration) /
+                        (1+soft_iteration))
 
             self.dset[start_idx:stop_idx,
                       len(self.sweep_functions):] = new_vals
@@ -297,12 +450,8 @@ class MeasurementControl(Instrument):
                 # specified that you don't want to crash (e.g. on -off seq)
                 pass
 
-        self.update_plotmon()
-        if self.mode == '2D':
-            self.update_plotmon_2D_hard()
-        self.print_progress(stop_idx)
-        self.iteration += 1
-        return new_data
+        self.dset.flush()
+        return stop_idx
 
     def measurement_function(self, x):
         '''
@@ -334,6 +483,7 @@ class MeasurementControl(Instrument):
         new_vals = ((new_data + old_vals*self.soft_iteration) /
                     (1+self.soft_iteration))
         self.dset[start_idx:stop_idx, :] = new_vals
+        self.dset.flush()
         # update plotmon
         self.update_plotmon()
         if self.mode == '2D':
@@ -345,6 +495,49 @@ class MeasurementControl(Instrument):
             self.print_progress(stop_idx)
         return vals
 
+    def batch_measurement_function(self, x):
+        '''
+        Measurement function used for soft sweeps that evaluates a batch
+        of sweep points in one call and stores them as one slab.
+
+        Args:
+            x (array): sweep points of shape (n_points, n_sweep_functions)
+                or (n_points, ) if there is a single sweep function.
+        '''
+        x = np.array(x, dtype=float)
+        if len(np.shape(x)) == 1:
+            x = x.reshape(-1, 1)
+        if np.shape(x)[1] != len(self.sweep_functions):
+            raise ValueError(
+                'size of x "%s" not equal to # sweep functions' % x)
+        # outer sweep points are set first, see measurement_function
+        for i, sweep_function in enumerate(self.sweep_functions[::-1]):
+            sweep_function.set_parameters(x[:, ::-1][:, i])
+
+        nr_points = len(x)
+        datasetshape = self.dset.shape
+        start_idx, _ = self.get_datawriting_indices(pts_per_iter=1)
+        stop_idx = start_idx + nr_points
+        vals = np.array(self.detector_function.acquire_data_points(x))
+        vals = vals.reshape(nr_points, -1)
+
+        new_datasetshape = (np.max([datasetshape[0], stop_idx]),
+                            datasetshape[1])
+        self.dset.resize(new_datasetshape)
+        new_data = np.concatenate([x, vals], axis=1)
+        old_vals = self.dset[start_idx:stop_idx, :]
+        new_vals = ((new_data + old_vals*self.soft_iteration) /
+                    (1+self.soft_iteration))
+        self.dset[start_idx:stop_idx, :] = new_vals
+        self.dset.flush()
+
+        self.update_plotmon()
+        if self.mode == '2D':
+            self.update_plotmon_2D(nr_points=nr_points)
+        self.iteration += nr_points
+        self.print_progress(stop_idx)
+        return vals
+
     def optimization_function(self, x):
         '''
         A wrapper around the measurement function.
@@ -478,23 +671,29 @@ class MeasurementControl(Instrument):
         self.curves = []
         xlabels = self.column_names[0:len(self.sweep_function_names)]
         ylabels = self.column_names[len(self.sweep_function_names):]
+        nr_sweep_funcs = len(self.sweep_function_names)
+        y_cols = range(nr_sweep_funcs, len(self.column_names))
+        # the plotted data is read from the dataset incrementally
+        self._plotmon_buffer = DecimatedPlotBuffer(
+            self.dset, y_cols, max_pts=self.plotting_max_pts())
+        self.dset.listeners.append(self._plotmon_buffer.mark_changed)
         j = 0
         if (self._persist_ylabs == ylabels and
                 self._persist_xlabs == xlabels) and self.persist_mode():
             persist = True
+            persist_buffer = DecimatedPlotBuffer(
+                self._persist_dat, y_cols, max_pts=self.plotting_max_pts())
+            persist_buffer.mark_changed(0, len(self._persist_dat))
         else:
             persist = False
         for yi, ylab in enumerate(ylabels):
             for xi, xlab in enumerate(xlabels):
                 if persist:  # plotting persist first so new data on top
-                    yp = self._persist_dat[
-                        :, yi+len(self.sweep_function_names)]
-                    xp = self._persist_dat[:, xi]
-                    if len(xp) < self.plotting_max_pts():
-                        self.main_QtPlot.add(x=xp, y=yp,
-                                             subplot=j+1,
-                                             color=0.75,  # a grayscale value
-                                             symbol='o', symbolSize=5)
+                    xp, yp = persist_buffer.get_xy(xi, yi+nr_sweep_funcs)
+                    self.main_QtPlot.add(x=xp, y=yp,
+                                         subplot=j+1,
+                                         color=0.75,  # a grayscale value
+                                         symbol='o', symbolSize=5)
                 self.main_QtPlot.add(x=[0], y=[0],
                                      xlabel=xlab, ylabel=ylab,
                                      subplot=j+1,
@@ -505,9 +704,11 @@ class MeasurementControl(Instrument):
             self.main_QtPlot.win.nextRow()
 
     def update_plotmon(self, force_update=False):
-        # Note: plotting_max_pts takes precendence over force update
-        if self.live_plot_enabled() and (self.dset.shape[0] <
-                                         self.plotting_max_pts()):
+        '''
+        Only the rows that changed since the last update are read from the
+        dataset, long traces are decimated to plotting_max_pts points.
+        '''
+        if self.live_plot_enabled():
             i = 0
             try:
                 time_since_last_mon_update = time.time() - self._mon_upd_time
@@ -515,14 +716,14 @@ class MeasurementControl(Instrument):
                 # creates the time variables if they did not exists yet
                 self._mon_upd_time = time.time()
                 time_since_last_mon_update = 1e9
-            if (time_since_last_mon_update > self.plotting_interval() or
-                    force_update) :
+            if ((time_since_last_mon_update > self.plotting_interval() or
+                    force_update) and self._plotmon_buffer.changed):
 
                 nr_sweep_funcs = len(self.sweep_function_names)
                 for y_ind in range(len(self.detector_function.value_names)):
                     for x_ind in range(nr_sweep_funcs):
-                        x = self.dset[:, x_ind]
-                        y = self.dset[:, nr_sweep_funcs+y_ind]
+                        x, y = self._plotmon_buffer.get_xy(
+                            x_ind, nr_sweep_funcs+y_ind)
 
                         self.curves[i]['config']['x'] = x
                         self.curves[i]['config']['y'] = y
@@ -555,18 +756,19 @@ class MeasurementControl(Instrument):
                                    subplot=j+1,
                                    cmap='viridis')
 
-    def update_plotmon_2D(self, force_update=False):
+    def update_plotmon_2D(self, force_update=False, nr_points=1):
         '''
-        Adds latest measured value to the TwoD_array and sends it
+        Adds latest measured value(s) to the TwoD_array and sends it
         to the QC_QtPlot.
         '''
         if self.live_plot_enabled():
-            i = int((self.iteration) % (self.xlen*self.ylen))
-            x_ind = int(i % self.xlen)
-            y_ind = int(i / self.xlen)
-            for j in range(len(self.detector_function.value_names)):
-                z_ind = len(self.sweep_functions) + j
-                self.TwoD_array[y_ind, x_ind, j] = self.dset[i, z_ind]
+            for k in range(nr_points):
+                i = int((self.iteration + k) % (self.xlen*self.ylen))
+                x_ind = int(i % self.xlen)
+                y_ind = int(i / self.xlen)
+                for j in range(len(self.detector_function.value_names)):
+                    z_ind = len(self.sweep_functions) + j
+                    self.TwoD_array[y_ind, x_ind, j] = self.dset[i, z_ind]
             self.secondary_QtPlot.traces[j]['config']['z'] = self.TwoD_array[:, :, j]
             if (time.time() - self.time_last_2Dplot_update >
                     self.plotting_interval()
@@ -594,21 +796,22 @@ class MeasurementControl(Instrument):
                     self.plotting_interval() or force_update):
                 for j in range(len(self.detector_function.value_names)):
                     y_ind = len(self.sweep_functions) + j
-                    y = self.dset[:, y_ind]
-                    x = range(len(y))
+                    x, y = self._plotmon_buffer.get_xy(None, y_ind)
                     self.secondary_QtPlot.traces[j]['config']['x'] = x
                     self.secondary_QtPlot.traces[j]['config']['y'] = y
                     self.time_last_ad_plot_update = time.time()
                     self.secondary_QtPlot.update_plot()
 
-    def update_plotmon_2D_hard(self):
+    def update_plotmon_2D_hard(self, iteration=None):
         '''
         Adds latest datarow to the TwoD_array and send it
         to the QC_QtPlot.
         Note that the plotmon only supports evenly spaced lattices.
         '''
+        if iteration is None:
+            iteration = self.iteration
         if self.live_plot_enabled():
-            i = int((self.iteration) % self.ylen)
+            i = int((iteration) % self.ylen)
             y_ind = i
             for j in range(len(self.detector_function.value_names)):
                 z_ind = len(self.sweep_functions) + j
@@ -619,7 +822,7 @@ class MeasurementControl(Instrument):
 
             if (time.time() - self.time_last_2Dplot_update >
                     self.plotting_interval()
-                    or self.iteration == len(self.sweep_points)/self.xlen):
+                    or iteration == len(self.sweep_points)/self.xlen):
                 self.time_last_2Dplot_update = time.time()
                 self.secondary_QtPlot.update_plot()
 
@@ -665,24 +868,46 @@ class MeasurementControl(Instrument):
 
     def create_experimentaldata_dataset(self):
         data_group = self.data_object.create_group('Experimental Data')
-        self.dset = data_group.create_dataset(
+        h5_dset = data_group.create_dataset(
             'Data', (0, len(self.sweep_functions) +
                      len(self.detector_function.value_names)),
             maxshape=(None, len(self.sweep_functions) +
-                      len(self.detector_function.value_names)))
+                      len(self.detector_function.value_names)),
+            chunks=True, compression=self.datasaving_compression())
+        # All reads and writes during the measurement go through an
+        # in-memory buffer that is flushed to the file in slabs.
+        self.dset = h5d.BufferedDataset(
+            h5_dset, expected_rows=self.get_expected_nr_rows(),
+            flush_interval=self.datasaving_flush_interval(),
+            max_buffered_rows=self.datasaving_max_buffered_pts())
         self.get_column_names()
         self.dset.attrs['column_names'] = h5d.encode_to_utf8(self.column_names)
         # Added to tell analysis how to extract the data
-        data_group.attrs['datasaving_format'] = h5d.encode_to_utf8('Version 2')
-        data_group.attrs['sweep_parameter_names'] = h5d.encode_to_utf8(
-            self.sweep_par_names)
-        data_group.attrs['sweep_parameter_units'] = h5d.encode_to_utf8(
-            self.sweep_par_units)
-
-        data_group.attrs['value_names'] = h5d.encode_to_utf8(
-            self.detector_function.value_names)
-        data_group.attrs['value_units'] = h5d.encode_to_utf8(
-            self.detector_function.value_units)
+        # (also kept in memory for the result returned by run)
+        self.data_group_attrs = {
+            'datasaving_format': 'Version 2',
+            'sweep_parameter_names': list(self.sweep_par_names),
+            'sweep_parameter_units': list(self.sweep_par_units),
+            'value_names': list(self.detector_function.value_names),
+            'value_units': list(self.detector_function.value_units)}
+        for key, value in self.data_group_attrs.items():
+            data_group.attrs[key] = h5d.encode_to_utf8(value)
+
+    def get_expected_nr_rows(self):
+        '''
+        Returns the number of rows the dataset will have at the end of the
+        measurement or None if this is not known in advance.
+        '''
+        if self.mode == 'adaptive':
+            return None
+        try:
+            nr_rows = len(self.get_sweep_points())
+            if self.mode == '2D' and len(self.sweep_functions) > 1:
+                nr_rows *= len(self.sweep_points_2D)
+        except Exception:
+            # some swf only get their sweep points in the prepare statement
+            return None
+        return nr_rows
 
     def save_optimization_settings(self):
         '''
@@ -735,13 +960,15 @@ class MeasurementControl(Instrument):
         set_grp.attrs['measurement_name'] = self.measurement_name
         set_grp.attrs['live_plot_enabled'] = self.live_plot_enabled()
 
-    def print_progress(self, stop_idx=None):
+    def print_progress(self, stop_idx=None, soft_iteration=None):
+        if soft_iteration is None:
+            soft_iteration = self.soft_iteration
         if self.verbose():
             acquired_points = self.dset.shape[0]
             total_nr_pts = len(self.get_sweep_points())
             if self.soft_avg() != 1:
                 progr = 1 if stop_idx == None else stop_idx/total_nr_pts
-                percdone = (self.soft_iteration+progr)/self.soft_avg()*100
+                percdone = (soft_iteration+progr)/self.soft_avg()*100
             else:
                 percdone = acquired_points*1./total_nr_pts*100
             elapsed_time = time.time() - self.begintime
@@ -792,11 +1019,14 @@ class MeasurementControl(Instrument):
     def get_datetimestamp(self):
         return time.strftime('%Y%m%d_%H%M%S', time.localtime())
 
-    def get_datawriting_indices(self, new_data=None, pts_per_iter=None):
+    def get_datawriting_indices(self, new_data=None, pts_per_iter=None,
+                                iteration=None):
         """
         Calculates the start and stop indices required for
         storing a hard measurement.
         """
+        if iteration is None:
+            iteration = self.iteration
         if new_data is None and pts_per_iter is None:
             raise(ValueError())
         elif new_data is not None:
@@ -813,7 +1043,7 @@ class MeasurementControl(Instrument):
         else:
             max_sweep_points = np.shape(self.get_sweep_points())[0]
         start_idx = int(
-            (xlen*(self.iteration)) % max_sweep_points)
+            (xlen*(iteration)) % max_sweep_points)
 
         stop_idx = start_idx + xlen
 
@@ -980,3 +1210,238 @@ class MeasurementControl(Instrument):
         """
         return {'vendor': 'PycQED', 'model': 'MeasurementControl',
                 'serial': '', 'firmware': '2.0'}
+
+
+class AsyncDataWriter:
+    '''
+    Calls a store function in a background thread for every item that is
+    put in a bounded queue. Items are processed one at a time in the order
+    in which they were put, so the resulting dataset does not depend on
+    the timing of the acquisition.
+
+    put blocks if the queue is full, limiting the amount of data kept in
+    memory. Exceptions raised in the background thread are re-raised in the
+    calling thread on the next put or on close.
+    '''
+
+    def __init__(self, store_function, maxsize=4):
+        self._store_function = store_function
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._exception = None
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while True:
+            args = self._queue.get()
+            try:
+                if args is None:
+                    return
+                # after a failure the remaining items are discarded
+                if self._exception is None:
+                    self._store_function(*args)
+            except Exception as e:
+                self._exception = e
+            finally:
+                self._queue.task_done()
+
+    def put(self, *args):
+        self._raise_if_failed()
+        self._queue.put(args)
+
+    def close(self):
+        '''
+        Waits until all items have been processed and stops the thread.
+        '''
+        self._queue.put(None)
+        self._thread.join()
+        self._raise_if_failed()
+
+    def _raise_if_failed(self):
+        if self._exception is not None:
+            raise self._exception
+
+
+class DecimatedPlotBuffer:
+    '''
+    Keeps track of the data shown in the live plot of a measurement.
+
+    Changed rows are registered with mark_changed (e.g. as a listener of a
+    BufferedDataset) and only these rows are read from the data when the
+    plot is refreshed. Traces longer than max_pts are reduced using min/max
+    decimation: the rows are divided in at most max_pts/2 buckets of equal
+    size and for every value column the rows containing the minimum and
+    the maximum of each bucket are shown. The bucket size doubles when
+    the number of rows grows, so the cost of a refresh does not depend on
+    the length of the measurement.
+    '''
+
+    def __init__(self, data, y_cols, max_pts=4000):
+        '''
+        Args:
+            data: 2D array like (e.g. a BufferedDataset) containing the data
+            y_cols (list): columns for which the minima and maxima are
+                determined
+            max_pts (int): maximum number of points returned per trace
+        '''
+        self.data = data
+        self.y_cols = list(y_cols)
+        self.max_pts = max_pts
+        self.max_buckets = max(max_pts//2, 1)
+        self.bucket_size = 1
+        self.nr_rows = 0
+        self._nr_buckets = 0
+        shape = (self.max_buckets, len(self.y_cols))
+        self._min_rows = np.zeros(shape, dtype=int)
+        self._max_rows = np.zeros(shape, dtype=int)
+        self._min_vals = np.zeros(shape)
+        self._max_vals = np.zeros(shape)
+        self._changed = None
+        # rows can be marked by the thread writing the data
+        self._lock = threading.Lock()
+
+    def mark_changed(self, start, stop):
+        '''
+        Registers that rows start:stop have been written.
+        '''
+        with self._lock:
+            if self._changed is None:
+                self._changed = (start, stop)
+            else:
+                self._changed = (min(self._changed[0], start),
+                                 max(self._changed[1], stop))
+
+    @property
+    def changed(self):
+        return self._changed is not None
+
+    def process(self):
+        '''
+        Updates the buckets with the rows changed since the last call.
+        '''
+        with self._lock:
+            changed, self._changed = self._changed, None
+        if changed is None:
+            return
+        start, stop = changed
+        nr_rows = len(self.data)
+        if nr_rows < self.nr_rows:
+            # rows were removed, start over
+            self.bucket_size = 1
+            self.nr_rows = 0
+            self._nr_buckets = 0
+            start = 0
+        stop = min(stop, nr_rows)
+        lo = min(start, self.nr_rows)
+        hi = max(stop, self.nr_rows)
+        if hi <= lo:
+            return
+        while -(-hi // self.bucket_size) > self.max_buckets:
+            self._double_bucket_size()
+        b = self.bucket_size
+
+        if lo == self.nr_rows and lo % b != 0:
+            # appending to a partially filled bucket
+            k = lo // b
+            end = min(hi, (k+1)*b)
+            min_rows, max_rows, min_vals, max_vals = self._aggregate(lo, end)
+            replace_min = min_vals[0] < self._min_vals[k]
+            self._min_vals[k] = np.where(
+                replace_min, min_vals[0], self._min_vals[k])
+            self._min_rows[k] = np.where(
+                replace_min, min_rows[0], self._min_rows[k])
+            replace_max = max_vals[0] > self._max_vals[k]
+            self._max_vals[k] = np.where(
+                replace_max, max_vals[0], self._max_vals[k])
+            self._max_rows[k] = np.where(
+                replace_max, max_rows[0], self._max_rows[k])
+            lo = end
+
+        if lo < hi:
+            k0 = lo // b
+            end = min(-(-max(stop, lo) // b)*b, hi)
+            buckets = self._aggregate(k0*b, end)
+            k1 = k0 + len(buckets[0])
+            self._min_rows[k0:k1] = buckets[0]
+            self._max_rows[k0:k1] = buckets[1]
+            self._min_vals[k0:k1] = buckets[2]
+            self._max_vals[k0:k1] = buckets[3]
+        self.nr_rows = hi
+        self._nr_buckets = -(-hi // b)
+
+    def _aggregate(self, start, stop):
+        '''
+        Returns the rows and values of the minima and maxima of the buckets
+        containing rows start:stop, start is the first row of a bucket.
+        '''
+        b = self.bucket_size
+        vals = np.asarray(self.data[start:stop, self.y_cols],
+                          dtype=np.float64)
+        nr_full = len(vals) // b
+        results = [[], [], [], []]
+        parts = []
+        if nr_full > 0:
+            parts.append((start, vals[:nr_full*b].reshape(nr_full, b, -1)))
+        if len(vals) > nr_full*b:
+            parts.append((start + nr_full*b, vals[nr_full*b:][np.newaxis]))
+        for first_row, part in parts:
+            offsets = first_row + b*np.arange(len(part))[:, np.newaxis]
+            arg_min = np.argmin(part, axis=1)
+            arg_max = np.argmax(part, axis=1)
+            results[0].append(offsets + arg_min)
+            results[1].append(offsets + arg_max)
+            results[2].append(np.take_along_axis(
+                part, arg_min[:, np.newaxis], axis=1)[:, 0])
+            results[3].append(np.take_along_axis(
+                part, arg_max[:, np.newaxis], axis=1)[:, 0])
+        return [np.concatenate(r) for r in results]
+
+    def _double_bucket_size(self):
+        '''
+        Merges pairs of neighbouring buckets.
+        '''
+        nb = self._nr_buckets
+        nr_pairs = nb // 2
+        for rows, vals, compare in [(self._min_rows, self._min_vals, np.less),
+                                    (self._max_rows, self._max_vals,
+                                     np.greater)]:
+            first, second = slice(0, 2*nr_pairs, 2), slice(1, 2*nr_pairs, 2)
+            take_second = compare(vals[second], vals[first])
+            new_vals = np.where(take_second, vals[second], vals[first])
+            new_rows = np.where(take_second, rows[second], rows[first])
+            if nb % 2:
+                vals[nr_pairs] = vals[nb-1]
+                rows[nr_pairs] = rows[nb-1]
+            vals[:nr_pairs] = new_vals
+            rows[:nr_pairs] = new_rows
+        self._nr_buckets = nr_pairs + nb % 2
+        self.bucket_size *= 2
+
+    def rows(self, y_col):
+        '''
+        Returns the (sorted) rows that are shown for value column y_col.
+        '''
+        self.process()
+        if self.nr_rows <= self.max_pts:
+            return np.arange(self.nr_rows)
+        j = self.y_cols.index(y_col)
+        nb = self._nr_buckets
+        rows = np.stack([self._min_rows[:nb, j], self._max_rows[:nb, j]],
+                        axis=1)
+        return np.sort(rows, axis=1).ravel()
+
+    def get_xy(self, x_col, y_col):
+        '''
+        Returns the (decimated) x and y values of a trace. If x_col is None
+        the row numbers are used as x values.
+        '''
+        self.process()
+        if self.nr_rows <= self.max_pts:
+            rows = slice(0, self.nr_rows)
+            x = np.arange(self.nr_rows) if x_col is None else None
+        else:
+            rows = self.rows(y_col)
+            x = rows if x_col is None else None
+        if x is None:
+            x = np.asarray(self.data[rows, x_col])
+        return x, np.asarray(self.data[rows, y_col])
@@ -6,7 +6,8 @@ from ..waveform_control.element import calculate_time_correction
 from ..waveform_control import pulse
 from ..waveform_control import sequence
 from pycqed.measurement.randomized_benchmarking import randomized_benchmarking as rb
-from pycqed.measurement.pulse_sequences.standard_elements import multi_pulse_elt
+from pycqed.measurement.pulse_sequences.standard_elements import \
+    multi_pulse_elt, pulse_templates
 
 from importlib import reload
 reload(pulse)
@@ -514,7 +515,8 @@ def Randomized_Benchmarking_seq(pulse_pars, RO_pars,
                                 resetless=False,
                                 double_curves=False,
                                 seq_name=None,
-                                verbose=False, upload=True):
+                                verbose=False, upload=True,
+                                use_templates=True):
     '''
     Input pars:
         pulse_pars:    dict containing pulse pars
@@ -531,6 +533,10 @@ def Randomized_Benchmarking_seq(pulse_pars, RO_pars,
                        is longer than 50us to ensure proper initialization
         double_curves: Alternates between net clifford 0 and 3
         upload:        Upload to the AWG
+        use_templates: bool if True the elements are assembled from
+                       primitive pulses that are rendered once for all
+                       elements instead of rendering every pulse of
+                       every element. The waveforms are identical.
 
     returns:
         seq, elements_list
@@ -552,6 +558,12 @@ def Randomized_Benchmarking_seq(pulse_pars, RO_pars,
     station.pulsar.update_channel_settings()
     el_list = []
     pulses = get_pulse_dict_from_pars(pulse_pars)
+    if use_templates:
+        templates = pulse_templates(pulses)
+        primitives = {name: name for name in pulses}
+    else:
+        templates = None
+        primitives = pulses
     net_cliffords = [0, 3]  # Exists purely for the double curves mode
     i = 0
     for seed in range(nr_seeds):
@@ -563,28 +575,32 @@ def Randomized_Benchmarking_seq(pulse_pars, RO_pars,
             if cal_points and (j == (len(nr_cliffords)-4) or
                                j == (len(nr_cliffords)-3)):
                 el = multi_pulse_elt(i, station,
-                                     [pulses['I'], RO_pars])
+                                     [primitives['I'], RO_pars],
+                                     templates=templates)
             elif cal_points and (j == (len(nr_cliffords)-2) or
                                  j == (len(nr_cliffords)-1)):
                 el = multi_pulse_elt(i, station,
-                                     [pulses['X180'], RO_pars])
+                                     [primitives['X180'], RO_pars],
+                                     templates=templates)
             else:
                 cl_seq = rb.randomized_benchmarking_sequence(
                     n_cl, desired_net_cl=net_clifford)
                 pulse_keys = rb.decompose_clifford_seq(cl_seq)
-                pulse_list = [pulses[x] for x in pulse_keys]
+                pulse_list = [primitives[x] for x in pulse_keys]
                 pulse_list += [RO_pars]
                 # copy first element and set extra wait
-                pulse_list[0] = deepcopy(pulse_list[0])
+                pulse_list[0] = deepcopy(pulses[pulse_keys[0]])
                 pulse_list[0]['pulse_delay'] += post_msmt_delay
-                el = multi_pulse_elt(i, station, pulse_list)
+                el = multi_pulse_elt(i, station, pulse_list,
+                                     templates=templates)
             el_list.append(el)
             seq.append_element(el, trigger_wait=True)
 
             # If the element is too long, add in an extra wait elt
             # to skip a trigger
             if resetless and n_cl*pulse_pars['pulse_delay']*1.875 > 50e-6:
-                el = multi_pulse_elt(i, station, [pulses['I']])
+                el = multi_pulse_elt(i, station, [primitives['I']],
+                                     templates=templates)
                 el_list.append(el)
                 seq.append_element(el, trigger_wait=True)
     if upload:
@@ -21,7 +21,61 @@ reload(pulse_library)
 reload(element)
 
 
-def multi_pulse_elt(i, station, pulse_list):
+# pulse types that make_pulse converts to a single pulse object
+single_pulse_types = ['SSB_DRAG_pulse', 'Mux_DRAG_pulse', 'CosPulse',
+                      'SquarePulse', 'SquareFluxPulse', 'MartinisFluxPulse',
+                      'ModSquare']
+
+
+def make_pulse(name, pulse_pars):
+    '''
+    Returns the pulse object described by pulse_pars, the pulse_type must be
+    one of single_pulse_types.
+    '''
+    if pulse_pars['pulse_type'] == 'SSB_DRAG_pulse':
+        return SSB_DRAG_pulse(name=name,
+                              I_channel=pulse_pars['I_channel'],
+                              Q_channel=pulse_pars['Q_channel'],
+                              amplitude=pulse_pars['amplitude'],
+                              sigma=pulse_pars['sigma'],
+                              nr_sigma=pulse_pars['nr_sigma'],
+                              motzoi=pulse_pars['motzoi'],
+                              mod_frequency=pulse_pars['mod_frequency'],
+                              phase=pulse_pars['phase'],
+                              phi_skew=pulse_pars['phi_skew'],
+                              alpha=pulse_pars['alpha'])
+    elif pulse_pars['pulse_type'] == 'Mux_DRAG_pulse':
+        return Mux_DRAG_pulse(name=name, **pulse_pars)
+    elif pulse_pars['pulse_type'] == 'CosPulse':
+        return CosPulse(name=name, **pulse_pars)
+    elif pulse_pars['pulse_type'] == 'SquarePulse':
+        return SquarePulse(name=name, **pulse_pars)
+    elif pulse_pars['pulse_type'] == 'SquareFluxPulse':
+        return SquareFluxPulse(name=name, **pulse_pars)
+    elif pulse_pars['pulse_type'] == 'MartinisFluxPulse':
+        return MartinisFluxPulse(name=name, **pulse_pars)
+    elif pulse_pars['pulse_type'] == 'ModSquare':
+        return MW_IQmod_pulse(name=name, **pulse_pars)
+    else:
+        raise KeyError('pulse_type {} is not a single pulse'.format(
+            pulse_pars['pulse_type']))
+
+
+def pulse_templates(pulses):
+    '''
+    Returns PulseTemplates for a dictionary of pulse_pars dictionaries
+    (e.g. from get_pulse_dict_from_pars), to be used with multi_pulse_elt.
+    '''
+    pulse_pars = {}
+    for name, pars in pulses.items():
+        pulse_pars[name] = dict(pars)
+        pulse_pars[name].setdefault('refpoint', 'end')
+    return element.PulseTemplates(
+        {name: make_pulse(name, pars) for name, pars in pulse_pars.items()},
+        pulse_pars=pulse_pars)
+
+
+def multi_pulse_elt(i, station, pulse_list, templates=None):
     '''
     Input args
         i:          index of the element, ensures unique element name
@@ -43,10 +97,22 @@ def multi_pulse_elt(i, station, pulse_list):
 
     Note: this function could be the template for the most standard
     element we use.
+
+    templates:  optional PulseTemplates (see pulse_templates), entries of
+                pulse_list can then also be the name of a template. These
+                pulses are not rendered for every element but assembled
+                from waveforms shared by all elements, which is a lot
+                faster for long sequences of primitive pulses such as in
+                randomized benchmarking. The waveforms are identical.
     '''
-    el = element.Element(
-        name='{}-pulse-elt_{}'.format(len(pulse_list), i),
-        pulsar=station.pulsar)
+    if templates is None:
+        el = element.Element(
+            name='{}-pulse-elt_{}'.format(len(pulse_list), i),
+            pulsar=station.pulsar)
+    else:
+        el = element.TemplateElement(
+            name='{}-pulse-elt_{}'.format(len(pulse_list), i),
+            templates=templates, pulsar=station.pulsar)
     for i in range(4):  # Exist to ensure there are no empty channels
         el.add(pulse.SquarePulse(name='refpulse_0',
                                  channel='ch{}'.format(i+1),
@@ -58,59 +124,24 @@ def multi_pulse_elt(i, station, pulse_list):
                         start=300e-9)
     for i, pulse_pars in enumerate(pulse_list):
         # print(i)
+        if isinstance(pulse_pars, str):
+            template_pars = templates.pulse_pars[pulse_pars]
+            # same name as the automatic name given to the other pulses
+            last_pulse = el.add_template(
+                pulse_pars, name='pulse_{}-0'.format(i),
+                start=template_pars['pulse_delay'],
+                refpulse=last_pulse, refpoint=template_pars['refpoint'])
+            continue
+
         if 'refpoint' not in pulse_pars.keys():
             # default refpoint for backwards compatibility
             pulse_pars['refpoint'] = 'end'
 
-        if pulse_pars['pulse_type'] == 'SSB_DRAG_pulse':
-            last_pulse = el.add(
-                SSB_DRAG_pulse(name='pulse_{}'.format(i),
-                               I_channel=pulse_pars['I_channel'],
-                               Q_channel=pulse_pars['Q_channel'],
-                               amplitude=pulse_pars['amplitude'],
-                               sigma=pulse_pars['sigma'],
-                               nr_sigma=pulse_pars['nr_sigma'],
-                               motzoi=pulse_pars['motzoi'],
-                               mod_frequency=pulse_pars['mod_frequency'],
-                               phase=pulse_pars['phase'],
-                               phi_skew=pulse_pars['phi_skew'],
-                               alpha=pulse_pars['alpha']),
-                start=pulse_pars['pulse_delay'],
-                refpulse=last_pulse, refpoint=pulse_pars['refpoint'])
-        elif pulse_pars['pulse_type'] == 'Mux_DRAG_pulse':
-            # pulse_pars.pop('pulse_type')
-            last_pulse = el.add(Mux_DRAG_pulse(name='pulse_{}'.format(i),
-                                               **pulse_pars),
-                                start=pulse_pars['pulse_delay'],
-                                refpulse=last_pulse, refpoint=pulse_pars['refpoint'])
-        elif pulse_pars['pulse_type'] == 'CosPulse':
-            last_pulse = el.add(CosPulse(name='pulse_{}'.format(i),
-                                         **pulse_pars),
-                                start=pulse_pars['pulse_delay'],
-                                refpulse=last_pulse, refpoint=pulse_pars['refpoint'])
-        elif pulse_pars['pulse_type'] == 'SquarePulse':
-            last_pulse = el.add(SquarePulse(name='pulse_{}'.format(i),
-                                            **pulse_pars),
-                                start=pulse_pars['pulse_delay'],
-                                refpulse=last_pulse, refpoint=pulse_pars['refpoint'])
-        elif pulse_pars['pulse_type'] == 'SquareFluxPulse':
-            last_pulse = el.add(SquareFluxPulse(name='pulse_{}'.format(i),
-                                                **pulse_pars),
-                                start=pulse_pars['pulse_delay'],
-                                refpulse=last_pulse, refpoint=pulse_pars['refpoint'])
-        elif pulse_pars['pulse_type'] == 'MartinisFluxPulse':
-            last_pulse = el.add(MartinisFluxPulse(name='pulse_{}'.format(i),
-                                                **pulse_pars),
-                                start=pulse_pars['pulse_delay'],
-                                refpulse=last_pulse, refpoint=pulse_pars['refpoint'])
-
-
-        elif pulse_pars['pulse_type'] == 'ModSquare':
-            last_pulse = el.add(MW_IQmod_pulse(name='pulse_{}'.format(i),
-                                               **pulse_pars),
+        if pulse_pars['pulse_type'] in single_pulse_types:
+            last_pulse = el.add(make_pulse('pulse_{}'.format(i), pulse_pars),
                                 start=pulse_pars['pulse_delay'],
-                                refpulse=last_pulse, refpoint=pulse_pars['refpoint'])
-
+                                refpulse=last_pulse,
+                                refpoint=pulse_pars['refpoint'])
         elif (pulse_pars['pulse_type'] == 'MW_IQmod_pulse_tek' or
               pulse_pars['pulse_type'] == 'MW_IQmod_pulse_UHFQC' or
               pulse_pars['pulse_type'] == 'Gated_MW_RO_pulse'):
@@ -27,13 +27,50 @@ for i in range(24):
     for j in range(24):
         twoQ_class_0[i*24+j] = C1_q0[i]+C1_q1[j]
 
-# class_1: c-not like class
-#q0      -C1  -c-  S1
-#q1      -C1 -not- S1
-#with c the control and not the target of the cnot gate and S1 a group of
-#three single-qubit cliffords
+# The classes below use CZ as the entangling gate, following
+# Barends et al. Nature 508, 500 (2014) (supplementary information).
+# S1 is a group of three single-qubit cliffords {I, S, S^2} (cliffords 0, 1
+# and 2 of the single qubit clifford group), S1_Y90 (S1_X90) is S1 followed
+# by a Y90 (X90) rotation.
+S1 = [gate_decomposition[i] for i in range(3)]
+S1_Y90_q0 = [[s + ' q0' for s in ss + ['Y90']] for ss in S1]
+S1_Y90_q1 = [[s + ' q1' for s in ss + ['Y90']] for ss in S1]
+S1_X90_q1 = [[s + ' q1' for s in ss + ['X90']] for ss in S1]
+S1_q0 = [[s + ' q0' for s in ss] for ss in S1]
 
-gate_decomposition_2Q = twoQ_class_0
+# class_1: c-not like class
+#q0      -C1 -*- S1
+#q1      -C1 -*- S1_Y90
+#with * the CZ gate. This class has 24^2*3^2=5184 elements.
+twoQ_class_1 = [[]]*(24*24*9)
+for i in range(24*24):
+    for j in range(3):
+        for k in range(3):
+            twoQ_class_1[i*9+j*3+k] = (twoQ_class_0[i] + ['CZ'] +
+                                       S1_q0[j] + S1_Y90_q1[k])
 
+# class_2: i-swap like class
+#q0      -C1 -*- Y90  -*- S1_Y90
+#q1      -C1 -*- mX90 -*- S1_X90
+#This class has 24^2*3^2=5184 elements.
+twoQ_class_2 = [[]]*(24*24*9)
+for i in range(24*24):
+    for j in range(3):
+        for k in range(3):
+            twoQ_class_2[i*9+j*3+k] = (twoQ_class_0[i] + ['CZ'] +
+                                       ['Y90 q0', 'mX90 q1', 'CZ'] +
+                                       S1_Y90_q0[j] + S1_X90_q1[k])
 
+# class_3: swap like class
+#q0      -C1 -*- mY90 -*- Y90  -*- I
+#q1      -C1 -*- Y90  -*- mY90 -*- Y90
+#This class has 24^2=576 elements.
+twoQ_class_3 = [[]]*(24*24)
+for i in range(24*24):
+    twoQ_class_3[i] = (twoQ_class_0[i] +
+                       ['CZ', 'mY90 q0', 'Y90 q1', 'CZ', 'Y90 q0',
+                        'mY90 q1', 'CZ', 'I q0', 'Y90 q1'])
 
+# In total 576 + 5184 + 5184 + 576 = 11520 two-qubit cliffords
+gate_decomposition_2Q = (twoQ_class_0 + twoQ_class_1 + twoQ_class_2 +
+                         twoQ_class_3)
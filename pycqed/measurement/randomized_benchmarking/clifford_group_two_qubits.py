@@ -1,92 +1,317 @@
-import numpy as np
 '''
-Decomposition of the single qubit clifford group as per
-Eptstein et al. Phys. Rev. A 89, 062321 (2014)
+Two-qubit clifford group in a symplectic (tableau) representation.
+
+A clifford is fully determined (up to a global phase) by the way it maps the
+generators X_q0, X_q1, Z_q0, Z_q1 of the Pauli group onto other (signed)
+Paulis. A Pauli is stored as bits (x, z, r) representing
+    i^r X^x Z^z,  with X^x = X_q0^x0 X_q1^x1 and Z^z = Z_q0^z0 Z_q1^z1
+such that composing and inverting cliffords only requires a few bit
+operations instead of multiplying 16x16 Pauli transfer matrices.
+
+Cliffords are referred to by their index in the two-qubit clifford
+decomposition (gate_decomposition_2Q). The lookup tables between indices and
+tableaus are built on first use and cached on disk.
+
+The order of cliffords follows the single qubit clifford_lookuptable:
+compose(cl_a, cl_b) is the clifford corresponding to first applying cl_a and
+then cl_b.
 '''
+import os
+import logging
+import numpy as np
+from pycqed.measurement.randomized_benchmarking.clifford_group import(
+    Clifford_group)
+from pycqed.measurement.randomized_benchmarking.clifford_decompositions \
+    import(gate_decomposition)
+from pycqed.measurement.randomized_benchmarking.\
+    clifford_decompositions_two_qubits import(gate_decomposition_2Q)
+
+nr_cliffords_2Q = 11520
+
+# Increase when changing the decomposition or the encoding, invalidates the
+# tables cached on disk.
+_TABLE_VERSION = 1
+table_cache_path = os.path.join(
+    os.path.expanduser('~'), '.pycqed',
+    'two_qubit_clifford_tables_v{}.npz'.format(_TABLE_VERSION))
 
+_tables = {}
 
-# Clifford group decomposition maps
-I = np.eye(4)
-# Pauli group
-X = np.array([[1, 0, 0, 0],
-              [0, 1, 0, 0],
-              [0, 0, -1, 0],
-              [0, 0, 0, -1]], dtype=int)
-Y = np.array([[1, 0, 0, 0],
-              [0, -1, 0, 0],
-              [0, 0, 1, 0],
-              [0, 0, 0, -1]], dtype=int)
-Z = np.array([[1, 0, 0, 0],
-              [0, -1, 0, 0],
-              [0, 0, -1, 0],
-              [0, 0, 0, 1]], dtype=int)
-# Exchange group
-S = np.array([[1, 0, 0, 0],
-              [0, 0, 0, 1],
-              [0, 1, 0, 0],
-              [0, 0, 1, 0]], dtype=int)
-S2 = np.dot(S, S)
-# Hadamard group
-H = np.array([[1, 0, 0, 0],
-              [0, 0, 0, 1],
-              [0, 0, -1, 0],
-              [0, 1, 0, 0]], dtype=int)
-
-
-Clifford_group = [np.empty([4, 4])]*(24)
-# explictly reversing order because order of operators is order in time
-Clifford_group[0] = np.linalg.multi_dot([I, I, I][::-1])
-Clifford_group[1] = np.linalg.multi_dot([I, I, S][::-1])
-Clifford_group[2] = np.linalg.multi_dot([I, I, S2][::-1])
-Clifford_group[3] = np.linalg.multi_dot([X, I, I][::-1])
-Clifford_group[4] = np.linalg.multi_dot([X, I, S][::-1])
-Clifford_group[5] = np.linalg.multi_dot([X, I, S2][::-1])
-Clifford_group[6] = np.linalg.multi_dot([Y, I, I][::-1])
-Clifford_group[7] = np.linalg.multi_dot([Y, I, S][::-1])
-Clifford_group[8] = np.linalg.multi_dot([Y, I, S2][::-1])
-Clifford_group[9] = np.linalg.multi_dot([Z, I, I][::-1])
-Clifford_group[10] = np.linalg.multi_dot([Z, I, S][::-1])
-Clifford_group[11] = np.linalg.multi_dot([Z, I, S2][::-1])
-
-Clifford_group[12] = np.linalg.multi_dot([I, H, I][::-1])
-Clifford_group[13] = np.linalg.multi_dot([I, H, S][::-1])
-Clifford_group[14] = np.linalg.multi_dot([I, H, S2][::-1])
-Clifford_group[15] = np.linalg.multi_dot([X, H, I][::-1])
-Clifford_group[16] = np.linalg.multi_dot([X, H, S][::-1])
-Clifford_group[17] = np.linalg.multi_dot([X, H, S2][::-1])
-Clifford_group[18] = np.linalg.multi_dot([Y, H, I][::-1])
-Clifford_group[19] = np.linalg.multi_dot([Y, H, S][::-1])
-Clifford_group[20] = np.linalg.multi_dot([Y, H, S2][::-1])
-Clifford_group[21] = np.linalg.multi_dot([Z, H, I][::-1])
-Clifford_group[22] = np.linalg.multi_dot([Z, H, S][::-1])
-Clifford_group[23] = np.linalg.multi_dot([Z, H, S2][::-1])
-
-
-def generate_clifford_lookuptable(Clifford_group):
-    '''
-    mapping in the lookuptable goes as follows
-
-    Using the lookuptable:
-    Row "i" corresponds to the clifford you have; Cl_A
-    Column "j" corresponds to the clifford that is applied; Cl_B
-    The value in (i,j) corresponds to the index of the resulting clifford
-         Cl_C = np.dot(Cl_B, cl_A)
-
-    Note: this function should work for generating a lookuptable for any closed
-    group by taking a list of all elements in the group in matrix form as input
-    arguments. However it has only been tested with the 24 element single qubit
-    Clifford group.
-    '''
-    len_cl_grp = len(Clifford_group)
-    clifford_lookuptable = np.empty((len_cl_grp, len_cl_grp), dtype=int)
-    for i in range(len_cl_grp):
-        for j in range(len_cl_grp):
-            # Reversed because column j is applied to row i
-            net_cliff = (np.dot(Clifford_group[j], Clifford_group[i]))
-            net_cliff_id = [(net_cliff == cliff).all() for cliff in
-                            Clifford_group].index(True)
-            clifford_lookuptable[i, j] = net_cliff_id
-    return clifford_lookuptable
-
-# Lookuptable based on representation of the clifford group used in this file
-clifford_lookuptable = generate_clifford_lookuptable(Clifford_group)
+#######################################################
+# Paulis and tableaus                                 #
+#######################################################
+# bit q of x (z) is the X (Z) component on qubit q.
+# A tableau is a tuple with the images of X_q0, X_q1, Z_q0 and Z_q1, every
+# image is a Pauli (x, z, r).
+_generators = ((1, 0, 0), (2, 0, 0), (0, 1, 0), (0, 2, 0))
+identity_tableau = _generators
+
+
+def _popcount(a):
+    return bin(a).count('1')
+
+
+def pauli_mult(p1, p2):
+    '''
+    Product p1*p2 of two Paulis.
+    '''
+    x1, z1, r1 = p1
+    x2, z2, r2 = p2
+    # Z^z1 X^x2 = (-1)^(z1.x2) X^x2 Z^z1
+    return (x1 ^ x2, z1 ^ z2, (r1 + r2 + 2*_popcount(z1 & x2)) % 4)
+
+
+def apply_tableau(tableau, pauli):
+    '''
+    Returns the image of a Pauli under the clifford described by tableau.
+    '''
+    x, z, r = pauli
+    result = (0, 0, r)
+    for q in range(2):
+        if x >> q & 1:
+            result = pauli_mult(result, tableau[q])
+        if z >> q & 1:
+            result = pauli_mult(result, tableau[2+q])
+    return result
+
+
+def compose_tableaus(tableau_a, tableau_b):
+    '''
+    Tableau of the clifford corresponding to first applying a and then b.
+    '''
+    return tuple(apply_tableau(tableau_b, img) for img in tableau_a)
+
+
+def _symplectic_matrix(tableau):
+    '''
+    4x4 binary matrix, column k contains the (x0, x1, z0, z1) bits of the
+    image of generator k.
+    '''
+    return np.array([[img[0] & 1, img[0] >> 1 & 1, img[1] & 1, img[1] >> 1]
+                     for img in tableau], dtype=int).T
+
+
+def _gf2_inv(matrix):
+    '''
+    Inverse of a binary matrix over GF(2).
+    '''
+    n = len(matrix)
+    aug = np.concatenate([matrix % 2, np.eye(n, dtype=int)], axis=1)
+    for col in range(n):
+        pivot = col + np.nonzero(aug[col:, col])[0][0]
+        aug[[col, pivot]] = aug[[pivot, col]]
+        for row in range(n):
+            if row != col and aug[row, col]:
+                aug[row] ^= aug[col]
+    return aug[:, n:]
+
+
+def _hermitian_pauli(x, z, sign=0):
+    # X^x Z^z has a factor i for every qubit with a Y component
+    return (x, z, (_popcount(x & z) + 2*sign) % 4)
+
+
+def _pauli_from_bits(bits, sign=0):
+    return _hermitian_pauli(int(bits[0]) | int(bits[1]) << 1,
+                            int(bits[2]) | int(bits[3]) << 1, sign)
+
+
+def invert_tableau(tableau):
+    '''
+    Tableau of the inverse clifford.
+    '''
+    M = _symplectic_matrix(tableau)
+    M_inv = _gf2_inv(M)
+    unsigned = tuple(_pauli_from_bits(M_inv[:, k]) for k in range(4))
+    # signs of unsigned(tableau(g_k)), flipping the sign of image j flips
+    # the sign of image k of the composition if M[j, k] == 1
+    signs = np.array([apply_tableau(unsigned, img)[2] // 2
+                      for img in tableau], dtype=int)
+    flips = np.dot(_gf2_inv(M.T), signs) % 2
+    return tuple(_pauli_from_bits(M_inv[:, k], flips[k]) for k in range(4))
+
+
+def encode_tableau(tableau):
+    '''
+    Encodes a tableau as a 20 bit integer, 5 bits per image.
+    '''
+    code = 0
+    for k, (x, z, r) in enumerate(tableau):
+        sign = ((r - _popcount(x & z)) % 4) // 2
+        code |= (x | z << 2 | sign << 4) << (5*k)
+    return code
+
+
+def decode_tableau(code):
+    return tuple(_hermitian_pauli(code >> (5*k) & 3, code >> (5*k+2) & 3,
+                                  code >> (5*k+4) & 1) for k in range(4))
+
+
+#######################################################
+# Native gates                                        #
+#######################################################
+_pauli_labels = [None, (1, 0), (1, 1), (0, 1)]  # (x, z) of X, Y and Z
+
+
+def single_qubit_tableau(clifford_idx, qubit):
+    '''
+    Tableau of single qubit clifford clifford_idx (as in clifford_group)
+    acting on qubit (0 or 1).
+    Uses the Pauli transfer matrix of the clifford, column j of which
+    contains the image of Pauli j in the (I, X, Y, Z) basis.
+    '''
+    ptm = np.round(Clifford_group[clifford_idx]).astype(int)
+    images = []
+    for j in [1, 3]:  # X and Z
+        i = np.nonzero(ptm[:, j])[0][0]
+        x, z = _pauli_labels[i]
+        images.append(_hermitian_pauli(x << qubit, z << qubit,
+                                       int(ptm[i, j] < 0)))
+    tableau = list(identity_tableau)
+    tableau[qubit] = images[0]
+    tableau[2+qubit] = images[1]
+    return tuple(tableau)
+
+
+# CZ maps X_q0 -> X_q0 Z_q1 and X_q1 -> Z_q0 X_q1
+CZ_tableau = (_hermitian_pauli(1, 2), _hermitian_pauli(2, 1),
+              (0, 1, 0), (0, 2, 0))
+
+_single_qubit_gates = {gate[0]: idx for idx, gate in
+                       enumerate(gate_decomposition) if len(gate) == 1}
+
+
+def gate_tableau(gate):
+    '''
+    Tableau of a native gate, either 'CZ' or a single qubit gate from the
+    single qubit gate decomposition with a qubit suffix, e.g. 'X90 q1'.
+    '''
+    if gate == 'CZ':
+        return CZ_tableau
+    name, qubit = gate.split(' ')
+    return single_qubit_tableau(_single_qubit_gates[name],
+                                int(qubit.lstrip('q')))
+
+
+def decomposition_tableau(gates):
+    '''
+    Tableau of a list of native gates applied in order.
+    '''
+    tableau = identity_tableau
+    for gate in gates:
+        tableau = compose_tableaus(tableau, gate_tableau(gate))
+    return tableau
+
+
+#######################################################
+# Lookup tables                                       #
+#######################################################
+
+def generate_tables():
+    '''
+    Returns the lookup tables of the two-qubit clifford group:
+        codes:      tableau code of every clifford index
+        indices:    clifford index of every tableau code (-1 if the code
+                    does not correspond to a valid clifford)
+        inverses:   index of the inverse of every clifford
+    '''
+    gate_cache = {}
+    codes = np.empty(nr_cliffords_2Q, dtype=np.int32)
+    for idx, gates in enumerate(gate_decomposition_2Q):
+        tableau = identity_tableau
+        for gate in gates:
+            if gate not in gate_cache:
+                gate_cache[gate] = gate_tableau(gate)
+            tableau = compose_tableaus(tableau, gate_cache[gate])
+        codes[idx] = encode_tableau(tableau)
+
+    indices = -np.ones(2**20, dtype=np.int16)
+    indices[codes] = np.arange(nr_cliffords_2Q)
+    if len(np.unique(codes)) != nr_cliffords_2Q:
+        raise ValueError('Two-qubit clifford decomposition is not unique')
+    inverses = np.array(
+        [indices[encode_tableau(invert_tableau(decode_tableau(code)))]
+         for code in codes], dtype=np.int16)
+    return {'codes': codes, 'indices': indices, 'inverses': inverses}
+
+
+def get_tables():
+    '''
+    Returns the lookup tables, these are loaded from table_cache_path or
+    generated (and saved) on first use.
+    '''
+    if not _tables:
+        try:
+            with np.load(table_cache_path) as f:
+                tables = {k: f[k] for k in ['codes', 'indices', 'inverses']}
+        except (OSError, KeyError, ValueError):
+            tables = generate_tables()
+            try:
+                os.makedirs(os.path.dirname(table_cache_path),
+                            exist_ok=True)
+                np.savez(table_cache_path, **tables)
+            except OSError as e:
+                logging.warning('Could not save two-qubit clifford '
+                                'tables: {}'.format(e))
+        _tables.update(tables)
+    return _tables
+
+
+def clifford_tableau(cl):
+    return decode_tableau(int(get_tables()['codes'][cl]))
+
+
+def clifford_index(tableau):
+    return int(get_tables()['indices'][encode_tableau(tableau)])
+
+
+#######################################################
+# Group operations on clifford indices                #
+#######################################################
+
+def compose(cl_a, cl_b):
+    '''
+    Index of the clifford corresponding to first applying cl_a and then
+    cl_b.
+    '''
+    return clifford_index(compose_tableaus(clifford_tableau(cl_a),
+                                           clifford_tableau(cl_b)))
+
+
+def inverse(cl):
+    return int(get_tables()['inverses'][cl])
+
+
+def calculate_net_clifford(cliffords):
+    '''
+    Net clifford of a list of two-qubit cliffords applied in order.
+    '''
+    tableau = identity_tableau
+    for cl in cliffords:
+        tableau = compose_tableaus(tableau, clifford_tableau(int(cl)))
+    return clifford_index(tableau)
+
+
+def calculate_recovery_clifford(cl_in, desired_cl=0):
+    '''
+    Clifford that has to be applied after cl_in to make the net operation
+    correspond to desired_cl.
+    '''
+    return compose(inverse(cl_in), desired_cl)
+
+
+def random_cliffords(n_cl, rng=np.random):
+    '''
+    Uniformly samples n_cl two-qubit cliffords.
+    '''
+    return rng.randint(0, nr_cliffords_2Q, int(n_cl))
+
+
+def decompose_clifford_seq(clifford_sequence):
+    '''
+    Decomposes a sequence of two-qubit cliffords into native gates.
+    '''
+    decomposed_seq = []
+    for cl in clifford_sequence:
+        decomposed_seq.extend(gate_decomposition_2Q[cl])
+    return decomposed_seq
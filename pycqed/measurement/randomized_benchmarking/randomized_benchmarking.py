@@ -4,6 +4,22 @@ from pycqed.measurement.randomized_benchmarking.clifford_group import(
 
 from pycqed.measurement.randomized_benchmarking.clifford_decompositions \
     import(gate_decomposition)
+from pycqed.measurement.randomized_benchmarking import \
+    clifford_group_two_qubits as c2q
+
+
+def generate_recovery_table(lookuptable):
+    '''
+    Inverts the rows of the lookuptable, the value at (i, j) is the
+    clifford that has to be applied to clifford i to obtain clifford j.
+    '''
+    recovery_table = np.empty_like(lookuptable)
+    cols = np.arange(lookuptable.shape[1])
+    for i, row in enumerate(lookuptable):
+        recovery_table[i, row] = cols
+    return recovery_table
+
+clifford_recovery_table = generate_recovery_table(clifford_lookuptable)
 
 
 def calculate_net_clifford(cliffords):
@@ -16,12 +32,49 @@ def calculate_net_clifford(cliffords):
         the reverse of what it would be in a chained dot product.
 
     '''
-    net_cl = 0  # assumes element 0 is the Identity
-    for i in range(len(cliffords)):
-        # int is added to avoid deprecation warning, input is assumed to
-        # be int in the first place
-        net_cl = clifford_lookuptable[net_cl, int(cliffords[i])]
-    return net_cl
+    # int is added to avoid deprecation warning, input is assumed to
+    # be int in the first place
+    return int(calculate_net_cliffords(np.asarray(cliffords, dtype=int)))
+
+
+def calculate_cumulative_net_cliffords(cliffords):
+    '''
+    Calculates the net-cliffords of all prefixes of the sequences of
+    cliffords along the last axis, element [..., i] is the net-clifford of
+    cliffords[..., :i+1].
+
+    Uses a (Hillis-Steele) prefix scan over the clifford lookuptable, which
+    requires log2(len) vectorized table lookups instead of a loop over the
+    sequence.
+    '''
+    net_cls = np.array(cliffords, dtype=int)
+    n_cl = net_cls.shape[-1]
+    k = 1
+    while k < n_cl:
+        # the earlier cliffords are the row (applied first)
+        net_cls[..., k:] = clifford_lookuptable[net_cls[..., :-k],
+                                                net_cls[..., k:]]
+        k *= 2
+    return net_cls
+
+
+def calculate_net_cliffords(cliffords):
+    '''
+    Vectorized version of calculate_net_clifford, calculates the net-clifford
+    of the sequences of cliffords along the last axis.
+    '''
+    cliffords = np.asarray(cliffords, dtype=int)
+    if cliffords.shape[-1] == 0:
+        return np.zeros(cliffords.shape[:-1], dtype=int)
+    # pairwise reduction, the identity (0) is used to pad odd lengths
+    while cliffords.shape[-1] > 1:
+        if cliffords.shape[-1] % 2:
+            cliffords = np.concatenate(
+                [cliffords, np.zeros(cliffords.shape[:-1] + (1, ),
+                                     dtype=int)], axis=-1)
+        cliffords = clifford_lookuptable[cliffords[..., 0::2],
+                                         cliffords[..., 1::2]]
+    return cliffords[..., 0]
 
 
 def calculate_recovery_clifford(cl_in, desired_cl=0):
@@ -31,8 +84,10 @@ def calculate_recovery_clifford(cl_in, desired_cl=0):
 
     This operation should perform the inverse of calculate_net_clifford
     '''
-    row = list(clifford_lookuptable[cl_in])
-    return row.index(desired_cl)
+    recovery_cl = clifford_recovery_table[cl_in, desired_cl]
+    if np.ndim(recovery_cl) == 0:
+        return int(recovery_cl)
+    return recovery_cl
 
 
 def decompose_clifford_seq(clifford_sequence,
@@ -87,3 +142,72 @@ def randomized_benchmarking_sequence(n_cl, desired_net_cl=0,
 
     return rb_cliffords
 
+
+def randomized_benchmarking_sequences(nr_cliffords, nr_seeds=None,
+                                      seeds=None, desired_net_cl=0):
+    '''
+    Generates randomized benchmarking sequences for many seeds and sequence
+    lengths at once.
+
+    Args:
+        nr_cliffords (list of int): numbers of random cliffords in the
+            sequences (excluding the recovery clifford)
+        nr_seeds (int): number of random sequences per length, only used if
+            seeds is None
+        seeds (list of int): seeds for the random number generator. The
+            sequence for seed s and length n is identical to
+            randomized_benchmarking_sequence(n, desired_net_cl, seed=s)
+        desired_net_cl (int): net clifford of the sequences
+
+    Returns:
+        list containing for every number of cliffords n an int array of
+        shape (nr_seeds, n+1) with the sequences (rows) including the
+        recovery clifford.
+    '''
+    nr_cliffords = [int(n_cl) for n_cl in nr_cliffords]
+    if seeds is not None:
+        # RandomState draws the numbers sequentially, a sequence of n
+        # cliffords is the start of the longest sequence for the same seed.
+        max_cl = max(nr_cliffords + [0])
+        rb_cliffords = np.array(
+            [np.random.RandomState(seed).randint(0, 24, max_cl)
+             for seed in seeds], dtype=int).reshape(len(seeds), max_cl)
+        net_cls = calculate_cumulative_net_cliffords(rb_cliffords)
+        cliffords_per_length = [
+            (rb_cliffords[:, :n_cl],
+             net_cls[:, n_cl-1] if n_cl > 0 else
+             np.zeros(len(seeds), dtype=int))
+            for n_cl in nr_cliffords]
+    else:
+        if nr_seeds is None:
+            raise ValueError('Specify either nr_seeds or seeds')
+        cliffords_per_length = []
+        for n_cl in nr_cliffords:
+            rb_cliffords = np.random.randint(0, 24, (nr_seeds, n_cl))
+            cliffords_per_length.append(
+                (rb_cliffords, calculate_net_cliffords(rb_cliffords)))
+
+    rb_sequences = []
+    for rb_cliffords, net_cls in cliffords_per_length:
+        recovery_cls = clifford_recovery_table[net_cls, desired_net_cl]
+        rb_sequences.append(np.column_stack([rb_cliffords, recovery_cls]))
+    return rb_sequences
+
+
+def two_qubit_randomized_benchmarking_sequence(n_cl, desired_net_cl=0,
+                                               seed=None):
+    '''
+    Two-qubit equivalent of randomized_benchmarking_sequence, generates a
+    sequence of "n_cl" random two-qubit cliffords followed by a recovery
+    clifford. The cliffords are indices in the two-qubit clifford
+    decomposition (gate_decomposition_2Q), clifford 0 is the identity.
+    '''
+    if seed is None:
+        rb_cliffords = c2q.random_cliffords(n_cl)
+    else:
+        rb_cliffords = c2q.random_cliffords(n_cl,
+                                            np.random.RandomState(seed))
+    net_clifford = c2q.calculate_net_clifford(rb_cliffords)
+    recovery_clifford = c2q.calculate_recovery_clifford(
+        net_clifford, desired_net_cl)
+    return np.append(rb_cliffords, recovery_clifford)
@@ -58,6 +58,13 @@ class None_Sweep(Soft_Sweep):
         '''
         pass
 
+    def set_parameters(self, vals):
+        '''
+        Set the parameter for a batch of sweep points, used when the
+        detector supports batch evaluation.
+        '''
+        pass
+
 
 class QX_Sweep(Soft_Sweep):
 
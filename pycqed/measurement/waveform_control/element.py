@@ -4,9 +4,10 @@
 # modified by: Adriaan Rol
 
 import numpy as np
-from copy import deepcopy
+from copy import copy, deepcopy
 import pprint
 from . import pulsar
+from . import waveform_cache
 import logging
 
 
@@ -31,6 +32,9 @@ class Element:
         self.time_offset = kw.pop('time_offset', 0)
 
         self.ignore_delays = kw.pop('ignore_delays', False)
+        # waveforms of identical pulses and elements are looked up in
+        # waveform_cache.default_cache instead of being recomputed
+        self.use_waveform_cache = kw.pop('use_waveform_cache', True)
 
         self.pulses = {}
         self._channels = {}
@@ -163,7 +167,7 @@ class Element:
 
     def add(self, pulse, name=None, start=0,
             refpulse=None, refpoint='end', refpoint_new='start',
-            fixed_point_freq=None):
+            fixed_point_freq=None, copy_pulse=True):
         '''
         Function adds a pulse to the element, there are several options to set
         where in the element the pulse is added.
@@ -181,9 +185,12 @@ class Element:
                                                pulse used
         fixed_point_freq (float): if not None shifts all pulses so that
                                   this pulse is at a multiple of 1/fixed_point_freq
+        copy_pulse (bool)   : if False the pulse object itself is added
+                              instead of a deepcopy
 
         '''
-        pulse = deepcopy(pulse)
+        if copy_pulse:
+            pulse = deepcopy(pulse)
         if name is None:
             name = self._auto_pulse_name(pulse.name)
 
@@ -291,30 +298,106 @@ class Element:
             self.pulses[pname].stop_offset
 
     # computing the numerical waveform
+    def _pulse_wf_key(self, pname):
+        """
+        Returns the key under which the waveforms of a pulse are cached.
+        The key contains the content of the pulse and everything that
+        determines the time values it is evaluated at.
+        Returns None if the pulse can not be cached.
+        """
+        pkey = waveform_cache.pulse_key(self.pulses[pname])
+        if pkey is None:
+            return None
+        return ('pulse', pkey, self._pulse_grid(pname))
+
+    def _pulse_grid(self, pname):
+        """
+        Returns a description of the time values a pulse is evaluated at.
+        """
+        if not self.global_time:
+            return (self.pulse_samples(pname), self.clock)
+        return (tuple((c, self.pulse_start_sample(pname, c),
+                       self.pulse_end_sample(pname, c),
+                       self.channel_delay(c))
+                      for c in self.pulses[pname].channels),
+                self.time_offset, self.clock)
+
+    def _pulse_tvals(self, pname, tvals):
+        """
+        Returns the time values the pulse is evaluated at, tvals are the
+        time values of the element.
+        """
+        if not self.global_time:
+            return tvals.copy()[:self.pulse_samples(pname)]
+        chan_tvals = {}
+        for c in self.pulses[pname].channels:
+            idx0 = self.pulse_start_sample(pname, c)
+            idx1 = self.pulse_end_sample(pname, c) + 1
+            chan_tvals[c] = np.round(tvals.copy()[idx0:idx1] +
+                                     self.channel_delay(c) +
+                                     self.time_offset,
+                                     pulsar.SIGNIFICANT_DIGITS)
+        return chan_tvals
+
+    def _pulse_wfs(self, pname, tvals, key=None):
+        """
+        Returns the waveforms of a pulse, key is the key under which they
+        are cached (None to disable caching).
+        """
+        return waveform_cache.default_cache.get_or_compute(
+            key, lambda: self.pulses[pname].get_wfs(
+                self._pulse_tvals(pname, tvals)))
+
+    def _element_wf_key(self, pulse_keys):
+        """
+        Returns the key under which the ideal waveforms of the element are
+        cached, None if one of the pulses can not be cached.
+        """
+        if None in pulse_keys.values():
+            return None
+        channels = tuple(sorted((c, self._channels[c]['offset'])
+                                for c in self._channels))
+        # the placement of the pulses depends on the channel delays
+        placements = tuple(
+            (pulse_keys[p],
+             tuple((c, self.pulse_start_sample(p, c), self.channel_delay(c))
+                   for c in self.pulses[p].channels))
+            for p in self.pulses)
+        return ('element', self.samples(), self.clock, channels, placements)
+
     def ideal_waveforms(self):
+        cache = waveform_cache.default_cache
+        if not (self.use_waveform_cache and cache.enabled):
+            return self._ideal_waveforms()
+
+        pulse_keys = {p: self._pulse_wf_key(p) for p in self.pulses}
+        key = self._element_wf_key(pulse_keys)
+        cached = cache.get(key) if key is not None else None
+        if cached is None:
+            cached = self._ideal_waveforms(pulse_keys)
+            if key is not None:
+                cache.put(key, cached)
+        # waveforms are modified in place by the methods using them
+        tvals, wfs = cached
+        return tvals.copy(), {c: wf.copy() for c, wf in wfs.items()}
+
+    def _ideal_waveforms(self, pulse_keys=None):
+        """
+        Computes the ideal waveforms, pulse_keys are the keys under which
+        the waveforms of the pulses are cached (None to disable caching).
+        """
+        if pulse_keys is None:
+            pulse_keys = {}
+
         wfs = {}
-        tvals = np.arange(self.samples())/self.clock
+        samples = self.samples()
+        tvals = np.arange(samples)/self.clock
 
         for c in self._channels:
-            wfs[c] = np.zeros(self.samples()) + self._channels[c]['offset']
+            wfs[c] = np.zeros(samples) + self._channels[c]['offset']
         # we first compute the ideal function values
         for p in self.pulses:
-            psamples = self.pulse_samples(p)
-            if not self.global_time:
-                pulse_tvals = tvals.copy()[:psamples]
-                pulsewfs = self.pulses[p].get_wfs(pulse_tvals)
-            else:
-                chan_tvals = {}
-                for c in self.pulses[p].channels:
-                    idx0 = self.pulse_start_sample(p, c)
-                    idx1 = self.pulse_end_sample(p, c) + 1
-                    c_tvals = np.round(tvals.copy()[idx0:idx1] +
-                                       self.channel_delay(c) +
-                                       self.time_offset,
-                                       pulsar.SIGNIFICANT_DIGITS)
-                    chan_tvals[c] = c_tvals
-
-                pulsewfs = self.pulses[p].get_wfs(chan_tvals)
+            pulsewfs = self._pulse_wfs(p, tvals, pulse_keys.get(p))
             for c in self.pulses[p].channels:
                 idx0 = self.pulse_start_sample(p, c)
                 idx1 = self.pulse_end_sample(p, c) + 1
@@ -340,12 +423,12 @@ class Element:
                 wfs[wf] = self.distorted_wfs[wf]
             # truncate all values that are out of bounds
             if self._channels[wf]['type'] == 'analog':
-                if max(wfs[wf]) > hi:
+                if np.max(wfs[wf]) > hi:
                     logging.warning('Clipping waveform {} > {}'.format(
-                                    max(wfs[wf]), hi))
-                if min(wfs[wf]) < lo:
+                                    np.max(wfs[wf]), hi))
+                if np.min(wfs[wf]) < lo:
                     logging.warning('Clipping waveform {} < {}'.format(
-                                    min(wfs[wf]), lo))
+                                    np.min(wfs[wf]), lo))
                 wfs[wf][wfs[wf] > hi] = hi
                 wfs[wf][wfs[wf] < lo] = lo
             elif self._channels[wf]['type'] == 'marker':
@@ -397,6 +480,97 @@ class Element:
 
         pprint.pprint(overview)
 
+class PulseTemplates:
+    """
+    Primitive pulses (e.g. the single qubit gates of a randomized
+    benchmarking sequence) that are shared by many elements.
+
+    The waveform of a primitive is rendered only once for every position
+    on the sample grid it is used at and is reused by all TemplateElements
+    that contain it. Because the modulation of most pulses is locked to
+    the absolute time, a waveform can not be moved to a different sample
+    without changing it.
+
+    pulses (dict)       : primitive pulse objects by name
+    pulse_pars (dict)   : optional pulse_pars by name, used for the timing
+                          when building elements (see multi_pulse_elt)
+    """
+
+    def __init__(self, pulses, pulse_pars=None):
+        self.pulses = pulses
+        self.pulse_pars = pulse_pars if pulse_pars is not None else {}
+        self._wfs = {}
+
+    def __contains__(self, name):
+        return name in self.pulses
+
+    def get_wfs(self, name, grid, tvals_func):
+        """
+        Returns the waveforms of primitive name evaluated on grid,
+        tvals_func() returns the time values to render them.
+        """
+        key = (name, grid)
+        wfs = self._wfs.get(key)
+        if wfs is None:
+            wfs = self.pulses[name].get_wfs(tvals_func())
+            self._wfs[key] = wfs
+        return wfs
+
+    def clear(self):
+        self._wfs.clear()
+
+
+class TemplateElement(Element):
+    """
+    Element that is assembled from the pre-rendered waveforms of
+    PulseTemplates. Other pulses can be added as usual.
+
+    Pulses are not moved after they are added (apart from using
+    fixed_point_freq), this allows the offset to be calculated only once.
+    """
+
+    def __init__(self, name, templates, **kw):
+        super().__init__(name, **kw)
+        self.templates = templates
+        self._template_names = {}
+        self._offset = None
+
+    def add_template(self, template, name=None, **kw):
+        """
+        Adds the primitive pulse template, takes the same arguments as add.
+        The primitive is not deepcopied.
+        """
+        pulse = copy(self.templates.pulses[template])
+        name = self.add(pulse, name=name, copy_pulse=False, **kw)
+        self._template_names[name] = template
+        return name
+
+    def offset(self):
+        if self.ignore_offset_correction:
+            return 0
+        if self._offset is None or self._offset[0] != len(self.pulses):
+            self._offset = (len(self.pulses), super().offset())
+        return self._offset[1]
+
+    def ideal_waveforms(self):
+        # the primitives are cached in the templates, the other pulses in
+        # the waveform cache
+        cache = waveform_cache.default_cache
+        if not (self.use_waveform_cache and cache.enabled):
+            return self._ideal_waveforms()
+        return self._ideal_waveforms(
+            {p: self._pulse_wf_key(p) for p in self.pulses
+             if p not in self._template_names})
+
+    def _pulse_wfs(self, pname, tvals, key=None):
+        template = self._template_names.get(pname)
+        if template is None:
+            return super()._pulse_wfs(pname, tvals, key)
+        return self.templates.get_wfs(
+            template, self._pulse_grid(pname),
+            lambda: self._pulse_tvals(pname, tvals))
+
+
 # Helper functions, previously part of the element object but moved outside
 # to be able to use them in other modules (eg higher level parts of the
 # sequencer)
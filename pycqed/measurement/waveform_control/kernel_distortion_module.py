@@ -1,4 +1,9 @@
 import numpy as np
+from scipy import linalg, signal
+
+# overlap-add convolution is only available in newer versions of scipy
+_convolve = getattr(signal, 'oaconvolve', signal.fftconvolve)
+
 
 def kernel_matrix_from_file(path, max_len=-1):
     """
@@ -8,14 +13,13 @@ def kernel_matrix_from_file(path, max_len=-1):
                                 0,       i< j
                     B_{i,j} =
                                 b_{i-j}, i>=j
+
+    The dense matrix requires O(N^2) memory, for long kernels use
+    kernel_vector_from_file together with apply_kernel instead.
     """
     kernelvec = np.loadtxt(path)[:max_len]
-    kernel = np.zeros((len(kernelvec), len(kernelvec)))
-    for i in range(len(kernelvec)):
-        for j in range(len(kernelvec)):
-            kernel[i, j] = kernelvec[i-j]
-    del(kernelvec)
-    return kernel
+    return linalg.toeplitz(kernelvec, np.zeros(len(kernelvec)))
+
 
 def kernel_from_list(kernel_path_list, max_len=-1):
     """
@@ -31,3 +35,101 @@ def kernel_from_list(kernel_path_list, max_len=-1):
     for m in matrices[1:]:
         kernel = np.dot(m, kernel)
     return kernel
+
+
+#######################################################
+# Impulse response representation of the kernels      #
+#######################################################
+"""
+The lower triangular Toeplitz matrices above are fully determined by their
+first column b, the impulse response of the correction. Multiplying such a
+matrix with a waveform is a (causal) convolution and the product of two
+such matrices is again of this form, with as first column the convolution
+of the impulse responses. The functions below work directly on the
+impulse responses, requiring O(N) memory and O(N log N) time instead of
+O(N^2) memory and O(N^3) time for the matrix products.
+"""
+
+
+def convolve(a, b):
+    """
+    Full convolution of a and b. Uses a direct convolution for short arrays
+    and an overlap-add/FFT convolution for long arrays.
+    """
+    if min(len(a), len(b)) < 64:
+        return np.convolve(a, b)
+    return _convolve(a, b)
+
+
+def is_identity_kernel(kernel):
+    """
+    Returns True if the kernel is a (zero padded) delta function, i.e.
+    convolving with it does not change a waveform.
+    """
+    return len(kernel) > 0 and kernel[0] == 1 and not np.any(kernel[1:])
+
+
+def kernel_vector_from_file(path, max_len=-1):
+    """
+    Loads the impulse response b stored in rows in a file, this is the
+    first column of the matrix returned by kernel_matrix_from_file.
+    """
+    return np.loadtxt(path)[:max_len]
+
+
+def compose_kernels(kernels, length=None):
+    """
+    Composes a list of impulse responses into a single impulse response
+    using FFT based convolution.
+
+    Args:
+        kernels (list of arrays): impulse responses, applied in order
+        length (int): length of the returned kernel, by default the length
+            of the longest kernel. The result is equal to the first column
+            of the product of the kernel matrices of this size.
+    """
+    kernels = [np.asarray(k, dtype=float) for k in kernels]
+    if length is None:
+        length = max(len(k) for k in kernels)
+    kernel = kernels[0][:length]
+    for k in kernels[1:]:
+        kernel = convolve(kernel, k[:length])[:length]
+    if len(kernel) < length:
+        kernel = np.concatenate([kernel, np.zeros(length-len(kernel))])
+    return kernel
+
+
+def kernel_vector_from_list(kernel_path_list, max_len=-1):
+    """
+    Impulse response equivalent of kernel_from_list, returns the first
+    column of the kernel matrix returned by kernel_from_list.
+    """
+    return compose_kernels([kernel_vector_from_file(p, max_len)
+                            for p in kernel_path_list])
+
+
+def apply_kernel(waveform, kernel):
+    """
+    Applies the kernel (impulse response) to a waveform.
+
+    Equivalent to np.dot(B, waveform) with B the kernel matrix of the same
+    length as the waveform, i.e. the kernel is truncated (or zero padded) to
+    the length of the waveform. For short kernels a direct convolution is
+    used, for long kernels an overlap-add/FFT convolution.
+    """
+    waveform = np.asarray(waveform, dtype=float)
+    kernel = np.asarray(kernel, dtype=float)[:len(waveform)]
+    if len(kernel) == 0 or len(waveform) == 0:
+        return np.zeros(len(waveform))
+    return convolve(kernel, waveform)[:len(waveform)]
+
+
+def matrix_from_kernel(kernel, length=None):
+    """
+    Returns the dense kernel matrix corresponding to an impulse response,
+    mainly useful to compare with the matrix based functions.
+    """
+    if length is None:
+        length = len(kernel)
+    kernel = np.concatenate([kernel, np.zeros(max(0, length-len(kernel)))])
+    return linalg.toeplitz(kernel[:length], np.zeros(length))
@@ -9,6 +9,7 @@
 # sequencing hardware i guess
 
 import time
+import hashlib
 import numpy as np
 import logging
 
@@ -185,6 +186,11 @@ class Pulsar:
         AND sequence information (i.e. nr of repetitions, event jumps etc)
         Advantage is that it's much faster, since sequence information is sent
         to the AWG in a single file.
+
+        kwargs:
+            deduplicate (bool): if True (default) waveforms with identical
+                content are packed and uploaded only once, all sequence
+                entries refer to the first waveform with that content.
         """
         old_timeout = self.AWG.timeout()
         self.AWG.timeout(max(180, old_timeout))
@@ -195,9 +201,15 @@ class Pulsar:
         loop = kw.pop('loop', True)
         allow_non_zero_first_point_on_trigger_wait = \
             kw.pop('allow_first_zero', False)
+        deduplicate = kw.pop('deduplicate', True)
         elt_cnt = len(elements)
         chan_ids = self.get_used_channel_ids()
         packed_waveforms = {}
+        # waveform name of the first waveform with a given content
+        unique_wfnames = {}
+        # maps names of duplicate waveforms to the uploaded waveform
+        wf_aliases = {}
+        bytes_saved = 0
 
         # Store offset settings to restore them after upload the seq
         # Note that this is the AWG setting offset, as distinct from the
@@ -252,6 +264,17 @@ class Pulsar:
                     else:
                         chan_wfs[sid] = np.zeros(element.samples())
 
+                if deduplicate:
+                    wf_hash = waveform_hash(chan_wfs[id],
+                                            chan_wfs[id+'_marker1'],
+                                            chan_wfs[id+'_marker2'])
+                    if wf_hash in unique_wfnames:
+                        wf_aliases[wfname] = unique_wfnames[wf_hash]
+                        bytes_saved += np.asarray(
+                            packed_waveforms[wf_aliases[wfname]]).nbytes
+                        continue
+                    unique_wfnames[wf_hash] = wfname
+
                 # Create wform files
                 packed_waveforms[wfname] = self.AWG.pack_waveform(
                     chan_wfs[id],
@@ -262,6 +285,11 @@ class Pulsar:
 
         if verbose:
             print("finished in %.2f seconds." % _t)
+        if deduplicate and verbose:
+            print("Uploading %d unique of %d waveforms (%.1f kB saved)"
+                  % (len(packed_waveforms),
+                     len(packed_waveforms) + len(wf_aliases),
+                     bytes_saved/1e3))
 
         # sequence programming
         _t0 = time.time()
@@ -301,7 +329,8 @@ class Pulsar:
             el_wfnames = []
             # add all wf names of channel
             for elt in sequence.elements:
-                el_wfnames.append(elt['wfname'] + '_%s' % id)
+                wfname = elt['wfname'] + '_%s' % id
+                el_wfnames.append(wf_aliases.get(wfname, wfname))
                 #  should the name include id nr?
             wfname_l.append(el_wfnames)
 
@@ -460,3 +489,16 @@ class Pulsar:
             offsets = {ch_name+'_offset': 0 for (ch_name, chan_dict) in self.channels.items()}
 
         return self.channels, offsets
+
+
+def waveform_hash(*wfs):
+    """
+    Returns a digest of the content of one or more waveforms, used to find
+    waveforms that only have to be uploaded once.
+    """
+    h = hashlib.sha1()
+    for wf in wfs:
+        wf = np.ascontiguousarray(wf)
+        h.update(str((wf.dtype.str, wf.shape)).encode())
+        h.update(wf.view(np.uint8))
+    return h.hexdigest()
@@ -14,15 +14,69 @@ class Sequence:
     they are available lies with the Pulsar. N.B. this means that
     Sequence.elements does not contain instances of the Element class, only
     names and meta-data.
+
+    The position of every element is kept in an index (name -> position)
+    such that checking the uniqueness of names and looking up goto and jump
+    targets does not require scanning all elements.
     """
 
     def __init__(self, name):
         self.name = name
 
         self.elements = []
+        self._positions = {}
 
         self.djump_table = None
 
+    @classmethod
+    def from_elements(cls, name, elements, **kw):
+        '''
+        Creates a sequence from a list of Element instances, the keyword
+        arguments are passed to append_element for every element.
+        '''
+        seq = cls(name)
+        seq.extend(elements, **kw)
+        return seq
+
+    def _element_positions(self):
+        '''
+        Returns the index name -> position of the elements. The index is
+        rebuilt if elements were inserted (not appended) or if the number
+        of elements changed because the list was modified directly.
+        '''
+        if (self._positions is None or
+                len(self._positions) != len(self.elements)):
+            self._positions = {elt['name']: i for i, elt in
+                               enumerate(self.elements)}
+        return self._positions
+
+    def _position(self, name):
+        '''
+        Returns the position of an element or None if it is not in the
+        sequence. Positions from the index are checked against the list of
+        elements, such that direct modifications of the list that keep its
+        length (e.g. replacing an element) are detected; a name that is not
+        in the index is only looked up again for element_index.
+        '''
+        pos = self._element_positions().get(name)
+        if pos is not None and self.elements[pos]['name'] != name:
+            self._positions = None
+            pos = self._element_positions().get(name)
+        return pos
+
+    def _insert_spec(self, elt, pos=None):
+        if self._position(elt['name']) is not None:
+            return False
+        positions = self._element_positions()
+        if pos is None or pos >= len(self.elements):
+            positions[elt['name']] = len(self.elements)
+            self.elements.append(elt)
+        else:
+            self.elements.insert(pos, elt)
+            # positions of the elements after pos have changed
+            self._positions = None
+        return True
+
     def _make_element_spec(self, name, wfname, repetitions, goto_target,
                            jump_target, trigger_wait):
 
@@ -40,19 +94,14 @@ class Sequence:
                        goto_target=None, jump_target=None, trigger_wait=False,
                        **kw):
 
-        for elt in self.elements:
-            if elt['name'] == name:
-                print('insert_element')
-                print(name)
-                print('Sequence names must be unique. Not added.')
-                return False
-
         elt = self._make_element_spec(name, wfname, repetitions, goto_target,
             jump_target, trigger_wait)
 
-        if pos == None:
-            pos = len(self.elements)
-        self.elements.insert(pos, elt)
+        if not self._insert_spec(elt, pos):
+            print('insert_element')
+            print(name)
+            print('Sequence names must be unique. Not added.')
+            return False
         return True
 
     def append(self, name, wfname, **kw):
@@ -65,8 +114,14 @@ class Sequence:
         return len(self.elements)
 
     def element_index(self, name, start_idx=1):
-        names = [self.elements[i]['name'] for i in range(len(self.elements))]
-        return names.index(name)+start_idx
+        pos = self._position(name)
+        if pos is None:
+            # the element may have been added to the list directly
+            self._positions = None
+            pos = self._element_positions().get(name)
+        if pos is None:
+            raise ValueError('{} is not in sequence'.format(name))
+        return pos+start_idx
 
     def set_djump(self, state):
         if state is True:
@@ -97,13 +152,18 @@ class Sequence:
         insertable_elt = self._make_element_spec(name, wfname, repetitions,
                                                  goto_target, jump_target,
                                                  trigger_wait)
-        for elt in self.elements:
-            if elt['name'] == insertable_elt['name']:
-                print('append_element')
-                print(element.name)
-                print('Sequence names must be unique. Not added.')
-                return False
-        if pos is None:
-            pos = len(self.elements)
-        self.elements.insert(pos, insertable_elt)
+        if not self._insert_spec(insertable_elt, pos):
+            print('append_element')
+            print(element.name)
+            print('Sequence names must be unique. Not added.')
+            return False
         return True
+
+    def extend(self, elements, **kw):
+        '''
+        Appends a list of Element instances, the keyword arguments are passed
+        to append_element for every element. Returns False if any of the
+        elements was not added because its name was not unique.
+        '''
+        added = [self.append_element(element, **kw) for element in elements]
+        return all(added)
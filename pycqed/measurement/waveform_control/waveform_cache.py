@@ -0,0 +1,178 @@
+# Content addressed cache for numerical waveforms.
+#
+# Waveforms of pulses and elements are fully determined by the class and
+# attributes of the pulses and by the sample grid (time values) they are
+# evaluated on. Sequences often contain many identical pulses and elements
+# (e.g. calibration points, Clifford pulses, readout pulses), these are
+# only computed once and looked up in the cache afterwards.
+
+import hashlib
+import numbers
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+
+class UnhashableParameter(TypeError):
+    pass
+
+
+def freeze(value):
+    """
+    Converts a (nested) parameter value to a hashable representation that
+    only depends on its content. Arrays are represented by a digest of
+    their data.
+
+    Raises UnhashableParameter for values of which the content can not be
+    determined (e.g. functions or arbitrary objects).
+    """
+    if value is None or isinstance(value, (bool, str, bytes)):
+        return value
+    if isinstance(value, numbers.Number):
+        if isinstance(value, np.generic):
+            return value.item()
+        return value
+    if isinstance(value, np.ndarray):
+        if value.dtype == object:
+            return ('ndarray', value.shape,
+                    tuple(freeze(v) for v in value.ravel()))
+        data = np.ascontiguousarray(value)
+        return ('ndarray', data.dtype.str, data.shape,
+                hashlib.sha1(data.view(np.uint8)).hexdigest())
+    if isinstance(value, (list, tuple)):
+        return (type(value).__name__, tuple(freeze(v) for v in value))
+    if isinstance(value, dict):
+        return ('dict', tuple(sorted((freeze(k), freeze(v))
+                                     for k, v in value.items())))
+    raise UnhashableParameter(
+        'Can not determine the content of {}'.format(type(value)))
+
+
+def pulse_key(pulse):
+    """
+    Returns a key describing the waveform generating content of a pulse,
+    i.e. its class and all attributes except for the name.
+    Returns None if the pulse has attributes that can not be hashed, such
+    pulses are not cached.
+    """
+    try:
+        params = tuple(sorted((k, freeze(v)) for k, v in vars(pulse).items()
+                              if k != 'name'))
+    except UnhashableParameter:
+        return None
+    cls = type(pulse)
+    return (cls.__module__, cls.__qualname__, params)
+
+
+def _nbytes(value):
+    if isinstance(value, np.ndarray):
+        return value.nbytes
+    if isinstance(value, dict):
+        return sum(_nbytes(v) for v in value.values())
+    if isinstance(value, (list, tuple)):
+        if len(value) > 0 and isinstance(value[0], numbers.Number):
+            return 8*len(value)
+        return sum(_nbytes(v) for v in value)
+    return 8
+
+
+class WaveformCache:
+    """
+    Least recently used cache of waveforms, bounded by the total number of
+    bytes of the stored arrays.
+
+    Values stored in the cache must not be modified, users of the cache
+    make a copy where needed.
+    """
+
+    def __init__(self, max_bytes=256e6):
+        self.max_bytes = max_bytes
+        self.enabled = True
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._nbytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get(self, key, default=None):
+        """
+        Returns the value stored under key, or default if it is not
+        in the cache. Counts as a hit or miss.
+        """
+        with self._lock:
+            try:
+                nbytes, value = self._entries[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        """
+        Stores value under key, evicting the least recently used entries
+        if the cache exceeds max_bytes.
+        """
+        nbytes = _nbytes(value)
+        if not self.enabled or nbytes > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                self._nbytes -= self._entries.pop(key)[0]
+            self._entries[key] = (nbytes, value)
+            self._nbytes += nbytes
+            while self._nbytes > self.max_bytes:
+                old_nbytes, _ = self._entries.popitem(last=False)[1]
+                self._nbytes -= old_nbytes
+                self.evictions += 1
+
+    def get_or_compute(self, key, func):
+        """
+        Returns the value stored under key, the value is computed using
+        func() and stored if it is not in the cache.
+        A key of None disables caching for this value.
+        """
+        if key is None or not self.enabled:
+            return func()
+        value = self.get(key)
+        if value is None:
+            value = func()
+            self.put(key, value)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._nbytes = 0
+
+    def reset_stats(self):
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def stats(self):
+        """
+        Returns a dict with the number of hits, misses and evictions and the
+        current size of the cache.
+        """
+        lookups = self.hits + self.misses
+        return {'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits/lookups if lookups else 0.,
+                'entries': len(self._entries),
+                'nbytes': self._nbytes,
+                'max_bytes': self.max_bytes}
+
+
+# cache shared by all elements
+default_cache = WaveformCache()
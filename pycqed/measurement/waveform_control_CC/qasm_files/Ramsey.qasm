@@ -0,0 +1,367 @@
+qubit q0 
+
+init_all
+X90 q0     
+I q0 4 
+R90_phi q0 0.0
+RO q0  
+
+init_all
+X90 q0     
+I q0 171 
+R90_phi q0 23.60655737704918
+RO q0  
+
+init_all
+X90 q0     
+I q0 337 
+R90_phi q0 47.21311475409836
+RO q0  
+
+init_all
+X90 q0     
+I q0 504 
+R90_phi q0 70.81967213114754
+RO q0  
+
+init_all
+X90 q0     
+I q0 670 
+R90_phi q0 94.42622950819673
+RO q0  
+
+init_all
+X90 q0     
+I q0 837 
+R90_phi q0 118.0327868852459
+RO q0  
+
+init_all
+X90 q0     
+I q0 1004 
+R90_phi q0 141.63934426229508
+RO q0  
+
+init_all
+X90 q0     
+I q0 1170 
+R90_phi q0 165.24590163934425
+RO q0  
+
+init_all
+X90 q0     
+I q0 1337 
+R90_phi q0 188.85245901639345
+RO q0  
+
+init_all
+X90 q0     
+I q0 1503 
+R90_phi q0 212.45901639344262
+RO q0  
+
+init_all
+X90 q0     
+I q0 1670 
+R90_phi q0 236.0655737704918
+RO q0  
+
+init_all
+X90 q0     
+I q0 1837 
+R90_phi q0 259.672131147541
+RO q0  
+
+init_all
+X90 q0     
+I q0 2003 
+R90_phi q0 283.27868852459017
+RO q0  
+
+init_all
+X90 q0     
+I q0 2170 
+R90_phi q0 306.88524590163934
+RO q0  
+
+init_all
+X90 q0     
+I q0 2336 
+R90_phi q0 330.4918032786885
+RO q0  
+
+init_all
+X90 q0     
+I q0 2503 
+R90_phi q0 354.0983606557377
+RO q0  
+
+init_all
+X90 q0     
+I q0 2670 
+R90_phi q0 17.704918032786907
+RO q0  
+
+init_all
+X90 q0     
+I q0 2836 
+R90_phi q0 41.31147540983608
+RO q0  
+
+init_all
+X90 q0     
+I q0 3003 
+R90_phi q0 64.91803278688525
+RO q0  
+
+init_all
+X90 q0     
+I q0 3169 
+R90_phi q0 88.52459016393442
+RO q0  
+
+init_all
+X90 q0     
+I q0 3336 
+R90_phi q0 112.13114754098359
+RO q0  
+
+init_all
+X90 q0     
+I q0 3503 
+R90_phi q0 135.73770491803276
+RO q0  
+
+init_all
+X90 q0     
+I q0 3669 
+R90_phi q0 159.344262295082
+RO q0  
+
+init_all
+X90 q0     
+I q0 3836 
+R90_phi q0 182.95081967213116
+RO q0  
+
+init_all
+X90 q0     
+I q0 4002 
+R90_phi q0 206.55737704918033
+RO q0  
+
+init_all
+X90 q0     
+I q0 4169 
+R90_phi q0 230.1639344262295
+RO q0  
+
+init_all
+X90 q0     
+I q0 4336 
+R90_phi q0 253.77049180327867
+RO q0  
+
+init_all
+X90 q0     
+I q0 4502 
+R90_phi q0 277.37704918032784
+RO q0  
+
+init_all
+X90 q0     
+I q0 4669 
+R90_phi q0 300.983606557377
+RO q0  
+
+init_all
+X90 q0     
+I q0 4835 
+R90_phi q0 324.5901639344262
+RO q0  
+
+init_all
+X90 q0     
+I q0 5002 
+R90_phi q0 348.19672131147536
+RO q0  
+
+init_all
+X90 q0     
+I q0 5169 
+R90_phi q0 11.803278688524642
+RO q0  
+
+init_all
+X90 q0     
+I q0 5335 
+R90_phi q0 35.40983606557381
+RO q0  
+
+init_all
+X90 q0     
+I q0 5502 
+R90_phi q0 59.016393442622984
+RO q0  
+
+init_all
+X90 q0     
+I q0 5668 
+R90_phi q0 82.62295081967216
+RO q0  
+
+init_all
+X90 q0     
+I q0 5835 
+R90_phi q0 106.22950819672133
+RO q0  
+
+init_all
+X90 q0     
+I q0 6002 
+R90_phi q0 129.8360655737705
+RO q0  
+
+init_all
+X90 q0     
+I q0 6168 
+R90_phi q0 153.44262295081967
+RO q0  
+
+init_all
+X90 q0     
+I q0 6335 
+R90_phi q0 177.04918032786884
+RO q0  
+
+init_all
+X90 q0     
+I q0 6501 
+R90_phi q0 200.655737704918
+RO q0  
+
+init_all
+X90 q0     
+I q0 6668 
+R90_phi q0 224.26229508196718
+RO q0  
+
+init_all
+X90 q0     
+I q0 6835 
+R90_phi q0 247.86885245901635
+RO q0  
+
+init_all
+X90 q0     
+I q0 7001 
+R90_phi q0 271.4754098360655
+RO q0  
+
+init_all
+X90 q0     
+I q0 7168 
+R90_phi q0 295.0819672131148
+RO q0  
+
+init_all
+X90 q0     
+I q0 7334 
+R90_phi q0 318.688524590164
+RO q0  
+
+init_all
+X90 q0     
+I q0 7501 
+R90_phi q0 342.29508196721304
+RO q0  
+
+init_all
+X90 q0     
+I q0 7668 
+R90_phi q0 5.901639344262321
+RO q0  
+
+init_all
+X90 q0     
+I q0 7834 
+R90_phi q0 29.50819672131138
+RO q0  
+
+init_all
+X90 q0     
+I q0 8001 
+R90_phi q0 53.11475409836066
+RO q0  
+
+init_all
+X90 q0     
+I q0 8167 
+R90_phi q0 76.72131147540995
+RO q0  
+
+init_all
+X90 q0     
+I q0 8334 
+R90_phi q0 100.327868852459
+RO q0  
+
+init_all
+X90 q0     
+I q0 8501 
+R90_phi q0 123.93442622950829
+RO q0  
+
+init_all
+X90 q0     
+I q0 8667 
+R90_phi q0 147.54098360655735
+RO q0  
+
+init_all
+X90 q0     
+I q0 8834 
+R90_phi q0 171.14754098360663
+RO q0  
+
+init_all
+X90 q0     
+I q0 9000 
+R90_phi q0 194.7540983606557
+RO q0  
+
+init_all
+X90 q0     
+I q0 9167 
+R90_phi q0 218.36065573770497
+RO q0  
+
+init_all
+X90 q0     
+I q0 9334 
+R90_phi q0 241.96721311475403
+RO q0  
+
+init_all
+X90 q0     
+I q0 9500 
+R90_phi q0 265.5737704918033
+RO q0  
+
+init_all
+X90 q0     
+I q0 9667 
+R90_phi q0 289.1803278688524
+RO q0  
+
+init_all
+X90 q0     
+I q0 9833 
+R90_phi q0 312.78688524590166
+RO q0  
+
+init_all
+X90 q0     
+I q0 10000 
+R90_phi q0 336.3934426229507
+RO q0  
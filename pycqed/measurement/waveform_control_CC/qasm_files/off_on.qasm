@@ -0,0 +1,8 @@
+qubit q0 
+
+init_all
+RO q0  
+
+init_all
+X180 q0     # On 
+RO q0  
@@ -2,6 +2,8 @@ from pycqed.utilities.general import mopen
 from os.path import join, dirname, basename, splitext
 from copy import deepcopy
 from pycqed.measurement.waveform_control_CC import operation_prep as opf
+from pycqed.instrument_drivers.physical_instruments._controlbox import \
+    Assembler
 
 base_asm_path = join(dirname(__file__), 'micro_instruction_files')
 
@@ -15,6 +17,84 @@ preamble = ('mov r0, 20000   # r0 stores the cycle time , 100 us \n' +
 ending = 'beq r14, r14, Exp_Start       # Infinite loop'
 
 
+def read_qasm(qasm):
+    """
+    Args:
+        qasm: (str or list) qasm text or list of qasm lines/operations,
+            e.g. ['qubit q0', 'init_all', 'X180 q0', 'RO q0']
+    returns:
+        list of qasm lines with the comments and whitespace removed and
+        empty lines skipped
+    """
+    if isinstance(qasm, str):
+        qasm = qasm.splitlines()
+    lines = []
+    for line in qasm:
+        # Make lines interpretable
+        line = line.split('#', 1)[0]  # remove comments
+        line = line.strip(' \t\n\r')  # remove whitespace
+        if (len(line) == 0):  # skip empty line and comment
+            continue
+        lines.append(line)
+    return lines
+
+
+def read_qasm_file(qasm_filepath):
+    with open(qasm_filepath) as qasm_file:
+        return read_qasm(qasm_file)
+
+
+def qasm_to_instructions(qasm, operation_dict):
+    """
+    Translates qasm to a list of (multi line) instruction strings, the
+    in-memory version of qasm_to_asm.
+
+    Args:
+        qasm: (str or list) qasm text or list of qasm lines, see read_qasm
+        operation_dict: (dict) see qasm_to_asm
+    returns:
+        list of instructions, the preamble and ending are not included
+    """
+    # The lookup is built once, commands without an argument map to
+    # their instruction directly.
+    commands = set(operation_dict.keys()) | {'qubit'}
+    # instructions of operations with an argument, per (base_op, arg)
+    arg_instructions = {}
+
+    qubits = []  # the qubits that were defined
+    instructions = []
+    for line in read_qasm(qasm):
+        elts = line.split()
+        # Interpret qasm elements
+        if elts[0] == 'qubit':
+            qubits.append(elts[1])
+        elif line in commands:
+            instructions.append(operation_dict[line]['instruction'])
+        # two qubit operation or operation with arg
+        elif len(elts) > 2 and elts[0]+' '+elts[1] in commands:
+            base_op = elts[0]+' '+elts[1]
+            key = (base_op, elts[2])
+            if key not in arg_instructions:
+                # single qubit op with argument
+                if 'instruction' in operation_dict[base_op].keys():
+                    base_ins = operation_dict[base_op]['instruction']
+                    # string formatting is a constraint now but maybe we can
+                    # come up with something smarter
+                    if isinstance(base_ins, str):
+                        arg_instructions[key] = base_ins.format(elts[2])
+                    else:
+                        arg_instructions[key] = base_ins(elts[2])
+                else:  # no support yet for multi qubit ops with arguments
+                    raise NotImplementedError(
+                        'Multi qubit ops with args: "{}"'.format(line))
+            instructions.append(arg_instructions[key])
+        else:
+            raise ValueError(
+                'Command "{}" not recognized, must be in {}'.format(
+                    elts[0], sorted(commands)))
+    return instructions
+
+
 def qasm_to_asm(qasm_filepath, operation_dict):
     """
     Args:
@@ -39,82 +119,66 @@ def qasm_to_asm(qasm_filepath, operation_dict):
     """
     filename = splitext(basename(qasm_filepath))[0]
     asm_filepath = join(base_asm_path, filename+'.qumis')
-    asm_file = mopen(asm_filepath, mode='w')
-    asm_file.writelines(preamble)
+    instructions = qasm_to_instructions(read_qasm_file(qasm_filepath),
+                                        operation_dict)
+    return write_asm_file(asm_filepath, instructions)
 
-    with open(qasm_filepath) as qasm_file:
-        qubits = []  # the qubits that were defined
-        for line in qasm_file:
-            # Make lines interpretable
-            line = line.split('#', 1)[0]  # remove comments
-            line = line.strip(' \t\n\r')  # remove whitespace
-            if (len(line) == 0):  # skip empty line and comment
-                continue
-            elts = line.split()
-            # for single qubit gates that have an argument
-            if len(elts) > 1:
-                base_op = elts[0]+' '+elts[1]
-
-            # Interpret qasm elements
-            commands = list(operation_dict.keys()) + ['qubit']
-            if elts[0] == 'qubit':
-                qubits.append(elts[1])
-
-            elif (line in commands):
-                instruction = operation_dict[line]['instruction']
-                asm_file.writelines(instruction)
-            # two qubit operation or operation with arg
-            elif base_op in commands:
-                # single qubit op with argument
-                if 'instruction' in operation_dict[base_op].keys():
-                    base_ins = operation_dict[base_op]['instruction']
-                    # string formatting is a constraint now but maybe we can
-                    # come up with something smarter
-                    if isinstance(base_ins, str):
-                        instruction = base_ins.format(elts[2])
-                    else:
-                        instruction = base_ins(elts[2])
-                else:  # no support yet for multi qubit ops with arguments
-                    raise NotImplementedError(
-                        'Multi qubit ops with args: "{}"'.format(line))
-                asm_file.writelines(instruction)
-            else:
-                raise ValueError(
-                    'Command "{}" not recognized, must be in {}'.format(
-                        elts[0], commands))
 
+def write_asm_file(asm_filepath, instructions):
+    asm_file = mopen(asm_filepath, mode='w')
+    asm_file.writelines(preamble)
+    asm_file.writelines(instructions)
     asm_file.writelines(ending)
     asm_file.close()
     return asm_file
 
 
-def extract_required_operations(qasm_filepath):
+def compile_qasm(qasm, operation_dict, asm_filepath=None, use_cache=True):
+    """
+    Compiles qasm to the instructions that can be loaded in the CBox
+    without writing intermediate files.
+
+    Args:
+        qasm: (str or list) qasm text or list of qasm lines/operations,
+            see read_qasm. Use read_qasm_file for a qasm file.
+        operation_dict: (dict) see qasm_to_asm
+        asm_filepath: (str) if specified the asm is also written to this
+            file, intended for debugging only.
+        use_cache: (bool) use the cache of the assembler
+    returns:
+        list of 32-bit instructions
+    """
+    instructions = qasm_to_instructions(qasm, operation_dict)
+    if asm_filepath is not None:
+        write_asm_file(asm_filepath, instructions)
+    program = preamble + ''.join(instructions) + ending
+    return Assembler.assemble(program, use_cache=use_cache)
+
+
+def extract_required_operations(qasm):
         """
         Args:
-            qasm_filepath: (str) location of the qasm file to read
+            qasm: (str or list) location of the qasm file to read or
+                list of qasm lines, see read_qasm
         returns:
             list containing of all the used operations with args
         """
-        filename = splitext(basename(qasm_filepath))[0]
-        asm_filepath = join(base_asm_path, filename+'.asm')
-        asm_file = mopen(asm_filepath, mode='w')
-        asm_file.writelines(preamble)
+        if isinstance(qasm, str):
+            lines = read_qasm_file(qasm)
+        else:
+            lines = read_qasm(qasm)
 
         qubits = []  # the qubits that were defined
         operations = []
-        with open(qasm_filepath) as qasm_file:
-            for line in qasm_file:
-                # Make lines interpretable
-                line = line.split('#', 1)[0]  # remove comments
-                line = line.strip(' \t\n\r')  # remove whitespace
-                if (len(line) == 0):  # skip empty line and comment
-                    continue
-                elts = line.split()
-                # special command: a line that defines a qubit
-                if elts[0] == 'qubit':
-                    qubits.append(elts[1])
-                elif line not in operations:
-                    operations.append(line)
+        seen = set()
+        for line in lines:
+            elts = line.split()
+            # special command: a line that defines a qubit
+            if elts[0] == 'qubit':
+                qubits.append(elts[1])
+            elif line not in seen:
+                seen.add(line)
+                operations.append(line)
         return operations
 
 
@@ -12,57 +12,69 @@ from pycqed.measurement.randomized_benchmarking import randomized_benchmarking a
 base_qasm_path = join(dirname(__file__), 'qasm_files')
 
 
+def _write_qasm(filename, qasm_lines, write_file=True):
+    '''
+    Writes the qasm lines to filename and returns the (closed) file. If
+    write_file is False the lines are returned instead, these can be
+    compiled in memory using qasm_to_asm.compile_qasm.
+    '''
+    if not write_file:
+        return ''.join(qasm_lines).splitlines()
+    qasm_file = mopen(filename, mode='w')
+    qasm_file.writelines(qasm_lines)
+    qasm_file.close()
+    return qasm_file
+
+
 def T1(qubit_name, times, clock_cycle=5e-9,
-       cal_points=True):
+       cal_points=True, write_file=True):
     #
     clocks = np.round(times/clock_cycle)
     filename = join(base_qasm_path, 'T1.qasm')
-    qasm_file = mopen(filename, mode='w')
-    qasm_file.writelines('qubit {} \n'.format(qubit_name))
+    qasm_lines = []
+    qasm_lines.append('qubit {} \n'.format(qubit_name))
     for i, cl in enumerate(clocks):
-        qasm_file.writelines('\ninit_all\n')
+        qasm_lines.append('\ninit_all\n')
         if cal_points and (i == (len(clocks)-4) or
                            i == (len(clocks)-3)):
-            qasm_file.writelines('RO {}  \n'.format(qubit_name))
+            qasm_lines.append('RO {}  \n'.format(qubit_name))
         elif cal_points and (i == (len(clocks)-2) or
                              i == (len(clocks)-1)):
-            qasm_file.writelines('X180 {} \n'.format(qubit_name))
-            qasm_file.writelines('RO {}  \n'.format(qubit_name))
+            qasm_lines.append('X180 {} \n'.format(qubit_name))
+            qasm_lines.append('RO {}  \n'.format(qubit_name))
         else:
-            qasm_file.writelines('X180 {}     # exciting pi pulse\n'.format(
-                                 qubit_name))
-            qasm_file.writelines('I {} {:d} \n'.format(qubit_name, int(cl)))
-            qasm_file.writelines('RO {}  \n'.format(qubit_name))
-    qasm_file.close()
-    return qasm_file
+            qasm_lines.append('X180 {}     # exciting pi pulse\n'.format(
+                              qubit_name))
+            qasm_lines.append('I {} {:d} \n'.format(qubit_name, int(cl)))
+            qasm_lines.append('RO {}  \n'.format(qubit_name))
+    return _write_qasm(filename, qasm_lines, write_file)
 
 
 def flipping_seq(qubit_name, number_of_flips, clock_cycle=5e-9,
-                 equator=False, cal_points=True):
+                 equator=False, cal_points=True, write_file=True):
     filename = join(base_qasm_path, 'Flipping.qasm')
-    qasm_file = mopen(filename, mode='w')
-    qasm_file.writelines('qubit {} \n'.format(qubit_name))
+    qasm_lines = []
+    qasm_lines.append('qubit {} \n'.format(qubit_name))
     for i, n in enumerate(number_of_flips):
-        qasm_file.writelines('\ninit_all\n')
+        qasm_lines.append('\ninit_all\n')
         if cal_points and (i == (len(number_of_flips)-4) or
                            i == (len(number_of_flips)-3)):
-            qasm_file.writelines('RO {}  \n'.format(qubit_name))
+            qasm_lines.append('RO {}  \n'.format(qubit_name))
         elif cal_points and (i == (len(number_of_flips)-2) or
                              i == (len(number_of_flips)-1)):
-            qasm_file.writelines('X180 {} \n'.format(qubit_name))
-            qasm_file.writelines('RO {}  \n'.format(qubit_name))
+            qasm_lines.append('X180 {} \n'.format(qubit_name))
+            qasm_lines.append('RO {}  \n'.format(qubit_name))
         else:
             if equator:
-                qasm_file.writelines('X90 {} \n'.format(qubit_name))
+                qasm_lines.append('X90 {} \n'.format(qubit_name))
             for j in range(n):
-                qasm_file.writelines('X180 {} \n'.format(
-                                     qubit_name))
-            qasm_file.writelines('RO {}  \n'.format(qubit_name))
-    qasm_file.close()
-    return qasm_file
+                qasm_lines.append('X180 {} \n'.format(
+                                  qubit_name))
+            qasm_lines.append('RO {}  \n'.format(qubit_name))
+    return _write_qasm(filename, qasm_lines, write_file)
 
 
-def AllXY(qubit_name, double_points=False):
+def AllXY(qubit_name, double_points=False, write_file=True):
     pulse_combinations = [['I', 'I'], ['X180', 'X180'], ['Y180', 'Y180'],
                           ['X180', 'Y180'], ['Y180', 'X180'],
                           ['X90', 'I'], ['Y90', 'I'], ['X90', 'Y90'],
@@ -76,36 +88,34 @@ def AllXY(qubit_name, double_points=False):
                               for _ in (0, 1)]
 
     filename = join(base_qasm_path, 'AllXY.qasm')
-    qasm_file = mopen(filename, mode='w')
-    qasm_file.writelines('qubit {} \n'.format(qubit_name))
+    qasm_lines = []
+    qasm_lines.append('qubit {} \n'.format(qubit_name))
 
     for pulse_comb in pulse_combinations:
-        qasm_file.writelines('\ninit_all\n')
+        qasm_lines.append('\ninit_all\n')
         if pulse_comb[0] != 'I':
-            qasm_file.writelines('{} {}\n'.format(pulse_comb[0], qubit_name))
+            qasm_lines.append('{} {}\n'.format(pulse_comb[0], qubit_name))
         if pulse_comb[1] != 'I':
-            qasm_file.writelines('{} {}\n'.format(pulse_comb[1], qubit_name))
-        qasm_file.writelines('RO {}  \n'.format(qubit_name))
-    qasm_file.close()
-    return qasm_file
+            qasm_lines.append('{} {}\n'.format(pulse_comb[1], qubit_name))
+        qasm_lines.append('RO {}  \n'.format(qubit_name))
+    return _write_qasm(filename, qasm_lines, write_file)
 
 
-def Rabi(qubit_name, amps, n=1):
+def Rabi(qubit_name, amps, n=1, write_file=True):
     filename = join(base_qasm_path, 'Rabi_{}.qasm'.format(n))
-    qasm_file = mopen(filename, mode='w')
-    qasm_file.writelines('qubit {} \n'.format(qubit_name))
+    qasm_lines = []
+    qasm_lines.append('qubit {} \n'.format(qubit_name))
     for amp in amps:
-        qasm_file.writelines('\ninit_all\n')
+        qasm_lines.append('\ninit_all\n')
         for i in range(n):
-            qasm_file.writelines('Rx {} {} \n'.format(qubit_name, amp))
-        qasm_file.writelines('RO {}  \n'.format(qubit_name))
-    qasm_file.close()
-    return qasm_file
+            qasm_lines.append('Rx {} {} \n'.format(qubit_name, amp))
+        qasm_lines.append('RO {}  \n'.format(qubit_name))
+    return _write_qasm(filename, qasm_lines, write_file)
 
 
 def Ramsey(qubit_name, times, clock_cycle=5e-9,
            artificial_detuning=4,
-           cal_points=True):
+           cal_points=True, write_file=True):
     '''
     Ramsey sequence for a single qubit.
     Input pars:
@@ -132,36 +142,35 @@ def Ramsey(qubit_name, times, clock_cycle=5e-9,
 
     clocks = np.round(times/clock_cycle)
     filename = join(base_qasm_path, 'Ramsey.qasm')
-    qasm_file = mopen(filename, mode='w')
-    qasm_file.writelines('qubit {} \n'.format(qubit_name))
+    qasm_lines = []
+    qasm_lines.append('qubit {} \n'.format(qubit_name))
     for i, cl in enumerate(clocks):
-        qasm_file.writelines('\ninit_all\n')
+        qasm_lines.append('\ninit_all\n')
         if cal_points and (i == (len(clocks)-4) or
                            i == (len(clocks)-3)):
-            qasm_file.writelines('RO {}  \n'.format(qubit_name))
+            qasm_lines.append('RO {}  \n'.format(qubit_name))
         elif cal_points and (i == (len(clocks)-2) or
                              i == (len(clocks)-1)):
-            qasm_file.writelines('X180 {} \n'.format(qubit_name))
-            qasm_file.writelines('RO {}  \n'.format(qubit_name))
+            qasm_lines.append('X180 {} \n'.format(qubit_name))
+            qasm_lines.append('RO {}  \n'.format(qubit_name))
 
         else:
-            qasm_file.writelines('X90 {}     \n'.format(
-                                 qubit_name))
-            qasm_file.writelines('I {} {:d} \n'.format(qubit_name, int(cl)))
+            qasm_lines.append('X90 {}     \n'.format(
+                              qubit_name))
+            qasm_lines.append('I {} {:d} \n'.format(qubit_name, int(cl)))
             if artificial_detuning is not None:
-                qasm_file.writelines('R90_phi {} {}\n'.format(
+                qasm_lines.append('R90_phi {} {}\n'.format(
                     qubit_name, phases[i]))
             else:
-                qasm_file.writelines('X90 {}     \n'.format(
-                                     qubit_name))
-            qasm_file.writelines('RO {}  \n'.format(qubit_name))
-    qasm_file.close()
-    return qasm_file
+                qasm_lines.append('X90 {}     \n'.format(
+                                  qubit_name))
+            qasm_lines.append('RO {}  \n'.format(qubit_name))
+    return _write_qasm(filename, qasm_lines, write_file)
 
 
 def echo(qubit_name, times, clock_cycle=5e-9,
          artificial_detuning=4,
-         cal_points=True):
+         cal_points=True, write_file=True):
     '''
     Echo sequence for a single qubit.
     Input pars:
@@ -187,46 +196,44 @@ def echo(qubit_name, times, clock_cycle=5e-9,
 
     clocks = np.round(times/clock_cycle)
     filename = join(base_qasm_path, 'echo.qasm')
-    qasm_file = mopen(filename, mode='w')
-    qasm_file.writelines('qubit {} \n'.format(qubit_name))
+    qasm_lines = []
+    qasm_lines.append('qubit {} \n'.format(qubit_name))
     for i, cl in enumerate(clocks):
-        qasm_file.writelines('\ninit_all\n')
+        qasm_lines.append('\ninit_all\n')
         if cal_points and (i == (len(clocks)-4) or
                            i == (len(clocks)-3)):
-            qasm_file.writelines('RO {}  \n'.format(qubit_name))
+            qasm_lines.append('RO {}  \n'.format(qubit_name))
         elif cal_points and (i == (len(clocks)-2) or
                              i == (len(clocks)-1)):
-            qasm_file.writelines('X180 {} \n'.format(qubit_name))
-            qasm_file.writelines('RO {}  \n'.format(qubit_name))
+            qasm_lines.append('X180 {} \n'.format(qubit_name))
+            qasm_lines.append('RO {}  \n'.format(qubit_name))
         else:
-            qasm_file.writelines('X90 {}     \n'.format(qubit_name))
-            qasm_file.writelines('I {} {:d} \n'.format(qubit_name, int(cl//2)))
-            qasm_file.writelines('X180 {}     \n'.format(qubit_name))
-            qasm_file.writelines('I {} {:d} \n'.format(qubit_name, int(cl//2)))
+            qasm_lines.append('X90 {}     \n'.format(qubit_name))
+            qasm_lines.append('I {} {:d} \n'.format(qubit_name, int(cl//2)))
+            qasm_lines.append('X180 {}     \n'.format(qubit_name))
+            qasm_lines.append('I {} {:d} \n'.format(qubit_name, int(cl//2)))
             if artificial_detuning is not None:
-                qasm_file.writelines('R90_phi {} {}\n'.format(
+                qasm_lines.append('R90_phi {} {}\n'.format(
                     qubit_name, phases[i]))
             else:
-                qasm_file.writelines('X90 {}     \n'.format(qubit_name))
-            qasm_file.writelines('RO {}  \n'.format(qubit_name))
-    qasm_file.close()
-    return qasm_file
+                qasm_lines.append('X90 {}     \n'.format(qubit_name))
+            qasm_lines.append('RO {}  \n'.format(qubit_name))
+    return _write_qasm(filename, qasm_lines, write_file)
 
 
-def single_elt_on(qubit_name):
+def single_elt_on(qubit_name, write_file=True):
     filename = join(base_qasm_path, 'single_elt_on.qasm')
-    qasm_file = mopen(filename, mode='w')
-    qasm_file.writelines('qubit {} \n'.format(qubit_name))
+    qasm_lines = []
+    qasm_lines.append('qubit {} \n'.format(qubit_name))
     # On
-    qasm_file.writelines('\ninit_all\n')
-    qasm_file.writelines('X180 {}     # On \n'.format(qubit_name))
-    qasm_file.writelines('RO {}  \n'.format(qubit_name))
+    qasm_lines.append('\ninit_all\n')
+    qasm_lines.append('X180 {}     # On \n'.format(qubit_name))
+    qasm_lines.append('RO {}  \n'.format(qubit_name))
 
-    qasm_file.close()
-    return qasm_file
+    return _write_qasm(filename, qasm_lines, write_file)
 
 
-def two_elt_MotzoiXY(qubit_name):
+def two_elt_MotzoiXY(qubit_name, write_file=True):
     '''
     Sequence used for calibrating the motzoi parameter.
     Consists of Xy and Yx
@@ -234,40 +241,38 @@ def two_elt_MotzoiXY(qubit_name):
     needs to reload the points for every data point.
     '''
     filename = join(base_qasm_path, 'Motzoi_XY.qasm')
-    qasm_file = mopen(filename, mode='w')
-    qasm_file.writelines('qubit {} \n'.format(qubit_name))
-    qasm_file.writelines('\ninit_all\n')
-    qasm_file.writelines('X180 {} \n'.format(qubit_name))
-    qasm_file.writelines('Y90 {} \n'.format(qubit_name))
-    qasm_file.writelines('RO {}  \n'.format(qubit_name))
+    qasm_lines = []
+    qasm_lines.append('qubit {} \n'.format(qubit_name))
+    qasm_lines.append('\ninit_all\n')
+    qasm_lines.append('X180 {} \n'.format(qubit_name))
+    qasm_lines.append('Y90 {} \n'.format(qubit_name))
+    qasm_lines.append('RO {}  \n'.format(qubit_name))
 
-    qasm_file.writelines('\ninit_all\n')
-    qasm_file.writelines('Y180 {} \n'.format(qubit_name))
-    qasm_file.writelines('X90 {} \n'.format(qubit_name))
-    qasm_file.writelines('RO {}  \n'.format(qubit_name))
+    qasm_lines.append('\ninit_all\n')
+    qasm_lines.append('Y180 {} \n'.format(qubit_name))
+    qasm_lines.append('X90 {} \n'.format(qubit_name))
+    qasm_lines.append('RO {}  \n'.format(qubit_name))
 
-    qasm_file.close()
-    return qasm_file
+    return _write_qasm(filename, qasm_lines, write_file)
 
 
-def off_on(qubit_name):
+def off_on(qubit_name, write_file=True):
     filename = join(base_qasm_path, 'off_on.qasm')
-    qasm_file = mopen(filename, mode='w')
-    qasm_file.writelines('qubit {} \n'.format(qubit_name))
+    qasm_lines = []
+    qasm_lines.append('qubit {} \n'.format(qubit_name))
 
     # Off
-    qasm_file.writelines('\ninit_all\n')
-    qasm_file.writelines('RO {}  \n'.format(qubit_name))
+    qasm_lines.append('\ninit_all\n')
+    qasm_lines.append('RO {}  \n'.format(qubit_name))
     # On
-    qasm_file.writelines('\ninit_all\n')
-    qasm_file.writelines('X180 {}     # On \n'.format(qubit_name))
-    qasm_file.writelines('RO {}  \n'.format(qubit_name))
+    qasm_lines.append('\ninit_all\n')
+    qasm_lines.append('X180 {}     # On \n'.format(qubit_name))
+    qasm_lines.append('RO {}  \n'.format(qubit_name))
 
-    qasm_file.close()
-    return qasm_file
+    return _write_qasm(filename, qasm_lines, write_file)
 
 
-def butterfly(qubit_name, initialize=False):
+def butterfly(qubit_name, initialize=False, write_file=True):
     """
     Initialize adds an exta measurement before state preparation to allow
     initialization by post-selection
@@ -275,37 +280,36 @@ def butterfly(qubit_name, initialize=False):
     The duration of the RO + depletion is specified in the definition of RO
     """
     filename = join(base_qasm_path, 'butterfly_init_{}.qasm'.format(initialize))
-    qasm_file = mopen(filename, mode='w')
-    qasm_file.writelines('qubit {} \n'.format(qubit_name))
+    qasm_lines = []
+    qasm_lines.append('qubit {} \n'.format(qubit_name))
     if initialize:
-        qasm_file.writelines('\ninit_all\n')
-        qasm_file.writelines('RO {}  \n'.format(qubit_name))
-        qasm_file.writelines('RO {}  \n'.format(qubit_name))
-        qasm_file.writelines('RO {}  \n'.format(qubit_name))
-
-        qasm_file.writelines('\ninit_all\n')
-        qasm_file.writelines('RO {}  \n'.format(qubit_name))
-        qasm_file.writelines('X180 {}  \n'.format(qubit_name))
-        qasm_file.writelines('RO {}  \n'.format(qubit_name))
-        qasm_file.writelines('RO {}  \n'.format(qubit_name))
+        qasm_lines.append('\ninit_all\n')
+        qasm_lines.append('RO {}  \n'.format(qubit_name))
+        qasm_lines.append('RO {}  \n'.format(qubit_name))
+        qasm_lines.append('RO {}  \n'.format(qubit_name))
+
+        qasm_lines.append('\ninit_all\n')
+        qasm_lines.append('RO {}  \n'.format(qubit_name))
+        qasm_lines.append('X180 {}  \n'.format(qubit_name))
+        qasm_lines.append('RO {}  \n'.format(qubit_name))
+        qasm_lines.append('RO {}  \n'.format(qubit_name))
     else:
-        qasm_file.writelines('\ninit_all\n')
-        qasm_file.writelines('RO {}  \n'.format(qubit_name))
-        qasm_file.writelines('RO {}  \n'.format(qubit_name))
-
-        qasm_file.writelines('\ninit_all\n')
-        qasm_file.writelines('X180 {}  \n'.format(qubit_name))
-        qasm_file.writelines('RO {}  \n'.format(qubit_name))
-        qasm_file.writelines('RO {}  \n'.format(qubit_name))
-    qasm_file.close()
-    return qasm_file
+        qasm_lines.append('\ninit_all\n')
+        qasm_lines.append('RO {}  \n'.format(qubit_name))
+        qasm_lines.append('RO {}  \n'.format(qubit_name))
+
+        qasm_lines.append('\ninit_all\n')
+        qasm_lines.append('X180 {}  \n'.format(qubit_name))
+        qasm_lines.append('RO {}  \n'.format(qubit_name))
+        qasm_lines.append('RO {}  \n'.format(qubit_name))
+    return _write_qasm(filename, qasm_lines, write_file)
 
 
 def randomized_benchmarking(qubit_name, nr_cliffords, nr_seeds,
                             net_clifford=0, restless=False,
                             label='randomized_benchmarking',
                             cal_points=True,
-                            double_curves=False):
+                            double_curves=False, write_file=True):
     '''
     Input pars:
         nr_cliffords:  list nr_cliffords for which to generate RB seqs
@@ -321,27 +325,27 @@ def randomized_benchmarking(qubit_name, nr_cliffords, nr_seeds,
         double_curves: Alternates between net clifford 0 and 3
 
     returns:
-        qasm_file
+        qasm_file, or the list of qasm lines if write_file is False
 
     generates a qasm file for single qubit Clifford based randomized
     benchmarking.
     '''
     net_cliffords = [0, 3]  # Exists purely for the double curves mode
     filename = join(base_qasm_path, label+'.qasm')
-    qasm_file = mopen(filename, mode='w')
-    qasm_file.writelines('qubit {} \n'.format(qubit_name))
+    qasm_lines = []
+    qasm_lines.append('qubit {} \n'.format(qubit_name))
     i = 0
     for seed in range(nr_seeds):
         for j, n_cl in enumerate(nr_cliffords):
             if not restless:
-                qasm_file.writelines('init_all  \n')
+                qasm_lines.append('init_all  \n')
             if cal_points and (j == (len(nr_cliffords)-4) or
                                j == (len(nr_cliffords)-3)):
-                qasm_file.writelines('RO {}  \n'.format(qubit_name))
+                qasm_lines.append('RO {}  \n'.format(qubit_name))
             elif cal_points and (j == (len(nr_cliffords)-2) or
                                  j == (len(nr_cliffords)-1)):
-                qasm_file.writelines('X180 {} \n'.format(qubit_name))
-                qasm_file.writelines('RO {}  \n'.format(qubit_name))
+                qasm_lines.append('X180 {} \n'.format(qubit_name))
+                qasm_lines.append('RO {}  \n'.format(qubit_name))
             else:
                 if double_curves:
                     net_clifford = net_cliffords[i % 2]
@@ -351,14 +355,13 @@ def randomized_benchmarking(qubit_name, nr_cliffords, nr_seeds,
                 pulse_keys = rb.decompose_clifford_seq(cl_seq)
                 for pulse in pulse_keys:
                     if pulse != 'I':
-                        qasm_file.writelines('{} {}\n'.format(
+                        qasm_lines.append('{} {}\n'.format(
                             pulse, qubit_name))
-                qasm_file.writelines('RO {}  \n'.format(qubit_name))
-    qasm_file.close()
-    return qasm_file
+                qasm_lines.append('RO {}  \n'.format(qubit_name))
+    return _write_qasm(filename, qasm_lines, write_file)
 
 
-def MotzoiXY(qubit_name, motzois, cal_points=True):
+def MotzoiXY(qubit_name, motzois, cal_points=True, write_file=True):
     '''
     Sequence used for calibrating the motzoi parameter.
     Consists of Xy and Yx
@@ -375,28 +378,27 @@ def MotzoiXY(qubit_name, motzois, cal_points=True):
                              calibration points
     '''
     filename = join(base_qasm_path, 'Motzoi_XY.qasm')
-    qasm_file = mopen(filename, mode='w')
-    qasm_file.writelines('qubit {} \n'.format(qubit_name))
+    qasm_lines = []
+    qasm_lines.append('qubit {} \n'.format(qubit_name))
     for i, motzoi in enumerate(motzois):
-        qasm_file.writelines('\ninit_all\n')
+        qasm_lines.append('\ninit_all\n')
         if cal_points and (i == (len(motzois)-4) or
                            i == (len(motzois)-3)):
-            qasm_file.writelines('RO {}  \n'.format(qubit_name))
+            qasm_lines.append('RO {}  \n'.format(qubit_name))
         elif cal_points and (i == (len(motzois)-2) or
                              i == (len(motzois)-1)):
-            qasm_file.writelines('X180 {} \n'.format(qubit_name))
-            qasm_file.writelines('RO {}  \n'.format(qubit_name))
+            qasm_lines.append('X180 {} \n'.format(qubit_name))
+            qasm_lines.append('RO {}  \n'.format(qubit_name))
         if i % 2:
-            qasm_file.writelines(
+            qasm_lines.append(
                 'X180_Motz {} {} \n'.format(qubit_name, motzoi))
-            qasm_file.writelines(
+            qasm_lines.append(
                 'Y90_Motz {} {} \n'.format(qubit_name, motzoi))
-            qasm_file.writelines('RO {}  \n'.format(qubit_name))
+            qasm_lines.append('RO {}  \n'.format(qubit_name))
         else:
-            qasm_file.writelines(
+            qasm_lines.append(
                 'Y180_Motz {} {} \n'.format(qubit_name, motzoi))
-            qasm_file.writelines(
+            qasm_lines.append(
                 'X90_Motz {} {} \n'.format(qubit_name, motzoi))
-            qasm_file.writelines('RO {}  \n'.format(qubit_name))
-    qasm_file.close()
-    return qasm_file
+            qasm_lines.append('RO {}  \n'.format(qubit_name))
+    return _write_qasm(filename, qasm_lines, write_file)
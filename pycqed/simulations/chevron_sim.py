@@ -66,3 +66,106 @@ def chevron_slice(e0, energy, g, t, dt, sf):
     """
     energy_func = lambda energy, t: e0*(1.-(energy*sf(t))**2)
     return qamp(rabisim(lambda t: energy_func(energy, t), g, t, dt))
+
+
+#######################################################
+# Vectorized simulation                               #
+#######################################################
+
+
+def propagators(e, g, dt):
+    """
+    Analytic propagators expm(1j*dt*ham(e, g)) for an array of energies.
+
+    Because ham(e, g) = w (n.sigma) with w = sqrt(g**2 + e**2/4), the
+    propagator is cos(w dt) I + 1j sin(w dt)/w ham(e, g).
+    Inputs:
+            e,      Array of energies.
+            g,      Coupling parameter.
+            dt,     Stepsize of the time evolution.
+    Outputs:
+            U,      Propagators, array of shape e.shape + (2, 2)
+    """
+    e = np.asarray(e, dtype=float)
+    w = np.sqrt(g**2 + 0.25*e**2)
+    c = np.cos(w*dt)
+    # sin(w dt)/w, np.sinc takes care of w = 0
+    s = dt*np.sinc(w*dt/np.pi)
+    U = np.empty(e.shape + (2, 2), dtype=np.complex128)
+    U[..., 0, 0] = c + 0.5j*s*e
+    U[..., 1, 1] = c - 0.5j*s*e
+    U[..., 0, 1] = 1j*s*g
+    U[..., 1, 0] = 1j*s*g
+    return U
+
+
+def rabisim_vectorized(energies, g, dt):
+    """
+    Evolution of many systems described by the hamiltonian of rabisim
+    at once.
+    Inputs:
+            energies,   Array of shape (n, len(ts)) with the energy
+                        parameter at the times ts of the evolution, for n
+                        systems. The last time step is not used.
+            g,          Coupling parameter
+            dt,         Stepsize of the time evolution
+    Outputs:
+            f_vec,      Evolution of shape (n, len(ts), 2), equal to
+                        rabisim for every row of energies
+    """
+    energies = np.atleast_2d(energies)
+    U = propagators(energies[:, :-1], g, dt)
+    f_vec = np.zeros(energies.shape + (2, ), dtype=np.complex128)
+    f_vec[:, 0, 0] = 1
+    # The time steps depend on each other, only the systems are evolved
+    # in parallel.
+    for i in range(energies.shape[1]-1):
+        a, b = f_vec[:, i, 0], f_vec[:, i, 1]
+        f_vec[:, i+1, 0] = U[:, i, 0, 0]*a + U[:, i, 0, 1]*b
+        f_vec[:, i+1, 1] = U[:, i, 1, 0]*a + U[:, i, 1, 1]*b
+    return f_vec
+
+
+def _sample_step_function(sf, ts):
+    """
+    Evaluates the step function sf at the times ts, functions that do not
+    accept arrays are evaluated point by point.
+    """
+    try:
+        sf_vec = np.asarray(sf(ts), dtype=float)
+        if sf_vec.shape == ts.shape:
+            return sf_vec
+    except Exception:
+        pass
+    return np.array([sf(ti) for ti in ts], dtype=float)
+
+
+def chevron_vectorized(e0, emin, emax, n, g, t, dt, sf):
+    """
+    Vectorized version of chevron, the evolution for all energies is
+    calculated at once. Inputs and outputs are the same as for chevron.
+    """
+    energy_vec = np.arange(1+emin, 1+emax, (emax-emin)/(n-1))
+    return chevron_slices(e0, energy_vec, g, t, dt, sf)
+
+
+def chevron_slices(e0, energies, g, t, dt, sf):
+    """
+    Vectorized version of chevron_slice for an array of energies.
+    Inputs:
+            e0,         set energy scale at the center(detuning).
+            energies,   energies of the slices to simulate, in e0 units.
+            g,          Coupling parameter.
+            t,          Final time of the evolution.
+            dt,         Stepsize of the time evolution.
+            sf,         Step function of the distortion kernel.
+    Outputs:
+            Array of shape (len(energies), len(ts)) with the excited state
+            population.
+    """
+    ts = np.arange(1., t+0.5*dt, dt)
+    sf_vec = _sample_step_function(sf, ts)
+    energies = np.atleast_1d(np.asarray(energies, dtype=float))
+    energy_mat = e0*(1.-(energies[:, None]*sf_vec[None, :])**2)
+    f_vec = rabisim_vectorized(energy_mat, g, dt)
+    return np.abs(f_vec[:, :, 1])**2
@@ -0,0 +1,3 @@
+qubit q0 
+I q0 12
+I q0 4
@@ -0,0 +1,2 @@
+qubit q0 
+X180 q0X180 q0Y180 q0
\ No newline at end of file
@@ -1,6 +1,13 @@
+import os
+import threading
 import unittest
+import h5py
 import numpy as np
+from pycqed.analysis import measurement_analysis as ma
+from pycqed.measurement import hdf5_data as h5d
 from pycqed.measurement import measurement_control
+from pycqed.measurement.measurement_control import AsyncDataWriter
+from pycqed.measurement.measurement_control import DecimatedPlotBuffer
 from pycqed.measurement.sweep_functions import None_Sweep
 import pycqed.measurement.detector_functions as det
 from pycqed.instrument_drivers.physical_instruments.dummy_instruments import DummyParHolder
@@ -82,6 +89,30 @@ class Test_MeasurementControl(unittest.TestCase):
         np.testing.assert_array_almost_equal(z0, z[0, :])
         np.testing.assert_array_almost_equal(z1, z[1, :])
 
+    def test_soft_sweep_2D_batched(self):
+        sweep_pts = np.linspace(0, 10, 30)
+        sweep_pts_2D = np.linspace(0, 10, 5)
+        self.MC.soft_batch_size(7)
+        try:
+            self.MC.set_sweep_function(None_Sweep(sweep_control='soft'))
+            self.MC.set_sweep_function_2D(None_Sweep(sweep_control='soft'))
+            self.MC.set_sweep_points(sweep_pts)
+            self.MC.set_sweep_points_2D(sweep_pts_2D)
+            self.MC.set_detector_function(det.Dummy_Detector_Soft())
+            self.assertTrue(self.MC.batch_evaluation_supported())
+            dat = self.MC.run('2D_soft_batched', mode='2D')
+        finally:
+            self.MC.soft_batch_size(1000)
+
+        xr = np.arange(len(sweep_pts)*len(sweep_pts_2D))/15
+        z = np.array([np.sin(xr/np.pi), np.cos(xr/np.pi)])
+        x_tiled = np.tile(sweep_pts, len(sweep_pts_2D))
+        y_rep = np.repeat(sweep_pts_2D, len(sweep_pts))
+        np.testing.assert_array_almost_equal(dat[:, 0], x_tiled)
+        np.testing.assert_array_almost_equal(dat[:, 1], y_rep)
+        np.testing.assert_array_almost_equal(dat[:, 2], z[0, :])
+        np.testing.assert_array_almost_equal(dat[:, 3], z[1, :])
+
     def test_hard_sweep_2D(self):
         """
         Hard inner loop, soft outer loop
@@ -109,6 +140,42 @@ class Test_MeasurementControl(unittest.TestCase):
         d = self.MC.detector_function
         self.assertEqual(d.times_called, 5)
 
+    def test_pipelined_hard_sweep_2D(self):
+        sweep_pts = np.linspace(10, 20, 3)
+        sweep_pts_2D = np.linspace(0, 10, 5)
+        self.MC.set_sweep_function(None_Sweep(sweep_control='hard'))
+        self.MC.set_sweep_function_2D(None_Sweep(sweep_control='soft'))
+        self.MC.set_sweep_points(sweep_pts)
+        self.MC.set_sweep_points_2D(sweep_pts_2D)
+        self.MC.set_detector_function(det.Dummy_Detector_Hard())
+        dat = self.MC.run('2D_hard', mode='2D')
+
+        self.MC.pipelined_hard_sweeps(True)
+        # the plotmons are only updated in the main thread
+        monitor_updates = []
+        update_hard_monitors = self.MC.update_hard_monitors
+
+        def record_update(iteration, stop_idx, soft_iteration):
+            monitor_updates.append((iteration, threading.current_thread()))
+            update_hard_monitors(iteration, stop_idx, soft_iteration)
+        self.MC.update_hard_monitors = record_update
+        try:
+            self.MC.set_sweep_function(None_Sweep(sweep_control='hard'))
+            self.MC.set_sweep_function_2D(None_Sweep(sweep_control='soft'))
+            self.MC.set_sweep_points(sweep_pts)
+            self.MC.set_sweep_points_2D(sweep_pts_2D)
+            self.MC.set_detector_function(det.Dummy_Detector_Hard())
+            pipelined_dat = self.MC.run('2D_hard_pipelined', mode='2D')
+        finally:
+            self.MC.pipelined_hard_sweeps(False)
+            del self.MC.update_hard_monitors
+        np.testing.assert_array_almost_equal(dat, pipelined_dat)
+        self.assertEqual([u[0] for u in monitor_updates], list(range(5)))
+        for iteration, thread in monitor_updates:
+            self.assertIs(thread, threading.main_thread())
+        d = self.MC.detector_function
+        self.assertEqual(d.times_called, 5)
+
     def test_many_shots_hard_sweep(self):
         """
         Tests acquiring more than the maximum number of shots for a hard
@@ -289,5 +356,130 @@ class Test_MeasurementControl(unittest.TestCase):
         self.MC.clear_persitent_plot()
         self.assertEqual(self.MC._persist_dat, None)
 
+    def test_measurement_result(self):
+        sweep_pts = np.linspace(0, 10, 5)
+        self.MC.set_sweep_function(None_Sweep(sweep_control='hard'))
+        self.MC.set_sweep_points(sweep_pts)
+        self.MC.set_detector_function(det.Dummy_Detector_Hard())
+        dat = self.MC.run('1D_hard_result')
+        self.assertIsInstance(dat, h5d.MeasurementResult)
+        self.assertEqual(dat.name, '1D_hard_result')
+        self.assertEqual(len(dat.column_names), 3)
+        self.assertTrue(os.path.isfile(dat.filepath))
+        self.assertTrue(dat.folder.endswith(dat.timestamp[-6:] +
+                                            '_1D_hard_result'))
+        self.assertEqual(dat.attrs['value_names'],
+                         list(self.MC.detector_function.value_names))
+        # the metadata is kept when slicing
+        self.assertEqual(dat[:, 1:].filepath, dat.filepath)
+        with h5py.File(dat.filepath, 'r') as f:
+            np.testing.assert_array_equal(
+                f['Experimental Data']['Data'][()], dat)
+
+        a = ma.MeasurementAnalysis(auto=False, result=dat)
+        a.get_naming_and_values()
+        self.assertEqual(a.folder, dat.folder)
+        self.assertEqual(a.timestamp_string, dat.timestamp)
+        self.assertIsNone(a._data_file)
+        self.assertEqual(a.value_names, dat.attrs['value_names'])
+        np.testing.assert_array_equal(a.sweep_points, sweep_pts)
+        np.testing.assert_array_equal(a.measured_values, dat[:, 1:].T)
+        # the datafile is only opened when it is used
+        self.assertIn('Experimental Data', a.data_file)
+        a.finish()
+
+
+class Test_AsyncDataWriter(unittest.TestCase):
+
+    def test_ordering(self):
+        stored = []
+        writer = AsyncDataWriter(lambda i, x: stored.append((i, x)),
+                                 maxsize=2)
+        for i in range(100):
+            writer.put(i, i**2)
+        writer.close()
+        self.assertEqual(stored, [(i, i**2) for i in range(100)])
+
+    def test_exception_is_reraised(self):
+        def store(i):
+            if i == 3:
+                raise ValueError('failed to store')
+        writer = AsyncDataWriter(store)
+        for i in range(5):
+            try:
+                writer.put(i)
+            except ValueError:
+                break
+        with self.assertRaises(ValueError):
+            writer.close()
+
+
+class Test_DecimatedPlotBuffer(unittest.TestCase):
 
-
+    def setUp(self):
+        self.data = np.zeros((0, 3))
+        self.buffer = DecimatedPlotBuffer(self, y_cols=[1, 2], max_pts=100)
+
+    def __len__(self):
+        return len(self.data)
+
+    def __getitem__(self, key):
+        return self.data[key]
+
+    def append(self, rows):
+        start = len(self.data)
+        self.data = np.concatenate([self.data, rows])
+        self.buffer.mark_changed(start, len(self.data))
+
+    def check_extrema(self, y_col):
+        # every bucket shows the minimum and maximum of its rows
+        b = self.buffer
+        rows = b.rows(y_col)
+        if b.nr_rows <= b.max_pts:
+            np.testing.assert_array_equal(rows, np.arange(len(self.data)))
+            return
+        for k in range(0, len(rows), 2):
+            bucket = self.data[k//2*b.bucket_size:(k//2+1)*b.bucket_size,
+                               y_col]
+            self.assertEqual(set(self.data[rows[k:k+2], y_col]),
+                             {bucket.min(), bucket.max()})
+
+    def test_decimation(self):
+        rng = np.random.RandomState(0)
+        for n in [10, 80, 37, 500, 1, 2000]:
+            rows = rng.randn(n, 3)
+            rows[:, 0] = len(self.data) + np.arange(n)
+            self.append(rows)
+            x, y = self.buffer.get_xy(0, 1)
+            self.assertLessEqual(len(x), 100)
+            self.assertTrue(np.all(np.diff(x) >= 0))
+            np.testing.assert_array_equal(y, self.data[x.astype(int), 1])
+            self.check_extrema(1)
+            self.check_extrema(2)
+        self.assertFalse(self.buffer.changed)
+        # the global extrema are always shown
+        x, y = self.buffer.get_xy(None, 2)
+        self.assertEqual(y.max(), self.data[:, 2].max())
+        self.assertEqual(y.min(), self.data[:, 2].min())
+
+    def test_short_trace(self):
+        self.append(np.arange(30.).reshape(10, 3))
+        x, y = self.buffer.get_xy(0, 2)
+        np.testing.assert_array_equal(x, self.data[:, 0])
+        np.testing.assert_array_equal(y, self.data[:, 2])
+
+    def test_overwrite(self):
+        self.append(np.zeros((1000, 3)))
+        self.buffer.process()
+        self.data[500, 1] = 5
+        self.data[700, 1] = -5
+        self.buffer.mark_changed(500, 701)
+        self.assertTrue(self.buffer.changed)
+        x, y = self.buffer.get_xy(None, 1)
+        self.assertIn(500, x)
+        self.assertIn(700, x)
+        self.check_extrema(1)
+        # removing rows starts over
+        self.data = self.data[:50]
+        self.buffer.mark_changed(0, 50)
+        self.assertEqual(len(self.buffer.get_xy(0, 1)[0]), 50)
@@ -0,0 +1,100 @@
+import unittest
+
+from pycqed.instrument_drivers.physical_instruments._controlbox import \
+    Assembler
+
+
+class Test_single_pass_assembler(unittest.TestCase):
+
+    def setUp(self):
+        # the Format methods of the Assembler class are the reference
+        self.asm = Assembler.Assembler('')
+
+    def ref(self, bin_str):
+        return int(bin_str, 2)
+
+    def test_instruction_encoding(self):
+        a = self.asm
+        program = '\n'.join([
+            'lui r3, 2, 171',
+            'add r1, r2, r3',
+            'sub r4, r5, r6',
+            'addi r7, r8, -5',
+            'ori r9, r10, 1234',
+            'waitreg r11',
+            'pulse 1001, 0110, 1111',
+            'measure',
+            'wait 300',
+            'trigger 1000001, 2047',
+            'nop'])
+        expected = [
+            self.ref(a.LuiFormat('r3', 2, 171)),
+            self.ref(a.AddFormat('r1', 'r2', 'r3')),
+            self.ref(a.SubFormat('r4', 'r5', 'r6')),
+            self.ref(a.AddiFormat('r7', 'r8', -5)),
+            self.ref(a.OriFormat('r9', 'r10', 1234)),
+            self.ref(a.WaitRegFormat('r11')),
+            self.ref(a.PulseFormat('1001', '0110', '1111')),
+            self.ref(a.MeasureFormat()),
+            self.ref(a.WaitFormat(300)),
+            self.ref(a.TriggerFormat('1000001', 2047)),
+            self.ref(a.NopFormat())]
+        self.assertEqual(
+            Assembler.assemble(program, append_tail=False), expected)
+
+    def test_mov(self):
+        instr = Assembler.assemble('mov r15, -20000', append_tail=False)
+        self.assertEqual(instr, [self.ref(i) for i in
+                                 self.asm.MovFormat('r15', -20000)])
+
+    def test_tail(self):
+        instr = Assembler.assemble('wait 1000')
+        self.assertEqual(instr[1:], [0xc08003e8, 0xa08203e8, 0x12007ffd])
+        # the tail is a branch to the start of the tail
+        self.assertEqual(
+            Assembler.assemble(
+                'EndOfFileLoop: wait 1000\n trigger 0000001 1000\n'
+                'beq r0, r0, EndOfFileLoop', append_tail=False),
+            Assembler.end_of_file_loop)
+
+    def test_labels(self):
+        program = '''
+            mov r1, 10          # comment
+            Start:
+            beq r0, r0, Next    # forward branch
+            wait 10
+            Next: bne r1, r2, START
+            '''
+        instr = Assembler.assemble(program, append_tail=False)
+        self.assertEqual(len(instr), 7)
+        # Start is instruction 4, Next is instruction 6
+        self.assertEqual(instr[4], self.ref(self.asm.BeqFormat('r0', 'r0', 1)))
+        self.assertEqual(instr[6],
+                         self.ref(self.asm.BneFormat('r1', 'r2', -3)))
+
+        with self.assertRaises(ValueError):
+            Assembler.assemble('beq r0, r0, nowhere', use_cache=False)
+
+    def test_token_list_input(self):
+        text = 'Loop: pulse 0000, 1111, 0000\nwait 4\nbne r1, r2, Loop'
+        tokens = [['Loop:', 'pulse', '0000', '1111', '0000'],
+                  ['wait', 4], ['bne', 'r1', 'r2', 'Loop']]
+        self.assertEqual(Assembler.assemble(tokens, use_cache=False),
+                         Assembler.assemble(text, use_cache=False))
+
+    def test_errors(self):
+        for program in ['foo r1', 'add r1, 2, r3', 'trigger 101, 10',
+                        'trigger 1000000, 2048', 'lui r1, 4, 1',
+                        'waitreg r16', 'wait']:
+            with self.assertRaises(ValueError):
+                Assembler.assemble(program, use_cache=False)
+
+    def test_cache(self):
+        program = 'wait 17\nmeasure'
+        instr = Assembler.assemble(program)
+        key = (Assembler.program_hash(program), True)
+        self.assertIn(key, Assembler._assembly_cache)
+        # the returned list is a copy
+        instr.append(0)
+        self.assertEqual(Assembler.assemble(program),
+                         Assembler.assemble(program, use_cache=False))
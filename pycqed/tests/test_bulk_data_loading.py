@@ -0,0 +1,113 @@
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+import h5py
+
+from pycqed.analysis import analysis_toolbox as a_tools
+from pycqed.measurement import hdf5_data as h5d
+
+
+def write_dummy_datafile(datadir, timestamp, name, data, T1):
+    folder = os.path.join(datadir, timestamp[:8],
+                          timestamp[9:] + '_' + name)
+    os.makedirs(folder)
+    filepath = os.path.join(folder, os.path.basename(folder) + '.hdf5')
+    with h5py.File(filepath, 'w') as f:
+        g = f.create_group('Experimental Data')
+        g.create_dataset('Data', data=data)
+        g.attrs['datasaving_format'] = h5d.encode_to_utf8('Version 2')
+        g.attrs['sweep_parameter_names'] = h5d.encode_to_utf8(['Time'])
+        g.attrs['sweep_parameter_units'] = h5d.encode_to_utf8(['s'])
+        g.attrs['value_names'] = h5d.encode_to_utf8(['I', 'Q'])
+        g.attrs['value_units'] = h5d.encode_to_utf8(['V', 'V'])
+        qubit_grp = f.create_group('Instrument settings').create_group('QL')
+        qubit_grp.attrs['T1'] = str(T1)
+        fit_grp = f.create_group('Analysis').create_group('Fitted Params I')
+        fit_grp.attrs['chisqr'] = 0.5
+        tau_grp = fit_grp.create_group('tau')
+        tau_grp.attrs['value'] = T1
+        tau_grp.attrs['stderr'] = T1/10
+        tau_grp.attrs['vary'] = True
+    return folder
+
+
+class Test_bulk_data_loading(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self._old_datadir = a_tools.datadir
+        self._old_use_data_catalog = a_tools.use_data_catalog
+        a_tools.datadir = self.tmpdir
+        a_tools.use_data_catalog = False
+
+        self.timestamps = ['20170101_1000{:02d}'.format(i)
+                           for i in range(6)]
+        self.datasets = []
+        self.T1s = 10e-6 + np.arange(6)*1e-6
+        for i, timestamp in enumerate(self.timestamps):
+            data = np.column_stack([np.linspace(0, 1, 11),
+                                    np.random.rand(11), np.random.rand(11)])
+            self.datasets.append(data)
+            write_dummy_datafile(self.tmpdir, timestamp, 'T1_QL', data,
+                                 self.T1s[i])
+        # a corrupted file and a timestamp without data
+        folder = os.path.join(self.tmpdir, '20170101', '110000_T1_QL')
+        os.makedirs(folder)
+        with open(os.path.join(folder, '110000_T1_QL.hdf5'), 'wb') as f:
+            f.write(b'not an hdf5 file')
+        self.bad_timestamps = ['20170101_110000', '20170101_120000']
+
+    @classmethod
+    def tearDownClass(self):
+        a_tools.datadir = self._old_datadir
+        a_tools.use_data_catalog = self._old_use_data_catalog
+        shutil.rmtree(self.tmpdir)
+
+    def check_loaded_data(self, data):
+        self.assertEqual(data['timestamps'], self.timestamps)
+        np.testing.assert_array_almost_equal(data['QL.T1'], self.T1s)
+        for i, dset in enumerate(self.datasets):
+            np.testing.assert_array_almost_equal(data['sweep_points'][i],
+                                                 dset[:, 0])
+            np.testing.assert_array_almost_equal(
+                data['measured_values'][i], dset[:, 1:].T)
+            np.testing.assert_array_almost_equal(data['Q'][i], dset[:, 2])
+
+    def test_load_serial(self):
+        data = a_tools.load_data_from_timestamp_list(
+            self.timestamps + self.bad_timestamps,
+            ['sweep_points', 'measured_values', 'Q', 'QL.T1'],
+            numeric_params=['QL.T1'], max_workers=1, verbose=False)
+        self.check_loaded_data(data)
+
+    def test_load_parallel(self):
+        data = a_tools.load_data_from_timestamp_list(
+            self.timestamps + self.bad_timestamps,
+            ['sweep_points', 'measured_values', 'Q', 'QL.T1'],
+            numeric_params=['QL.T1'], max_workers=2, verbose=False)
+        self.check_loaded_data(data)
+
+    def test_dataframe_and_renaming(self):
+        df = a_tools.load_data_from_timestamp_list(
+            self.timestamps, {'T1': 'QL.T1', 'fit': 'fit_params'},
+            numeric_params=['T1'], max_workers=1, return_dataframe=True)
+        self.assertEqual(list(df.index), self.timestamps)
+        np.testing.assert_array_almost_equal(df['T1'].values, self.T1s)
+        self.assertAlmostEqual(df['fit'].iloc[0]['tau'], self.T1s[0])
+        self.assertAlmostEqual(df['fit'].iloc[0]['tau_err'], self.T1s[0]/10)
+        self.assertEqual(df['fit'].iloc[0]['chi_squared_dofs'], 9)
+
+    def test_mean_df(self):
+        # loaded in the current process by default
+        mean_df = a_tools.get_mean_df('T1_QL', self.timestamps[0],
+                                      self.timestamps[-1])
+        all_data = np.array(self.datasets)
+        np.testing.assert_array_almost_equal(mean_df['Time'],
+                                             all_data[0, :, 0])
+        np.testing.assert_array_almost_equal(mean_df['I_mean'],
+                                             all_data[:, :, 1].mean(axis=0))
+        np.testing.assert_array_almost_equal(mean_df['Q_mean'],
+                                             all_data[:, :, 2].mean(axis=0))
@@ -0,0 +1,161 @@
+import unittest
+import numpy as np
+
+from pycqed.instrument_drivers.physical_instruments._controlbox import \
+    numpy_codec as c
+
+
+def reference_decode_byte(data_bytes, data_bits_per_byte=7,
+                          signed_integer=True):
+    '''
+    Per value decoder, python version of decode_byte in codec.pyx.
+    '''
+    mask = (1 << data_bits_per_byte) - 1
+    value = 0
+    for i in range(len(data_bytes)):
+        value |= (mask & data_bytes[len(data_bytes)-1-i]) << (
+            data_bits_per_byte*i)
+    nr_bits_m1 = data_bits_per_byte*len(data_bytes)-1
+    if signed_integer and value & (1 << nr_bits_m1):
+        value &= ~(1 << nr_bits_m1)
+        value = value - 2**nr_bits_m1
+    return value
+
+
+def reference_encode_byte(value, data_bits_per_byte=7,
+                          expected_number_of_bytes=2):
+    mask = (1 << data_bits_per_byte) - 1
+    data = bytearray(expected_number_of_bytes)
+    for i in range(expected_number_of_bytes):
+        data[expected_number_of_bytes-(i+1)] = (
+            (value >> (data_bits_per_byte*i)) & mask) | 128
+    return bytes(data)
+
+
+class Test_numpy_codec(unittest.TestCase):
+
+    def test_encode_byte(self):
+        encoded_128 = c.encode_byte(128, 7)
+        self.assertEqual(type(encoded_128), bytes)
+        self.assertEqual(encoded_128, bytes([0b10000001, 0b10000000]))
+        encoded_128 = c.encode_byte(128, 4)
+        self.assertEqual(encoded_128, bytes([0b10001000, 0b10000000]))
+        for value, dbpb, nr_bytes in [(546815, 4, 6), (546815, 7, 4),
+                                      (-235, 7, 4), (-1, 4, 2)]:
+            encoded = c.encode_byte(value, dbpb, nr_bytes)
+            self.assertEqual(
+                encoded, reference_encode_byte(value, dbpb, nr_bytes))
+            self.assertEqual(c.decode_byte(encoded, dbpb), value)
+
+    def test_round_trip(self):
+        rng = np.random.RandomState(0)
+        for dbpb, bpv in [(7, 2), (7, 4), (4, 2), (7, 1)]:
+            nr_bits = dbpb*bpv
+            x = rng.randint(-2**(nr_bits-1), 2**(nr_bits-1), 200)
+            data_bytes = c.encode_array(x, dbpb, bpv)
+            self.assertEqual(len(data_bytes), 200*bpv)
+            self.assertEqual(
+                data_bytes, b''.join(reference_encode_byte(v, dbpb, bpv)
+                                     for v in x))
+            # checksum and EOM are ignored
+            message = c.create_message(
+                data_bytes=data_bytes + c.calculate_checksum(data_bytes))
+            if bpv > 1:
+                x_dec = c.decode_message(message, dbpb, bpv)
+                np.testing.assert_array_equal(x, x_dec)
+            ref = [reference_decode_byte(data_bytes[i*bpv:(i+1)*bpv], dbpb)
+                   for i in range(200)]
+            np.testing.assert_array_equal(
+                c.decode_records(message, dbpb, bpv)[:, 0], ref)
+
+    def test_decode_records(self):
+        rng = np.random.RandomState(1)
+        n = 500
+        I = rng.randint(-2**27, 2**27, n)
+        Q = rng.randint(-2**27, 2**27, n)
+        counter = np.arange(n) % 128
+        flags = rng.randint(0, 128, n)
+        records = np.concatenate(
+            [np.frombuffer(c.encode_array(v, 7, bpv), dtype=np.uint8
+                           ).reshape(n, bpv)
+             for v, bpv in [(I, 4), (Q, 4), (counter, 1), (flags, 1)]],
+            axis=1)
+        message = records.tobytes() + b'\x80\x7F'
+        decoded = c.decode_records(
+            message, data_bits_per_byte=[7, 7, 7, 7],
+            bytes_per_value=[4, 4, 1, 1],
+            signed_integer=[True, True, False, False])
+        self.assertEqual(decoded.shape, (n, 4))
+        self.assertEqual(decoded.shape, (n, 4))
+        np.testing.assert_array_equal(decoded[:, 0], I)
+        np.testing.assert_array_equal(decoded[:, 1], Q)
+        np.testing.assert_array_equal(decoded[:, 2], counter)
+        np.testing.assert_array_equal(decoded[:, 3], flags)
+        # per value reference
+        for i in range(0, n, 37):
+            rec = message[10*i:10*(i+1)]
+            self.assertEqual(reference_decode_byte(rec[:4]), decoded[i, 0])
+            self.assertEqual(reference_decode_byte(rec[8:9], 7, False),
+                             decoded[i, 2])
+        with self.assertRaises(ValueError):
+            c.decode_records(message, [7, 7], [4, 4, 1, 1])
+
+    def test_decode_boolean_array(self):
+        states = np.random.RandomState(2).randint(0, 2, 64)
+        nibbles = states.reshape(-1, 4).dot([8, 4, 2, 1])
+        message = bytes(list(nibbles | 0x80)) + b'\x80\x7F'
+        ch0, ch1 = c.decode_boolean_array(message)
+        np.testing.assert_array_equal(ch0, states[:32])
+        np.testing.assert_array_equal(ch1, states[32:])
+
+    def test_checksum(self):
+        command = bytes([0x5A, 0x81, 0x93])
+        self.assertEqual(c.calculate_checksum(command),
+                         bytes([(0x5A ^ 0x81 ^ 0x93) | 128]))
+
+    def test_parity_with_cython_codec(self):
+        try:
+            import pyximport
+        except ImportError:
+            self.skipTest('cython codec not available')
+        # the import hook is only installed while the codec is imported
+        importers = pyximport.install(
+            setup_args={"include_dirs": np.get_include()})
+        try:
+            from pycqed.instrument_drivers.physical_instruments.\
+                _controlbox import codec as cython_codec
+        except ImportError:
+            self.skipTest('cython codec not available')
+        finally:
+            pyximport.uninstall(*importers)
+        x = np.random.RandomState(3).randint(-2**13, 2**13, 100)
+        data_bytes = c.encode_array(x, 7, 2)
+        self.assertEqual(data_bytes, cython_codec.encode_array(x, 7, 2))
+        message = c.create_message(data_bytes=data_bytes)
+        np.testing.assert_array_equal(
+            c.decode_message(message, 7, 2),
+            cython_codec.decode_message(message, 7, 2))
+        for ch, cy_ch in zip(c.decode_boolean_array(message),
+                             cython_codec.decode_boolean_array(message)):
+            np.testing.assert_array_equal(ch, cy_ch)
+
+    def test_decode_1e6_sample_stream(self):
+        # a stream of 10^6 integration streaming records
+        n = int(1e6)
+        I = np.arange(n) - n//2
+        counter = np.arange(n) % 128
+        records = np.concatenate(
+            [np.frombuffer(c.encode_array(v, 7, bpv), dtype=np.uint8
+                           ).reshape(n, bpv)
+             for v, bpv in [(I, 4), (-I, 4), (counter, 1), (counter, 1)]],
+            axis=1)
+        message = records.tobytes() + b'\x80\x7F'
+        decoded = c.decode_records(
+            message, data_bits_per_byte=[7, 7, 7, 7],
+            bytes_per_value=[4, 4, 1, 1],
+            signed_integer=[True, True, False, False])
+        self.assertEqual(decoded.shape, (n, 4))
+        np.testing.assert_array_equal(decoded[:, 0], I)
+        np.testing.assert_array_equal(decoded[:, 1], -I)
+        np.testing.assert_array_equal(decoded[:, 2], counter)
+        np.testing.assert_array_equal(decoded[:, 3], counter)
@@ -0,0 +1,116 @@
+import io
+import unittest
+import numpy as np
+
+from pycqed.instrument_drivers.physical_instruments._controlbox import \
+    numpy_codec as c
+from pycqed.instrument_drivers.physical_instruments._controlbox.\
+    stream_decoder import StreamDecoder
+
+
+def encode_stream(index, terminate=True):
+    '''
+    Encodes integration streaming records with ch0 = index, ch1 = -index
+    and the rolling counter index % 128.
+    '''
+    fields = [(index, 4), (-index, 4), (index % 128, 1),
+              (np.zeros(len(index), dtype=int), 1)]
+    records = np.concatenate(
+        [np.frombuffer(c.encode_array(v, 7, bpv), dtype=np.uint8).reshape(
+            len(index), bpv) for v, bpv in fields], axis=1)
+    message = records.tobytes()
+    if terminate:
+        message += c.calculate_checksum(message) + b'\x7F'
+    return message
+
+
+class Test_StreamDecoder(unittest.TestCase):
+
+    def test_decode_in_blocks(self):
+        index = np.arange(1000)
+        message = encode_stream(index)
+        blocks = []
+        decoder = StreamDecoder(800, callback=blocks.append)
+        # split at random points, also within records and between the
+        # checksum and EOM
+        splits = np.sort(np.random.RandomState(0).randint(
+            0, len(message), 50))
+        splits = np.append(splits, len(message) - 1)
+        for chunk in np.split(np.frombuffer(message, dtype=np.uint8),
+                              splits):
+            self.assertFalse(decoder.finished)
+            decoder.feed(chunk.tobytes())
+        self.assertTrue(decoder.finished)
+        self.assertEqual(decoder.nr_records, 1000)
+        self.assertEqual(decoder.checksum, message[-2:-1])
+        np.testing.assert_array_equal(np.concatenate(blocks)[:, 0], index)
+
+        data = decoder.get_data()
+        self.assertEqual(data.shape, (4, 800))
+        np.testing.assert_array_equal(data[0], index[:800])
+        np.testing.assert_array_equal(data[1], -index[:800])
+        np.testing.assert_array_equal(data[2], index[:800] % 128)
+        with self.assertRaises(ValueError):
+            decoder.feed(b'\x80')
+
+    def test_ring_buffer(self):
+        decoder = StreamDecoder(300, ring_buffer=True)
+        message = encode_stream(np.arange(1000), terminate=False)
+        for i in range(0, len(message), 770):
+            decoder.feed(message[i:i+770])
+        np.testing.assert_array_equal(decoder.get_data()[0],
+                                      np.arange(700, 1000))
+        decoder.feed(encode_stream(np.arange(1000, 1020)))
+        np.testing.assert_array_equal(decoder.get_data()[0],
+                                      np.arange(720, 1020))
+
+    def test_data_loss(self):
+        index = np.delete(np.arange(500), 321)
+        message = encode_stream(index)
+        decoder = StreamDecoder(500)
+        decoder.feed(message[:3000])
+        with self.assertRaises(ValueError) as cm:
+            decoder.feed(message[3000:])
+        self.assertIn('Data lost at entry 321', str(cm.exception))
+
+
+class Test_CBox_streaming_mock(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(self):
+        from pycqed.instrument_drivers.physical_instruments._controlbox \
+            import Mock_QuTech_ControlBoxdriver as mqcb
+        self.CBox = mqcb.Mock_QuTech_ControlBox(
+            io.StringIO(), name='Mock_CBox_streaming', address='Dummy')
+        self.CBox.stream_block_size = 97
+
+    @classmethod
+    def tearDownClass(self):
+        self.CBox.close()
+
+    def setUp(self):
+        self.CBox.stream_dropped_records = set()
+
+    def test_get_streaming_results(self):
+        blocks = []
+        data = self.CBox.get_streaming_results(1000, callback=blocks.append)
+        self.assertEqual(data.shape, (3, 1000))
+        np.testing.assert_array_equal(data[0], np.arange(1000))
+        np.testing.assert_array_equal(data[1], -np.arange(1000))
+        np.testing.assert_array_equal(data[2], np.arange(1000) % 128)
+        self.assertGreater(len(blocks), 1)
+
+    def test_iter_streaming_results(self):
+        nr_received = 0
+        for block in self.CBox.iter_streaming_results(500):
+            np.testing.assert_array_equal(
+                block[:, 0], nr_received + np.arange(len(block)))
+            nr_received += len(block)
+        self.assertGreaterEqual(nr_received, 500)
+
+    def test_streaming_data_loss(self):
+        self.CBox.stream_dropped_records = {250}
+        with self.assertRaises(ValueError):
+            self.CBox.get_streaming_results(1000)
+        # the stream is stopped
+        self.assertFalse(self.CBox._streaming)
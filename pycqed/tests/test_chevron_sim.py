@@ -36,3 +36,30 @@ class TestChevronSim(TestCase):
                              self.distortion)
         self.assertEqual(np.shape(result),
                          (len(self.freq_vec), len(self.time_vec)+1))
+
+    def test_vectorized_chevron(self):
+        args = (2.*np.pi*(6.552 - 4.8), self.e_min, self.e_max,
+                self.e_points, np.pi*0.0385, self.time_stop,
+                self.time_step, self.distortion)
+        np.testing.assert_array_almost_equal(chs.chevron_vectorized(*args),
+                                             chs.chevron(*args))
+
+    def test_vectorized_chevron_slice(self):
+        e0 = 2.*np.pi*(6.552 - 4.8)
+        g = np.pi*0.0385
+        energies = [0.99, 1., 1.01]
+        slices = chs.chevron_slices(e0, energies, g, self.time_stop,
+                                    self.time_step, self.distortion)
+        for energy, chev_slice in zip(energies, slices):
+            np.testing.assert_array_almost_equal(
+                chev_slice, chs.chevron_slice(e0, energy, g, self.time_stop,
+                                              self.time_step,
+                                              self.distortion))
+
+    def test_propagators(self):
+        energies = np.array([-2., 0., 0.3, 5.])
+        for g in [0., 0.2]:
+            U = chs.propagators(energies, g, 0.7)
+            for i, e in enumerate(energies):
+                np.testing.assert_array_almost_equal(U[i],
+                                                     chs.evol(e, g, 0.7))
@@ -1,3 +1,6 @@
+import os
+import shutil
+import tempfile
 import numpy as np
 from unittest import TestCase
 
@@ -9,6 +12,8 @@ import pycqed.measurement.randomized_benchmarking.randomized_benchmarking \
 
 from pycqed.measurement.randomized_benchmarking.clifford_decompositions \
     import(gate_decomposition)
+from pycqed.measurement.randomized_benchmarking import \
+    clifford_group_two_qubits as c2q
 
 
 class TestLookuptable(TestCase):
@@ -78,6 +83,46 @@ class TestRB_sequence(TestCase):
         self.assertTrue((rb_seq_b != rb_seq_d).any)
 
 
+class TestRB_sequences_batch(TestCase):
+    def test_recovery_table(self):
+        for cl_in in range(24):
+            for des_cl in range(24):
+                rec_cl = rb.clifford_recovery_table[cl_in, des_cl]
+                self.assertEqual(clifford_lookuptable[cl_in, rec_cl], des_cl)
+
+    def test_net_cliffords(self):
+        cliffords = np.random.randint(0, 24, (10, 37))
+        net_cls = rb.calculate_net_cliffords(cliffords)
+        cum_net_cls = rb.calculate_cumulative_net_cliffords(cliffords)
+        for i, seq in enumerate(cliffords):
+            # reference fold over the lookuptable
+            net_cl = 0
+            for j, cl in enumerate(seq):
+                net_cl = clifford_lookuptable[net_cl, cl]
+                self.assertEqual(cum_net_cls[i, j], net_cl)
+            self.assertEqual(net_cls[i], net_cl)
+
+    def test_reproduces_single_seed(self):
+        nr_cliffords = [0, 1, 7, 100, 32]
+        seeds = [0, 5, 12, 1234]
+        rb_seqs = rb.randomized_benchmarking_sequences(
+            nr_cliffords, seeds=seeds, desired_net_cl=3)
+        for n_cl, seqs in zip(nr_cliffords, rb_seqs):
+            self.assertEqual(seqs.shape, (len(seeds), n_cl+1))
+            for seed, seq in zip(seeds, seqs):
+                np.testing.assert_array_equal(
+                    seq, rb.randomized_benchmarking_sequence(
+                        n_cl, desired_net_cl=3, seed=seed))
+
+    def test_net_cliff(self):
+        rb_seqs = rb.randomized_benchmarking_sequences(
+            [10, 500], nr_seeds=20, desired_net_cl=6)
+        for seqs in rb_seqs:
+            self.assertEqual(len(seqs), 20)
+            for seq in seqs:
+                self.assertEqual(rb.calculate_net_clifford(seq), 6)
+
+
 class TestGateDecomposition(TestCase):
     def test_unique_elements(self):
         for gate in gate_decomposition:
@@ -87,3 +132,63 @@ class TestGateDecomposition(TestCase):
         from itertools import chain
         avg_nr_gates = len(list(chain(*gate_decomposition)))/24
         self.assertEqual(avg_nr_gates, 1.875)
+
+
+class TestTwoQubitCliffordGroup(TestCase):
+    @classmethod
+    def setUpClass(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self._old_cache_path = c2q.table_cache_path
+        c2q.table_cache_path = os.path.join(self.tmpdir, 'tables.npz')
+        c2q._tables.clear()
+
+    @classmethod
+    def tearDownClass(self):
+        c2q.table_cache_path = self._old_cache_path
+        c2q._tables.clear()
+        shutil.rmtree(self.tmpdir)
+
+    def test_single_qubit_cliffords(self):
+        # composition agrees with the single qubit lookuptable
+        for q in [0, 1]:
+            for i in range(24):
+                for j in range(24):
+                    self.assertEqual(
+                        c2q.compose_tableaus(c2q.single_qubit_tableau(i, q),
+                                             c2q.single_qubit_tableau(j, q)),
+                        c2q.single_qubit_tableau(
+                            clifford_lookuptable[i, j], q))
+        self.assertEqual(c2q.compose(3, 24*3), 24*3+3)
+
+    def test_group_is_complete(self):
+        tables = c2q.get_tables()
+        self.assertEqual(len(np.unique(tables['codes'])), 11520)
+        self.assertTrue(os.path.isfile(c2q.table_cache_path))
+        # cached tables are loaded from disk
+        c2q._tables.clear()
+        np.testing.assert_array_equal(c2q.get_tables()['codes'],
+                                      tables['codes'])
+
+    def test_cz_squared_is_identity(self):
+        tableau = c2q.decomposition_tableau(['CZ', 'CZ'])
+        self.assertEqual(c2q.clifford_index(tableau), 0)
+
+    def test_inverse(self):
+        for cl in np.random.randint(0, 11520, 200):
+            self.assertEqual(c2q.compose(cl, c2q.inverse(cl)), 0)
+            self.assertEqual(c2q.compose(c2q.inverse(cl), cl), 0)
+
+    def test_decomposition_matches_tableau(self):
+        for cl in np.random.randint(0, 11520, 50):
+            tableau = c2q.decomposition_tableau(
+                c2q.decompose_clifford_seq([cl]))
+            self.assertEqual(c2q.clifford_index(tableau), cl)
+
+    def test_rb_sequence(self):
+        for des_cl in [0, 5, 7000]:
+            rb_seq = rb.two_qubit_randomized_benchmarking_sequence(
+                50, desired_net_cl=des_cl)
+            self.assertEqual(c2q.calculate_net_clifford(rb_seq), des_cl)
+        rb_seq_a = rb.two_qubit_randomized_benchmarking_sequence(20, seed=3)
+        rb_seq_b = rb.two_qubit_randomized_benchmarking_sequence(20, seed=3)
+        np.testing.assert_array_equal(rb_seq_a, rb_seq_b)
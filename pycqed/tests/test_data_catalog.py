@@ -0,0 +1,165 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from pycqed.analysis import analysis_toolbox as a_tools
+from pycqed.utilities import data_catalog
+
+
+class Test_DataCatalog(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.datadir = os.path.join(self.tmpdir, 'data')
+        self.measdirs = {
+            '20170101': ['090000_T1_q0', '100000_Ramsey_q0',
+                         '110000_T1_q1'],
+            '20170102': ['080000_T1_q0', '080500_Echo_q0'],
+            '20170104': ['120000_Ramsey_q1', '130000_T1_q0']}
+        for day, dirs in self.measdirs.items():
+            for d in dirs:
+                os.makedirs(os.path.join(self.datadir, day, d))
+        # not a measurement folder, should be ignored
+        os.makedirs(os.path.join(self.datadir, 'notes'))
+
+        self.catalog = data_catalog.DataCatalog(
+            self.datadir, os.path.join(self.tmpdir, 'catalog.sqlite'))
+        data_catalog._catalogs[os.path.abspath(self.datadir)] = self.catalog
+        self._old_datadir = a_tools.datadir
+        self._old_use_data_catalog = a_tools.use_data_catalog
+        a_tools.datadir = self.datadir
+
+    def tearDown(self):
+        a_tools.datadir = self._old_datadir
+        a_tools.use_data_catalog = self._old_use_data_catalog
+        del data_catalog._catalogs[os.path.abspath(self.datadir)]
+        self.catalog.close()
+        shutil.rmtree(self.tmpdir)
+
+    def compare_with_directory_scan(self, func, *args, **kw):
+        a_tools.use_data_catalog = True
+        catalog_result = func(*args, **kw)
+        a_tools.use_data_catalog = False
+        scan_result = func(*args, **kw)
+        self.assertEqual(catalog_result, scan_result)
+        return catalog_result
+
+    def test_latest_data(self):
+        folder = self.compare_with_directory_scan(a_tools.latest_data)
+        self.assertEqual(folder, os.path.join(
+            self.datadir, '20170104', '130000_T1_q0'))
+        self.compare_with_directory_scan(a_tools.latest_data, 'Ramsey')
+        self.compare_with_directory_scan(
+            a_tools.latest_data, 'T1', older_than='20170102_080000')
+        self.compare_with_directory_scan(
+            a_tools.latest_data, 'T1', older_than='20170102_080000',
+            or_equal=True, return_timestamp=True)
+        self.compare_with_directory_scan(
+            a_tools.latest_data, 'q0', newer_than='20170101_090000',
+            older_than='20170102_120000', return_all=True)
+        self.compare_with_directory_scan(a_tools.latest_data, 'Rabi')
+        with self.assertRaises(Exception):
+            a_tools.use_data_catalog = True
+            a_tools.latest_data('Rabi', raise_exc=True)
+
+    def test_data_from_time(self):
+        folder = self.compare_with_directory_scan(
+            a_tools.data_from_time, '20170101_100000')
+        self.assertEqual(folder, os.path.join(
+            self.datadir, '20170101', '100000_Ramsey_q0'))
+        a_tools.use_data_catalog = True
+        with self.assertRaises(KeyError):
+            a_tools.data_from_time('20170103_100000')
+        with self.assertRaises(KeyError):
+            a_tools.data_from_time('20170101_100001')
+
+    def test_timestamps(self):
+        self.compare_with_directory_scan(
+            a_tools.return_last_n_timestamps, 3, contains='T1')
+        timestamps = self.compare_with_directory_scan(
+            a_tools.get_timestamps_in_range, '20170101_100000',
+            '20170102_080500', label='q0')
+        self.assertEqual(timestamps, ['20170101_100000', '20170102_080000',
+                                      '20170102_080500'])
+
+    def test_new_measurements(self):
+        a_tools.use_data_catalog = True
+        self.assertEqual(a_tools.latest_data('Echo'), os.path.join(
+            self.datadir, '20170102', '080500_Echo_q0'))
+        # new measurement in the latest day
+        os.makedirs(os.path.join(self.datadir, '20170104', '140000_Echo_q1'))
+        self.set_day_mtime('20170104', 10)
+        self.assertEqual(a_tools.latest_data('Echo'), os.path.join(
+            self.datadir, '20170104', '140000_Echo_q1'))
+        # new day
+        new_folder = os.path.join(self.datadir, '20170105', '010000_Echo_q1')
+        os.makedirs(new_folder)
+        self.assertEqual(a_tools.latest_data('Echo'), new_folder)
+        # measurement registered directly, as done by hdf5_data.Data
+        new_folder = os.path.join(self.datadir, '20170105', '020000_Echo_q0')
+        os.makedirs(new_folder)
+        data_catalog.register_measurement(self.datadir, new_folder)
+        self.assertEqual(self.catalog.latest('Echo'),
+                         ('20170105', '020000_Echo_q0'))
+
+    def set_day_mtime(self, day, delta):
+        # file systems with coarse time stamps may not register the change
+        day_folder = os.path.join(self.datadir, day)
+        mtime = os.stat(day_folder).st_mtime + delta
+        os.utime(day_folder, (mtime, mtime))
+
+    def test_refresh_modified_days(self):
+        self.catalog.refresh()
+        # only the newest day is rescanned if the data directory did not
+        # change
+        indexed_days = []
+        index_day = self.catalog.index_day
+        self.catalog.index_day = lambda day: indexed_days.append(day) or \
+            index_day(day)
+        self.catalog.refresh()
+        self.assertEqual(indexed_days, ['20170104'])
+        indexed_days.clear()
+
+        # an older day with a renamed and a new measurement
+        day_folder = os.path.join(self.datadir, '20170101')
+        os.rename(os.path.join(day_folder, '110000_T1_q1'),
+                  os.path.join(day_folder, '110000_T1_q2'))
+        os.makedirs(os.path.join(day_folder, '120000_Rabi_q0'))
+        self.set_day_mtime('20170101', 10)
+        # a removed day
+        shutil.rmtree(os.path.join(self.datadir, '20170102'))
+        self.catalog.refresh()
+        self.assertEqual(indexed_days, ['20170101', '20170104', '20170102'])
+        self.assertEqual(self.catalog.day_measurements('20170101'),
+                         ['090000_T1_q0', '100000_Ramsey_q0',
+                          '110000_T1_q2', '120000_Rabi_q0'])
+        self.assertFalse(self.catalog.is_day_indexed('20170102'))
+        self.compare_with_directory_scan(a_tools.latest_data, 'T1',
+                                         older_than='20170103_000000')
+
+    def test_new_measurement_same_mtime(self):
+        # a measurement created in the same time stamp tick of the file
+        # system as the last refresh
+        self.catalog.refresh()
+        day_folder = os.path.join(self.datadir, '20170104')
+        mtime = os.stat(day_folder).st_mtime
+        os.makedirs(os.path.join(day_folder, '140000_Echo_q1'))
+        os.utime(day_folder, (mtime, mtime))
+        a_tools.use_data_catalog = True
+        self.assertEqual(a_tools.latest_data(), os.path.join(
+            day_folder, '140000_Echo_q1'))
+
+    def test_empty_datadir(self):
+        shutil.rmtree(self.datadir)
+        os.makedirs(self.datadir)
+        folder = self.compare_with_directory_scan(a_tools.latest_data)
+        self.assertIsNone(folder)
+
+    def test_rebuild(self):
+        self.catalog.refresh()
+        shutil.rmtree(os.path.join(self.datadir, '20170101', '110000_T1_q1'))
+        self.assertIn('20170101110000', self.catalog.timestamps())
+        self.catalog.rebuild()
+        self.assertNotIn('20170101110000', self.catalog.timestamps())
+        self.assertEqual(len(self.catalog.timestamps()), 6)
@@ -0,0 +1,75 @@
+import unittest
+import numpy as np
+
+from pycqed.instrument_drivers.virtual_instruments import flipping_model as fm
+
+
+def shot_statistics(shots):
+    '''
+    Fraction of -1 shots, of repeated shots and of shots equal to the
+    shot two before.
+    '''
+    return np.array([np.mean(shots == -1),
+                     np.mean(shots[1:] == shots[:-1]),
+                     np.mean(shots[2:] == shots[:-2])])
+
+
+class Test_FlippingModel(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(self):
+        self.model = fm.FlippingModel('flipping_model_test')
+
+    @classmethod
+    def tearDownClass(self):
+        self.model.close()
+
+    def test_statistics_match_loop(self):
+        m = self.model
+        m.N_shots(100000)
+        m.seed(0)
+        for F_g, F_discr, tau_d in [(0.99, 0.98, 0), (0.995, 0.95, 3e-6),
+                                    (0.9, 1, 50e-6)]:
+            m.F_g(F_g)
+            m.F_discr(F_discr)
+            m.tau_d(tau_d)
+            m.T1(20e-6)
+            m.N_cl(20)
+            stats_vec = shot_statistics(m.measure_shots())
+            stats_loop = shot_statistics(m._measure_nshots_loop())
+            np.testing.assert_allclose(stats_vec, stats_loop, atol=0.01)
+
+    def test_relaxation(self):
+        # without flips the -1 state relaxes and stays in +1
+        rng = np.random.RandomState(1)
+        shots = fm.simulate_shots(1000, -1, P_RB=0, p_relax=0.1,
+                                  F_discr=1, rng=rng)
+        first_relaxed = np.argmax(shots == 1)
+        self.assertTrue(np.all(shots[:first_relaxed] == -1))
+        self.assertTrue(np.all(shots[first_relaxed:] == 1))
+        # always flipping
+        shots = fm.simulate_shots(10, 1, P_RB=1, p_relax=0, F_discr=1)
+        np.testing.assert_array_equal(shots, [-1, 1]*5)
+
+    def test_seed(self):
+        m = self.model
+        m.N_shots(1000)
+        m.F_g(0.99)
+        m.tau_d(1e-6)
+        m.seed(42)
+        shots_a = m.measure_shots()
+        m.seed(42)
+        np.testing.assert_array_equal(shots_a, m.measure_shots())
+
+    def test_million_shots(self):
+        m = self.model
+        m.N_shots(int(1e6))
+        m.tau_d(1e-6)
+        m.seed(0)
+        shots = m.measure_shots()
+        self.assertEqual(len(shots), int(1e6))
+        self.assertEqual(set(np.unique(shots)), {-1, 1})
+        # the statistics of the first and second half agree
+        np.testing.assert_allclose(shot_statistics(shots[:500000]),
+                                   shot_statistics(shots[500000:]),
+                                   atol=0.01)
@@ -0,0 +1,69 @@
+import os
+import shutil
+import tempfile
+import unittest
+import numpy as np
+import h5py
+
+from pycqed.measurement.hdf5_data import BufferedDataset
+
+
+class Test_BufferedDataset(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.f = h5py.File(os.path.join(self.tmpdir, 'test.hdf5'), 'a')
+        self.h5_dset = self.f.create_dataset('Data', (0, 3),
+                                             maxshape=(None, 3),
+                                             chunks=True)
+
+    def tearDown(self):
+        self.f.close()
+        shutil.rmtree(self.tmpdir)
+
+    def test_buffered_writes(self):
+        dset = BufferedDataset(self.h5_dset, expected_rows=10,
+                               flush_interval=1e3, max_buffered_rows=100)
+        for i in range(10):
+            dset.resize((i+1, 3))
+            dset[i:i+1, :] = [i, 2*i, 3*i]
+            dset.flush()
+        self.assertEqual(dset.shape, (10, 3))
+        # nothing written yet because the flush interval is long
+        self.assertEqual(self.h5_dset.shape, (0, 3))
+        np.testing.assert_array_equal(dset[:, 1], 2*np.arange(10))
+
+        dset.flush(force=True)
+        self.assertEqual(self.h5_dset.shape, (10, 3))
+        np.testing.assert_array_equal(self.h5_dset[()], dset[()])
+
+    def test_flush_on_buffer_size(self):
+        dset = BufferedDataset(self.h5_dset, flush_interval=1e3,
+                               max_buffered_rows=4)
+        for i in range(6):
+            dset.resize((i+1, 3))
+            dset[i, :] = i
+            dset.flush()
+        # flushed once after 4 rows were buffered
+        self.assertEqual(self.h5_dset.shape, (4, 3))
+        dset.flush(force=True)
+        np.testing.assert_array_equal(self.h5_dset[:, 0], np.arange(6))
+
+    def test_grow_beyond_expected_rows(self):
+        dset = BufferedDataset(self.h5_dset, expected_rows=2)
+        dset.resize((50, 3))
+        dset[:, 0] = np.arange(50)
+        dset.flush(force=True)
+        np.testing.assert_array_equal(self.h5_dset[:, 0], np.arange(50))
+        np.testing.assert_array_equal(self.h5_dset[:, 1:], 0)
+
+    def test_soft_average_in_memory(self):
+        dset = BufferedDataset(self.h5_dset, expected_rows=5)
+        dset.resize((5, 3))
+        for soft_iteration in range(4):
+            new_data = np.ones((5, 2))*soft_iteration
+            old_vals = dset[:, 1:]
+            dset[:, 1:] = ((new_data + old_vals*soft_iteration) /
+                           (1+soft_iteration))
+        dset.flush(force=True)
+        np.testing.assert_array_almost_equal(self.h5_dset[:, 1:], 1.5)
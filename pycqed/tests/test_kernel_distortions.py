@@ -1,4 +1,6 @@
 import os
+import shutil
+import tempfile
 import pycqed as pq
 import unittest
 import numpy as np
@@ -6,6 +8,7 @@ import numpy as np
 from pycqed.instrument_drivers.meta_instrument import kernel_object as ko
 
 from pycqed.measurement import kernel_functions as kf
+from pycqed.measurement.waveform_control import kernel_distortion_module as kdm
 
 from qcodes import station
 
@@ -116,7 +119,50 @@ class Test_KernelObject(unittest.TestCase):
         np.testing.assert_array_equal(kObj_skin, skin_cache)
 
     def test_convolve_kernel(self):
-        pass
+        kernel_list = [kf.skin_kernel(alpha=.1, length=300),
+                       kf.bounce_kernel(amp=0, time=4, length=100),
+                       kf.decay_kernel(amp=.9, tau=40, length=500),
+                       kf.bounce_kernel(amp=.02, time=4, length=30)]
+        # serial direct convolution, truncated after every step
+        expected = kernel_list[0]
+        for k in kernel_list[1:]:
+            expected = np.convolve(k, expected)[:max(len(k), len(expected))]
+        np.testing.assert_array_almost_equal(
+            self.k1.convolve_kernel(kernel_list), expected)
+
+    def test_component_kernels_cached(self):
+        self.k1.skineffect_alpha(0.05)
+        self.k1.skineffect_length(50)
+        skin_kernel = self.k1.get_skin_kernel()
+        cached = self.k1._component_kernels['skin'][1]
+        self.k1.get_skin_kernel()
+        self.assertIs(self.k1._component_kernels['skin'][1], cached)
+        # changing a parameter invalidates the cached kernel
+        self.k1.skineffect_alpha(0.06)
+        self.assertNotIn('skin', self.k1._component_kernels)
+        np.testing.assert_array_equal(
+            self.k1.get_skin_kernel(), kf.skin_kernel(alpha=.06, length=50))
+        self.assertFalse(np.array_equal(skin_kernel,
+                                        self.k1.get_skin_kernel()))
+
+    def test_external_kernel_reloaded_when_modified(self):
+        tmpdir = tempfile.mkdtemp()
+        try:
+            f_name = os.path.join(tmpdir, 'RT_kernel.txt')
+            np.savetxt(f_name, np.ones(10))
+            self.k1.kernel_dir_path(tmpdir)
+            self.k1.kernel_list(['RT_kernel.txt'])
+            kernel = self.k1.kernel()
+            self.assertIs(self.k1.kernel(), kernel)
+
+            np.savetxt(f_name, 2*np.ones(10))
+            mtime = os.path.getmtime(f_name)
+            os.utime(f_name, (mtime+10, mtime+10))
+            np.testing.assert_array_almost_equal(self.k1.kernel(),
+                                                 2*kernel)
+        finally:
+            self.k1.kernel_list([])
+            shutil.rmtree(tmpdir)
 
     # def test_kernel_loading(self):
         # self.k0.corrections_length(50)  # ns todo rescale.
@@ -159,3 +205,69 @@ class Test_Kernel_functions(unittest.TestCase):
             -1.08294205e-05])
         np.testing.assert_array_almost_equal(
             skin_kernel_test, known_skin_vals, decimal=7)
+
+
+class Test_kernel_distortion_module(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(self):
+        self.tmpdir = tempfile.mkdtemp()
+        self.kernels = [kf.skin_kernel(alpha=.1, length=300),
+                        kf.bounce_kernel(amp=.02, time=4, length=300),
+                        kf.decay_kernel(amp=.9, tau=40, length=300)]
+        self.kernel_paths = []
+        for i, k in enumerate(self.kernels):
+            path = os.path.join(self.tmpdir, 'kernel_{}.txt'.format(i))
+            np.savetxt(path, k)
+            self.kernel_paths.append(path)
+
+    @classmethod
+    def tearDownClass(self):
+        shutil.rmtree(self.tmpdir)
+
+    def test_kernel_matrix_from_file(self):
+        kernel_mat = kdm.kernel_matrix_from_file(self.kernel_paths[0],
+                                                 max_len=None)
+        self.assertEqual(kernel_mat.shape, (300, 300))
+        np.testing.assert_array_almost_equal(kernel_mat[:, 0],
+                                             self.kernels[0])
+        # lower triangular Toeplitz matrix
+        np.testing.assert_array_equal(np.triu(kernel_mat, 1), 0)
+        np.testing.assert_array_almost_equal(kernel_mat[5:, 5],
+                                             self.kernels[0][:-5])
+
+    def test_composition_matches_matrix_product(self):
+        kernel_mat = kdm.kernel_from_list(self.kernel_paths, max_len=None)
+        kernel_vec = kdm.kernel_vector_from_list(self.kernel_paths,
+                                                 max_len=None)
+        np.testing.assert_array_almost_equal(kernel_mat[:, 0], kernel_vec)
+        np.testing.assert_array_almost_equal(
+            kernel_mat, kdm.matrix_from_kernel(kernel_vec))
+
+        kernel_mat = kdm.kernel_from_list(self.kernel_paths, max_len=100)
+        kernel_vec = kdm.kernel_vector_from_list(self.kernel_paths,
+                                                 max_len=100)
+        np.testing.assert_array_almost_equal(kernel_mat[:, 0], kernel_vec)
+
+    def test_convolve(self):
+        a = np.random.rand(200)
+        for b in [np.random.rand(10), np.random.rand(300)]:
+            np.testing.assert_array_almost_equal(kdm.convolve(a, b),
+                                                 np.convolve(a, b))
+        self.assertTrue(kdm.is_identity_kernel(
+            kf.bounce_kernel(amp=0, time=4, length=30)))
+        self.assertFalse(kdm.is_identity_kernel(self.kernels[1]))
+
+    def test_apply_kernel_matches_matrix(self):
+        kernel_mat = kdm.kernel_from_list(self.kernel_paths, max_len=None)
+        kernel_vec = kdm.kernel_vector_from_list(self.kernel_paths,
+                                                 max_len=None)
+        waveform = np.concatenate([np.zeros(20), np.ones(200),
+                                   np.zeros(80)])
+        np.testing.assert_array_almost_equal(
+            kdm.apply_kernel(waveform, kernel_vec),
+            np.dot(kernel_mat, waveform))
+        # short waveforms use a truncated kernel
+        np.testing.assert_array_almost_equal(
+            kdm.apply_kernel(waveform[:30], kernel_vec),
+            np.dot(kernel_mat[:30, :30], waveform[:30]))
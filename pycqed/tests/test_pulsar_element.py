@@ -5,6 +5,7 @@ import unittest
 
 from pycqed.measurement.waveform_control.pulsar import Pulsar
 from pycqed.measurement.waveform_control import element
+from pycqed.measurement.waveform_control.sequence import Sequence
 from pycqed.measurement.waveform_control.pulse import SquarePulse
 
 
@@ -110,3 +111,146 @@ class Test_Element(unittest.TestCase):
     #             self.assertTrue(ch in test_elt.distorted_wfs.keys())
     #         else:
     #             self.assertFalse(item['distorted'])
+
+
+class MockAWG:
+    """
+    Records the waveforms and sequence that pulsar sends to the AWG.
+    """
+
+    def __getattr__(self, name):
+        # parameters used in Pulsar.update_channel_settings
+        class _Par:
+            def get_latest(self):
+                return None
+        return _Par()
+
+    def get(self, name):
+        return 1.4 if name.endswith('amp') else 0.
+
+    def set(self, name, value):
+        pass
+
+    def timeout(self, val=None):
+        return 10
+
+    def pack_waveform(self, wf, m1, m2):
+        return np.round(8191*(wf+1)).astype(np.uint16) + \
+            (m1 * 2**14).astype(np.uint16) + (m2 * 2**15).astype(np.uint16)
+
+    def generate_awg_file(self, packed_waveforms, wfname_l, *args):
+        self.packed_waveforms = packed_waveforms
+        self.wfname_l = wfname_l
+        return b''
+
+    def send_awg_file(self, filename, awg_file):
+        pass
+
+    def load_awg_file(self, filename):
+        pass
+
+    def is_awg_ready(self):
+        return True
+
+
+class Test_Pulsar_program_awg(unittest.TestCase):
+
+    def setUp(self):
+        self.pulsar = Pulsar()
+        self.pulsar.AWG = MockAWG()
+        for i in range(2):
+            self.pulsar.define_channel(id='ch{}'.format(i+1),
+                                       name='ch{}'.format(i+1),
+                                       type='analog',
+                                       high=.7, low=-.7,
+                                       offset=0.0, delay=0, active=True)
+
+    def make_sequence(self):
+        seq = Sequence('test_seq')
+        elements = []
+        for i, amp in enumerate([.1, .3, .1, .1]):
+            elt = element.Element('elt_{}'.format(i), pulsar=self.pulsar)
+            elt.add(SquarePulse(name='sq', channel='ch1',
+                                amplitude=amp, length=20e-9))
+            elements.append(elt)
+            seq.append(name=elt.name, wfname=elt.name, trigger_wait=True)
+        return seq, elements
+
+    def test_deduplicated_upload(self):
+        seq, elements = self.make_sequence()
+        self.pulsar.program_awg(seq, *elements)
+        awg = self.pulsar.AWG
+        # ch1 has 2 unique waveforms, ch2 is always empty
+        self.assertEqual(sorted(awg.packed_waveforms.keys()),
+                         ['elt_0_ch1', 'elt_0_ch2', 'elt_1_ch1'])
+        np.testing.assert_array_equal(
+            awg.wfname_l,
+            [['elt_0_ch1', 'elt_1_ch1', 'elt_0_ch1', 'elt_0_ch1'],
+             ['elt_0_ch2', 'elt_0_ch2', 'elt_0_ch2', 'elt_0_ch2']])
+
+        self.pulsar.program_awg(seq, *elements, deduplicate=False)
+        self.assertEqual(len(awg.packed_waveforms), 8)
+        np.testing.assert_array_equal(
+            awg.wfname_l[0], ['elt_0_ch1', 'elt_1_ch1', 'elt_2_ch1',
+                              'elt_3_ch1'])
+
+
+class Test_Sequence(unittest.TestCase):
+
+    def setUp(self):
+        self.pulsar = Pulsar()
+
+    def test_element_index(self):
+        seq = Sequence('test_seq')
+        for name in ['a', 'c', 'e']:
+            seq.append(name=name, wfname=name)
+        self.assertTrue(seq.insert_element('b', 'b', pos=1))
+        self.assertTrue(seq.insert_element('d', 'd', pos=3))
+        self.assertFalse(seq.insert_element('c', 'c', pos=0))
+        for i, name in enumerate(['a', 'b', 'c', 'd', 'e']):
+            self.assertEqual(seq.element_index(name), i+1)
+            self.assertEqual(seq.element_index(name, start_idx=0), i)
+        with self.assertRaises(ValueError):
+            seq.element_index('f')
+        # modifying the list of elements directly
+        seq.elements.append(seq._make_element_spec('f', 'f', 1, None, None,
+                                                   False))
+        self.assertEqual(seq.element_index('f'), 6)
+        # direct modifications that keep the number of elements
+        seq.elements[1] = seq._make_element_spec('g', 'g', 1, None, None,
+                                                 False)
+        self.assertEqual(seq.element_index('g'), 2)
+        with self.assertRaises(ValueError):
+            seq.element_index('b')
+        self.assertTrue(seq.insert_element('b', 'b'))
+        seq.elements.pop(0)
+        seq.elements.append(seq._make_element_spec('h', 'h', 1, None, None,
+                                                   False))
+        for i, name in enumerate(['g', 'c', 'd', 'e', 'f', 'b', 'h']):
+            self.assertEqual(seq.element_index(name), i+1)
+        self.assertFalse(seq.insert_element('h', 'h'))
+
+    def test_from_elements(self):
+        elements = [element.Element('elt_{}'.format(i), pulsar=self.pulsar)
+                    for i in range(5)]
+        seq = Sequence.from_elements('test_seq', elements,
+                                     trigger_wait=True)
+        self.assertEqual(seq.element_count(), 5)
+        self.assertTrue(all(elt['trigger_wait'] for elt in seq.elements))
+        self.assertEqual(seq.element_index('elt_3'), 4)
+        self.assertFalse(seq.extend(elements[:1]))
+        self.assertEqual(seq.element_count(), 5)
+
+    def test_goto_targets(self):
+        # a goto target for every element up to the limit of 8000 elements
+        # of the AWG, looked up as done in Pulsar.program_awg
+        n = 8000
+        seq = Sequence('test_seq')
+        for i in range(n):
+            seq.append(name='elt_{}'.format(i), wfname='wf',
+                       goto_target='elt_{}'.format((i+1) % n))
+        seq.insert_element('elt_start', 'wf', pos=0)
+        self.assertEqual(seq.element_count(), n+1)
+        for i, elt in enumerate(seq.elements[1:]):
+            self.assertEqual(seq.element_index(elt['goto_target']),
+                             (i+1) % n + 2)
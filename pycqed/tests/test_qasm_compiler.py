@@ -1,5 +1,6 @@
 
 import sys
+import tempfile
 import numpy as np
 from io import StringIO
 from unittest import TestCase
@@ -312,6 +313,79 @@ class Test_qasm_to_asm(TestCase):
             qta.qasm_to_asm(qasm_file.name, self.operation_dict)
 
 
+class Test_in_memory_compilation(TestCase):
+
+    @classmethod
+    def setUpClass(self):
+        self.qubit_name = 'q0'
+        self.operation_dict = {
+            'init_all': {'instruction': 'WaitReg r0 \n'},
+            'RO q0': {'duration': 8, 'instruction': 'Trigger 0010000, 2 \n'},
+            'I q0': {'duration': None, 'instruction': 'wait {} \n'}}
+        for i, op in enumerate(['X180', 'X90', 'Y180', 'Y90',
+                                'mX180', 'mX90', 'mY180', 'mY90']):
+            self.operation_dict[op + ' q0'] = {
+                'duration': 2,
+                'instruction': 'pulse {:04b}, 0000, 0000 \n'.format(i)}
+
+    def test_compile_matches_files(self):
+        times = np.linspace(20e-9, 50e-6, 61)
+        for seq, args in [(sq_qasm.T1, (times, )),
+                          (sq_qasm.AllXY, ()),
+                          (sq_qasm.butterfly, (True, ))]:
+            qasm_file = seq(self.qubit_name, *args)
+            asm_file = qta.qasm_to_asm(qasm_file.name, self.operation_dict)
+            ref = Assembler.Assembler(asm_file.name).convert_to_instructions(
+                use_cache=False)
+
+            qasm_lines = seq(self.qubit_name, *args, write_file=False)
+            self.assertEqual(qta.read_qasm(qasm_lines),
+                             qta.read_qasm_file(qasm_file.name))
+            self.assertEqual(
+                qta.compile_qasm(qasm_lines, self.operation_dict), ref)
+            # qasm text and a parsed op list
+            self.assertEqual(
+                qta.compile_qasm('\n'.join(qasm_lines),
+                                 self.operation_dict), ref)
+            self.assertEqual(
+                qta.extract_required_operations(qasm_lines),
+                qta.extract_required_operations(qasm_file.name))
+
+    def test_debug_file_output(self):
+        qasm_lines = sq_qasm.off_on(self.qubit_name, write_file=False)
+        with tempfile.TemporaryDirectory() as tmpdir:
+            asm_filepath = join(tmpdir, 'off_on_debug.qumis')
+            instructions = qta.compile_qasm(qasm_lines, self.operation_dict,
+                                            asm_filepath=asm_filepath)
+            self.assertEqual(
+                Assembler.Assembler(asm_filepath).convert_to_instructions(),
+                instructions)
+
+    def test_invalid_command(self):
+        with self.assertRaises(ValueError):
+            qta.compile_qasm(['qubit q0', 'Xbla q0'], self.operation_dict)
+
+    def test_randomized_benchmarking_files(self):
+        # a long program, compiled in memory and via (temporary) files
+        nr_cliffords = 2**(np.arange(8)+1)
+        qasm_lines = sq_qasm.randomized_benchmarking(
+            self.qubit_name, nr_cliffords, nr_seeds=10, write_file=False)
+        instructions = qta.compile_qasm(qasm_lines, self.operation_dict,
+                                        use_cache=False)
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            qasm_filepath = join(tmpdir, 'RB_benchmark.qasm')
+            with open(qasm_filepath, 'w') as qasm_file:
+                qasm_file.writelines('\n'.join(qasm_lines))
+            asm_file = qta.write_asm_file(
+                join(tmpdir, 'RB_benchmark.qumis'),
+                qta.qasm_to_instructions(qta.read_qasm_file(qasm_filepath),
+                                         self.operation_dict))
+            ref = Assembler.Assembler(asm_file.name).convert_to_instructions(
+                use_cache=False)
+        self.assertEqual(instructions, ref)
+
+
 class Test_qasm_waveform_management(TestCase):
 
     """
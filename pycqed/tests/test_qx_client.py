@@ -0,0 +1,172 @@
+import select
+import socket
+import threading
+import unittest
+import numpy as np
+
+from pycqed.instrument_drivers.virtual_instruments.pyqx import qx_client as qx
+from pycqed.measurement import detector_functions as det
+
+
+class QX_stand_in_server(threading.Thread):
+    '''
+    Local stand-in for the QX server. Every command is acknowledged with
+    "OK". The QX server receives one command per payload, without a
+    terminating newline. The stand-in additionally accepts newline
+    separated commands for the batched mode of the client, which has not
+    been verified against the QX server. All received payloads are
+    recorded. The measurement average of qubit q after running a circuit with n gates
+    is 1 - n*p_error - q/100.
+    '''
+
+    def __init__(self):
+        super().__init__(daemon=True)
+        self.server = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        self.server.bind(('localhost', 0))
+        self.server.listen(1)
+        self.port = self.server.getsockname()[1]
+        self.nr_payloads = 0
+        self.payloads = []
+        self.nr_commands = 0
+        self.circuits = {}
+        self.average = 0
+
+    def run(self):
+        conn, addr = self.server.accept()
+        buffer = ''
+        current_circuit = None
+        while True:
+            data = conn.recv(8192)
+            if len(data) == 0:
+                break
+            self.nr_payloads += 1
+            self.payloads.append(data.decode('utf-8'))
+            buffer += data.decode('utf-8')
+            # a command without newline is complete if nothing follows
+            if not buffer.endswith('\n') and not select.select(
+                    [conn], [], [], 0.01)[0]:
+                buffer += '\n'
+            *cmds, buffer = buffer.split('\n')
+            replies = []
+            for cmd in cmds:
+                self.nr_commands += 1
+                cmd = cmd.strip()
+                elts = cmd.split()
+                reply = ''
+                if cmd.startswith('.'):
+                    current_circuit = cmd[1:]
+                    self.circuits[current_circuit] = 0
+                elif elts[0] == 'run_noisy':
+                    p_error = float(elts[3])
+                    self.average = 1 - self.circuits[elts[1]]*p_error
+                elif elts[0] == 'measurement_average':
+                    reply = '{}\n'.format(self.average - int(elts[1])/100)
+                elif elts[0] in ('qubits', 'reset',
+                                 'reset_measurement_averaging'):
+                    pass
+                elif elts[0] == 'stop':
+                    conn.sendall(b'OK')
+                    conn.close()
+                    return
+                else:
+                    # gates of the current circuit
+                    self.circuits[current_circuit] += len(
+                        [g for g in cmd.split(';') if g.strip()])
+                replies.append(reply + 'OK\n')
+            conn.sendall(''.join(replies).encode('utf-8'))
+
+
+class Test_qx_client_batched(unittest.TestCase):
+
+    def setUp(self):
+        self.server = QX_stand_in_server()
+        self.server.start()
+        self.qxc = qx.qx_client()
+        self.qxc.connect('localhost', self.server.port)
+        self.qxc.create_qubits(2)
+        self.circuits = [('circuit%i' % i, ['x q0'] * (10*i + 1))
+                         for i in range(20)]
+        # a circuit that is sent in chunks
+        self.circuits.append(('long', ['h q1'] * 250))
+
+    def tearDown(self):
+        self.qxc.disconnect()
+        self.server.join(1)
+
+    def test_single_commands(self):
+        # the default sends every command in its own payload, as expected
+        # by the QX server
+        circuits = self.circuits[:4] + self.circuits[-1:]
+        self.qxc.create_circuits(circuits)
+        self.assertEqual(self.server.circuits['long'], 250)
+        self.assertEqual(self.server.circuits['circuit3'], 31)
+        names = [c[0] for c in circuits]
+        nr_payloads = self.server.nr_payloads
+        averages = self.qxc.run_noisy_circuits(names, 0.001, iterations=100,
+                                               qubits=[0, 1])
+        payloads = self.server.payloads[nr_payloads:]
+        self.assertEqual(len(payloads), 4*len(names))
+        self.assertEqual(payloads[:4], [
+            'reset_measurement_averaging',
+            'run_noisy circuit0 depolarizing_channel 0.001000 100',
+            'measurement_average 0', 'measurement_average 1'])
+        for payload in self.server.payloads:
+            self.assertNotIn('\n', payload)
+        np.testing.assert_allclose(
+            averages[:, 0],
+            [1 - 0.001*len(gates) for name, gates in circuits])
+        np.testing.assert_allclose(averages[:, 1], averages[:, 0] - 0.01)
+
+    def test_batched_equals_single(self):
+        self.qxc.create_circuits(self.circuits, batched=True)
+        self.assertEqual(self.server.circuits['long'], 250)
+        self.assertEqual(self.server.circuits['circuit3'], 31)
+
+        names = [c[0] for c in self.circuits]
+        nr_payloads = self.server.nr_payloads
+        averages = self.qxc.run_noisy_circuits(names, 0.001, iterations=100,
+                                               qubits=[0, 1], batched=True)
+        self.assertEqual(averages.shape, (len(names), 2))
+        # all commands in one payload (the server may receive it in parts)
+        self.assertLess(self.server.nr_payloads - nr_payloads, 10)
+
+        for i, name in enumerate(names):
+            self.qxc.send_cmd('reset_measurement_averaging')
+            self.qxc.run_noisy_circuit(name, 0.001, iterations=100)
+            for q in [0, 1]:
+                self.assertAlmostEqual(self.qxc.get_measurement_average(q),
+                                       averages[i, q])
+        np.testing.assert_allclose(
+            averages[:, 0],
+            [1 - 0.001*len(gates) for name, gates in self.circuits])
+
+        with self.assertRaises(Exception):
+            self.qxc.run_noisy_circuits(['undefined'], 0.001, batched=True)
+
+    def test_connection_pool(self):
+        self.qxc.release()
+        qxc2 = qx.qx_client()
+        qxc2.connect('localhost', self.server.port, reuse_connection=True)
+        self.assertIs(qxc2.sock, self.qxc.sock)
+        qxc2.create_qubits(2)
+        qxc2.create_circuits(self.circuits[:2])
+        self.assertEqual(
+            qxc2.run_noisy_circuits(['circuit1'], 0.01)[0, 0], 1 - 0.11)
+
+    def test_QX_Detector_batch(self):
+        self.qxc.create_circuits(self.circuits[:6], batched=True)
+        d = det.QX_Detector(self.qxc)
+        single = [d.acquire_data_point() for i in range(5)]
+        d = det.QX_Detector(self.qxc)
+        nr_payloads = self.server.nr_payloads
+        batch = np.concatenate([d.acquire_data_points(np.zeros((2, 1))),
+                                d.acquire_data_points(np.zeros((3, 1)))])
+        np.testing.assert_allclose(batch, single)
+        np.testing.assert_allclose(
+            batch, [1 - (0.001+i*0.003)*(10*i+1) for i in range(5)])
+        # one command per payload (3 per point and a final reset per call)
+        self.assertEqual(self.server.nr_payloads - nr_payloads, 3*5 + 2)
+
+        d = det.QX_Detector(self.qxc, batched=True)
+        np.testing.assert_allclose(d.acquire_data_points(np.zeros(5)),
+                                   single)
@@ -146,6 +146,44 @@ class Test_SingleQubitTek(unittest.TestCase):
                             t1 = el.effective_pulse_start_time(
                                 'pulse_1-0', 'ch1')
 
+    def test_RB_templates_identical(self):
+        self.pulse_pars['mod_frequency'] = -50e6
+        self.RO_pars['amplitude'] = .5
+        nr_cliffords = [1, 3, 10, 40, 0, 0, 0, 0]
+        waveforms = []
+        for use_templates in [False, True]:
+            np.random.seed(0)
+            seq, el_list = sqs.Randomized_Benchmarking_seq(
+                self.pulse_pars, self.RO_pars, nr_cliffords=nr_cliffords,
+                nr_seeds=3, upload=False, use_templates=use_templates)
+            self.assertEqual(len(el_list), 3*len(nr_cliffords))
+            waveforms.append([(el.name, el.samples(),
+                               el.normalized_waveforms()[1])
+                              for el in el_list])
+        for (name, samples, wfs), (name_t, samples_t, wfs_t) in zip(
+                *waveforms):
+            self.assertEqual(name, name_t)
+            self.assertEqual(samples, samples_t)
+            self.assertEqual(wfs.keys(), wfs_t.keys())
+            for c in wfs:
+                np.testing.assert_array_equal(wfs[c], wfs_t[c])
+
+    def test_template_elt_with_delays(self):
+        # without readout the offset correction is not ignored
+        self.pulsar.channels['ch2']['delay'] = 3.3e-9
+        pulses = sqs.get_pulse_dict_from_pars(self.pulse_pars)
+        templates = sqs.pulse_templates(pulses)
+        keys = ['X180', 'Y90', 'mX90', 'I', 'X180', 'mY180']
+        el = sqs.multi_pulse_elt(0, sqs.station, [pulses[k] for k in keys])
+        el_t = sqs.multi_pulse_elt(0, sqs.station, keys, templates=templates)
+        self.assertIsInstance(el_t, element.TemplateElement)
+        self.assertEqual(el.offset(), el_t.offset())
+        self.assertEqual(sorted(el.pulses), sorted(el_t.pulses))
+        wfs = el.normalized_waveforms()[1]
+        wfs_t = el_t.normalized_waveforms()[1]
+        for c in wfs:
+            np.testing.assert_array_equal(wfs[c], wfs_t[c])
+
 
 class Bunch:
 
@@ -0,0 +1,118 @@
+import unittest
+import numpy as np
+import qutip as qtp
+from scipy.optimize import approx_fprime
+
+from pycqed.analysis import tomography as tomo
+
+
+def simulate_tomo_data(rho, betas_per_quadrature, noise=0.01, seed=0):
+    '''
+    Simulates calibration points and tomography measurements of a joint
+    readout with measurement operators sum_b betas[b] * P_b.
+    '''
+    rng = np.random.RandomState(seed)
+    n_qubits = len(rho.dims[0])
+    TA = tomo.TomoAnalysis_JointRO
+    readouts = [ro.full() for ro in
+                tomo._calculate_matrix_set(TA.readout_basis, n_qubits)]
+    rotations = [rot.full() for rot in
+                 tomo._calculate_matrix_set(TA.rotation_matrixes, n_qubits)]
+    rho = rho.full()
+    measurements_cal = []
+    measurements_tomo = []
+    for betas in betas_per_quadrature:
+        M = sum(b * ro for b, ro in zip(betas, readouts))
+        measurements_cal.extend(np.diag(M).real)
+        for R in rotations:
+            measurements_tomo.append(
+                np.trace(np.dot(np.dot(np.conj(R.T), np.dot(M, R)), rho)).real
+                + noise * rng.randn())
+    return np.array(measurements_cal), np.array(measurements_tomo)
+
+
+class Test_TomoAnalysis_JointRO(unittest.TestCase):
+
+    @classmethod
+    def setUpClass(self):
+        bell = np.array([1, 0, 0, 1j]) / np.sqrt(2)
+        self.rho = qtp.Qobj(0.9 * np.outer(bell, bell.conj()) +
+                            0.1 * np.eye(4) / 4, dims=[[2, 2], [2, 2]])
+        betas = [[0.1, 0.5, 0.3, 0.05],
+                 [0.2, 0.1, 0.6, 0.02],
+                 [0.3, 0.2, 0.1, 0.4]]
+        measurements_cal, measurements_tomo = simulate_tomo_data(
+            self.rho, betas)
+        self.tomo = tomo.TomoAnalysis_JointRO(
+            measurements_cal, measurements_tomo, n_qubits=2, n_quadratures=3)
+
+    def test_likelihood(self):
+        self.tomo._calculate_measurement_operators()
+        t_params = np.random.RandomState(1).randn(16)
+        rho = qtp.Qobj(self.tomo.build_rho_from_triangular_params(t_params),
+                       dims=[[2, 2], [2, 2]])
+        expected = 0
+        rotations = self.tomo.rotation_vector
+        n_rot = len(rotations)
+        for q in range(3):
+            betas = self.tomo._calibrate_betas(
+                self.tomo.measurements_cal[4*q:4*(q+1)])
+            for r, R in enumerate(rotations):
+                M = sum(b * R.dag() * ro * R for b, ro in
+                        zip(betas, self.tomo.readout_vector))
+                expected += self.tomo.weights[q*n_rot + r] * (
+                    (M * rho).tr().real -
+                    self.tomo.measurements_tomo[q*n_rot + r])**2
+        self.assertAlmostEqual(
+            self.tomo._max_likelihood_optimization_function(t_params),
+            expected)
+
+    def test_likelihood_gradient(self):
+        self.tomo._calculate_measurement_operators()
+        t_params = np.random.RandomState(2).randn(16)
+        loss, grad = \
+            self.tomo._max_likelihood_optimization_function_and_gradient(
+                t_params)
+        self.assertAlmostEqual(
+            loss, self.tomo._max_likelihood_optimization_function(t_params))
+        num_grad = approx_fprime(
+            t_params, self.tomo._max_likelihood_optimization_function, 1e-7)
+        np.testing.assert_allclose(grad, num_grad, atol=1e-4*np.max(grad))
+
+    def test_solvers_agree(self):
+        rho_powell = self.tomo.execute_max_likelihood(ftol=1e-6, xtol=1e-4)
+        rho_lbfgs = self.tomo.execute_max_likelihood(solver='lbfgs')
+        np.testing.assert_allclose(rho_lbfgs.full(), rho_powell.full(),
+                                   atol=1e-3)
+        self.assertGreater(qtp.fidelity(rho_lbfgs, self.rho), 0.99)
+        with self.assertRaises(ValueError):
+            self.tomo.execute_max_likelihood(solver='newton')
+
+    def test_coefficient_indices(self):
+        rotation_matrixes = [
+            qtp.identity(2), qtp.sigmax(),
+            qtp.rotation(qtp.sigmay(), np.pi / 2),
+            qtp.rotation(qtp.sigmay(), -np.pi / 2),
+            qtp.rotation(qtp.sigmax(), np.pi / 2),
+            qtp.rotation(qtp.sigmax(), -np.pi / 2)]
+        TA = tomo.TomoAnalysis_JointRO
+        for n_qubits in [2, 3]:
+            places, signs = tomo.get_coefficient_indices(
+                n_qubits, rotation_matrixes, TA.readout_basis,
+                TA.measurement_basis)
+            t = tomo.TomoAnalysis_JointRO(
+                np.zeros(2**n_qubits), np.zeros(6**n_qubits),
+                n_qubits=n_qubits)
+            t.rotation_matrixes = rotation_matrixes
+            for r in range(6**n_qubits):
+                for b in range(2**n_qubits):
+                    self.assertEqual(
+                        t._get_basis_index_from_rotation(b, r),
+                        (places[r, b], signs[r, b]))
+
+    def test_non_clifford_rotation(self):
+        with self.assertRaises(Exception):
+            tomo.single_qubit_coefficient_indices(
+                [qtp.rotation(qtp.sigmax(), np.pi / 4)],
+                tomo.TomoAnalysis_JointRO.readout_basis,
+                tomo.TomoAnalysis_JointRO.measurement_basis)
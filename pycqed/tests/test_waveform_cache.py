@@ -0,0 +1,142 @@
+import numpy as np
+import unittest
+
+from pycqed.measurement.waveform_control.pulsar import Pulsar
+from pycqed.measurement.waveform_control import element
+from pycqed.measurement.waveform_control import waveform_cache as wfc
+from pycqed.measurement.waveform_control.pulse import SquarePulse
+from pycqed.measurement.waveform_control.pulse_library import SSB_DRAG_pulse
+
+
+class Test_WaveformCache(unittest.TestCase):
+
+    def test_lru_eviction(self):
+        cache = wfc.WaveformCache(max_bytes=3*800)
+        for i in range(3):
+            cache.put(i, np.zeros(100))
+        self.assertIsNotNone(cache.get(0))
+        cache.put(3, np.zeros(100))
+        # 1 is the least recently used entry
+        self.assertNotIn(1, cache)
+        self.assertIn(0, cache)
+        self.assertIsNone(cache.get(1))
+        stats = cache.stats()
+        self.assertEqual(stats['hits'], 1)
+        self.assertEqual(stats['misses'], 1)
+        self.assertEqual(stats['evictions'], 1)
+        self.assertEqual(stats['entries'], 3)
+        self.assertEqual(stats['nbytes'], 3*800)
+
+    def test_get_or_compute(self):
+        cache = wfc.WaveformCache()
+        calls = []
+
+        def compute():
+            calls.append(1)
+            return np.ones(10)
+        cache.get_or_compute('a', compute)
+        cache.get_or_compute('a', compute)
+        self.assertEqual(len(calls), 1)
+        cache.get_or_compute(None, compute)
+        self.assertEqual(len(calls), 2)
+
+    def test_pulse_key(self):
+        p0 = SquarePulse(name='a', channel='ch1', amplitude=.3, length=20e-9)
+        p1 = SquarePulse(name='b', channel='ch1', amplitude=.3, length=20e-9)
+        self.assertEqual(wfc.pulse_key(p0), wfc.pulse_key(p1))
+        p1.amplitude = .4
+        self.assertNotEqual(wfc.pulse_key(p0), wfc.pulse_key(p1))
+        p1.amplitude = np.float64(.3)
+        self.assertEqual(wfc.pulse_key(p0), wfc.pulse_key(p1))
+        p1.kernel = np.eye(3)
+        p0.kernel = np.eye(3)
+        self.assertEqual(wfc.pulse_key(p0), wfc.pulse_key(p1))
+        p0.kernel[0, 1] = 1
+        self.assertNotEqual(wfc.pulse_key(p0), wfc.pulse_key(p1))
+        # pulses with attributes of unknown content are not cached
+        p0.func = lambda t: t
+        self.assertIsNone(wfc.pulse_key(p0))
+
+
+class Test_Element_waveform_cache(unittest.TestCase):
+
+    def setUp(self):
+        self.pulsar = Pulsar()
+        for i in range(2):
+            self.pulsar.define_channel(id='ch{}'.format(i+1),
+                                       name='ch{}'.format(i+1),
+                                       type='analog',
+                                       high=.7, low=-.7,
+                                       offset=0.0, delay=0, active=True)
+            self.pulsar.define_channel(id='ch{}_marker1'.format(i+1),
+                                       name='ch{}_marker1'.format(i+1),
+                                       type='marker',
+                                       high=2.0, low=0, offset=0.,
+                                       delay=0, active=True)
+        self._old_cache = wfc.default_cache
+        wfc.default_cache = wfc.WaveformCache()
+
+    def tearDown(self):
+        wfc.default_cache = self._old_cache
+
+    def make_element(self, amplitude=.3, **kw):
+        elt = element.Element('test_elt', pulsar=self.pulsar, **kw)
+        drag = SSB_DRAG_pulse(name='drag', I_channel='ch1', Q_channel='ch2',
+                              amplitude=amplitude, sigma=10e-9, motzoi=.1,
+                              mod_frequency=-50e6)
+        elt.add(drag, start=10e-9)
+        elt.add(drag, refpulse='drag-0')
+        elt.add(SquarePulse(name='marker', channel='ch1_marker1',
+                            amplitude=1, length=100e-9))
+        return elt
+
+    def test_cached_waveforms_equal_computed(self):
+        tvals, wfs = self.make_element(use_waveform_cache=False).waveforms()
+        for i in range(2):
+            c_tvals, c_wfs = self.make_element().waveforms()
+            np.testing.assert_array_equal(tvals, c_tvals)
+            self.assertEqual(set(wfs.keys()), set(c_wfs.keys()))
+            for c in wfs:
+                np.testing.assert_array_equal(wfs[c], c_wfs[c])
+
+    def test_cache_hits(self):
+        self.make_element().normalized_waveforms()
+        stats = wfc.default_cache.stats()
+        self.assertEqual(stats['hits'], 0)
+        self.make_element().normalized_waveforms()
+        self.assertEqual(wfc.default_cache.stats()['hits'], 1)
+
+        # only the changed pulses have to be recomputed
+        wfc.default_cache.reset_stats()
+        tvals, wfs = self.make_element(amplitude=.2).ideal_waveforms()
+        stats = wfc.default_cache.stats()
+        # the element and both drag pulses are recomputed, the marker pulse
+        # is taken from the cache
+        self.assertEqual(stats['misses'], 3)
+        self.assertEqual(stats['hits'], 1)
+        tvals, ref_wfs = self.make_element(
+            amplitude=.2, use_waveform_cache=False).ideal_waveforms()
+        np.testing.assert_array_equal(wfs['ch1'], ref_wfs['ch1'])
+
+    def test_cached_waveforms_are_copies(self):
+        elt = self.make_element()
+        tvals, wfs = elt.ideal_waveforms()
+        wfs['ch1'][:] = 5
+        tvals, wfs = elt.ideal_waveforms()
+        self.assertLess(np.max(wfs['ch1']), 1)
+
+    def test_channel_delay_change(self):
+        def make_square_elt():
+            elt = element.Element('test_elt', pulsar=self.pulsar,
+                                  global_time=False)
+            for ch in ['ch1', 'ch2']:
+                elt.add(SquarePulse(name='sq_'+ch, channel=ch,
+                                    amplitude=.3, length=20e-9),
+                        start=100e-9)
+            return elt
+        make_square_elt().ideal_waveforms()
+        self.pulsar.channels['ch1']['delay'] = 10e-9
+        tvals, wfs = make_square_elt().ideal_waveforms()
+        tvals, ref_wfs = make_square_elt()._ideal_waveforms()
+        for c in ['ch1', 'ch2']:
+            np.testing.assert_array_equal(wfs[c], ref_wfs[c])
@@ -0,0 +1,114 @@
+import threading
+import time
+import unittest
+import numpy as np
+
+from pycqed.instrument_drivers.physical_instruments.ZurichInstruments import \
+    zi_acquisition as zi_acq
+
+
+class DataServer_stand_in:
+    '''
+    Local stand-in for the ziDAQServer of a UHFQC. Once the AWG is enabled
+    and triggered it runs for run_time s, after which the result vectors
+    contain the channel number (plus 10 for the input averager) and the
+    enable node is cleared.
+    '''
+
+    def __init__(self, device, run_time=0.05):
+        self.device = device
+        self.run_time = run_time
+        self.nodes = {}
+        self.subscribed = set()
+        self.events = {}
+        self.nr_gets = 0
+        self.lock = threading.Lock()
+        self.enable_path = '/{}/awgs/0/enable'.format(device)
+
+    def trigger(self):
+        if self.nodes.get(self.enable_path) == 1 and self.run_time is not None:
+            threading.Timer(self.run_time, self._finish).start()
+
+    def _finish(self):
+        for c in range(4):
+            self.nodes['/{}/quex/rl/data/{}'.format(self.device, c)] = \
+                np.ones(8)*c
+            self.nodes['/{}/quex/iavg/data/{}'.format(self.device, c)] = \
+                np.ones(8)*(c+10)
+        self.setInt(self.enable_path, 0)
+
+    def subscribe(self, path):
+        self.subscribed.add(path)
+
+    def unsubscribe(self, path):
+        self.subscribed.discard(path)
+
+    def sync(self):
+        with self.lock:
+            self.events = {}
+
+    def setInt(self, path, value):
+        self.nodes[path] = value
+        if path in self.subscribed:
+            with self.lock:
+                self.events.setdefault(path, []).append(value)
+
+    def getInt(self, path):
+        return self.nodes[path]
+
+    def poll(self, recording_time, timeout, flags, flat):
+        time.sleep(recording_time)
+        with self.lock:
+            events, self.events = self.events, {}
+        # the data server returns lower case paths
+        return {p.lower(): {'value': np.array(v)} for p, v in events.items()}
+
+    def get(self, paths, flat, flags):
+        self.nr_gets += 1
+        return {p.lower(): [{'vector': self.nodes[p]}]
+                for p in paths.split(',') if p in self.nodes}
+
+
+class Test_UHFQC_acquisition(unittest.TestCase):
+
+    def setUp(self):
+        self.daq = DataServer_stand_in('DEV2178')
+
+    def test_acquire(self):
+        data, timings = zi_acq.acquire(self.daq, 'DEV2178', [0, 2],
+                                       start=self.daq.trigger, timeout=1)
+        self.assertEqual(len(data), 2)
+        np.testing.assert_array_equal(data[0], np.zeros(8))
+        np.testing.assert_array_equal(data[1], 2*np.ones(8))
+        # all channels are fetched at once
+        self.assertEqual(self.daq.nr_gets, 1)
+        self.assertEqual(set(timings.keys()),
+                         {'arm', 'start', 'wait', 'fetch'})
+        self.assertGreaterEqual(timings['wait'], 0.04)
+        self.assertEqual(self.daq.subscribed, set())
+
+        data, timings = zi_acq.acquire(self.daq, 'DEV2178', [1, 3],
+                                       mode='iavg', start=self.daq.trigger)
+        np.testing.assert_array_equal(data[0], 11*np.ones(8))
+        np.testing.assert_array_equal(data[1], 13*np.ones(8))
+
+    def test_stale_events(self):
+        # a completion from an earlier run does not end the acquisition
+        self.daq.subscribe(self.daq.enable_path)
+        self.daq.setInt(self.daq.enable_path, 0)
+        self.daq.run_time = 0.1
+        data, timings = zi_acq.acquire(self.daq, 'DEV2178', [0],
+                                       start=self.daq.trigger)
+        self.assertGreaterEqual(timings['wait'], 0.09)
+
+    def test_timeout(self):
+        self.daq.run_time = None
+        with self.assertRaises(Exception):
+            zi_acq.acquire(self.daq, 'DEV2178', [0], start=self.daq.trigger,
+                           timeout=0.1)
+        self.assertEqual(self.daq.subscribed, set())
+        # results that are not available
+        self.daq.run_time = 0
+        with self.assertRaises(Exception):
+            zi_acq.acquire(self.daq, 'DEV2178', [5], start=self.daq.trigger,
+                           timeout=0.1)
@@ -0,0 +1,310 @@
+'''
+Persistent index of the measurement folders in a data directory.
+
+The data directory has the layout created by hdf5_data.DateTimeGenerator:
+    datadir/YYYYmmdd/HHMMSS_label/HHMMSS_label.hdf5
+
+Looking up data by timestamp or label by listing these folders becomes slow
+for data directories containing years of measurements. The DataCatalog keeps
+an SQLite table of all measurement folders (timestamp, label, day folder and
+folder path) that is queried instead.
+
+The index is kept up to date by
+    - hdf5_data.Data, which adds every new measurement on creation
+    - refresh, which only scans day folders that are not indexed yet or
+      whose modification time changed since they were indexed (a day
+      folder is modified when measurement folders are added, renamed or
+      removed). The newest day folder is always rescanned: on file systems
+      with coarse time stamps (e.g. network shares) a measurement added
+      right after the day was indexed does not change its modification
+      time.
+    - rebuild, which rescans the full data directory (e.g. after data has
+      been deleted or moved)
+
+The catalog can also be refreshed from the command line:
+    python -m pycqed.utilities.data_catalog <datadir> [--rebuild]
+'''
+import os
+import hashlib
+import logging
+import sqlite3
+import threading
+
+_catalogs = {}
+_catalogs_lock = threading.Lock()
+
+
+def default_catalog_path(datadir):
+    '''
+    Returns the location of the catalog file for a data directory.
+    Catalogs are stored locally in the home directory of the user such that
+    no files are added to the data directory itself.
+    '''
+    key = hashlib.md5(
+        os.path.abspath(datadir).encode('utf-8')).hexdigest()
+    return os.path.join(os.path.expanduser('~'), '.pycqed', 'catalogs',
+                        '{}.sqlite'.format(key))
+
+
+def get_catalog(datadir, catalog_path=None):
+    '''
+    Returns the DataCatalog for a data directory. Catalogs are reused within
+    a python session.
+    '''
+    datadir = os.path.abspath(datadir)
+    with _catalogs_lock:
+        if datadir not in _catalogs:
+            _catalogs[datadir] = DataCatalog(datadir, catalog_path)
+        return _catalogs[datadir]
+
+
+def _is_day_folder(name):
+    return len(name) == 8 and name.isdigit()
+
+
+def _is_measurement_folder(name):
+    return len(name) >= 6 and name[:6].isdigit()
+
+
+class DataCatalog:
+
+    '''
+    SQLite index of the measurement folders in a data directory.
+
+    Timestamps are stored as "YYYYmmddHHMMSS" strings such that they can be
+    compared and sorted as strings.
+    '''
+
+    def __init__(self, datadir, catalog_path=None):
+        self.datadir = os.path.abspath(datadir)
+        if catalog_path is None:
+            catalog_path = default_catalog_path(self.datadir)
+        self.catalog_path = catalog_path
+        catalog_dir = os.path.dirname(catalog_path)
+        if catalog_dir and not os.path.isdir(catalog_dir):
+            os.makedirs(catalog_dir, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(catalog_path, timeout=30,
+                                     check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS measurements ('
+                'day TEXT NOT NULL, '
+                'dirname TEXT NOT NULL, '
+                'timestamp TEXT NOT NULL, '
+                'label TEXT NOT NULL, '
+                'folder TEXT NOT NULL, '
+                'PRIMARY KEY (day, dirname))')
+            self._conn.execute(
+                'CREATE INDEX IF NOT EXISTS measurements_timestamp '
+                'ON measurements (timestamp)')
+            self._conn.execute(
+                'CREATE TABLE IF NOT EXISTS days ('
+                'day TEXT PRIMARY KEY, '
+                'mtime REAL)')
+
+    def close(self):
+        self._conn.close()
+
+    ###########################
+    # Updating the catalog    #
+    ###########################
+
+    def add_measurement(self, folder):
+        '''
+        Adds a single measurement folder to the catalog.
+        '''
+        folder = os.path.abspath(folder)
+        day_folder, dirname = os.path.split(folder)
+        day = os.path.basename(day_folder)
+        if not (_is_day_folder(day) and _is_measurement_folder(dirname)):
+            raise ValueError(
+                'Folder "{}" does not follow the datadir naming '
+                'convention'.format(folder))
+        with self._lock, self._conn:
+            self._conn.execute(
+                'INSERT OR REPLACE INTO measurements VALUES (?, ?, ?, ?, ?)',
+                self._row(day, dirname))
+
+    def index_day(self, day):
+        '''
+        (Re)indexes all measurement folders of a single day.
+        Returns the number of measurements found.
+        '''
+        day_folder = os.path.join(self.datadir, day)
+        try:
+            mtime = os.stat(day_folder).st_mtime
+            rows = [self._row(day, entry.name)
+                    for entry in os.scandir(day_folder)
+                    if entry.is_dir() and _is_measurement_folder(entry.name)]
+        except FileNotFoundError:
+            mtime, rows = None, []
+        with self._lock, self._conn:
+            self._conn.execute('DELETE FROM measurements WHERE day = ?',
+                               (day, ))
+            self._conn.executemany(
+                'INSERT INTO measurements VALUES (?, ?, ?, ?, ?)', rows)
+            if mtime is None:
+                self._conn.execute('DELETE FROM days WHERE day = ?', (day, ))
+            else:
+                self._conn.execute(
+                    'INSERT OR REPLACE INTO days VALUES (?, ?)',
+                    (day, mtime))
+        return len(rows)
+
+    def refresh(self):
+        '''
+        Indexes day folders that are not in the catalog yet and rescans
+        the indexed days whose folder was modified or removed since they
+        were indexed. The newest day folder, in which new measurements are
+        created, is always rescanned.
+        '''
+        try:
+            days_on_disk = sorted(d for d in os.listdir(self.datadir)
+                                  if _is_day_folder(d))
+        except FileNotFoundError:
+            days_on_disk = []
+        with self._lock:
+            indexed = dict(self._conn.execute('SELECT day, mtime FROM days'))
+        to_index = []
+        for day in days_on_disk:
+            try:
+                mtime = os.stat(os.path.join(self.datadir, day)).st_mtime
+            except FileNotFoundError:
+                mtime = None
+            if (mtime is None or indexed.get(day) != mtime or
+                    day == days_on_disk[-1]):
+                to_index.append(day)
+        # days that were removed from the data directory
+        to_index += sorted(set(indexed) - set(days_on_disk))
+        for day in to_index:
+            self.index_day(day)
+
+    def rebuild(self):
+        '''
+        Clears the catalog and indexes the full data directory.
+        '''
+        with self._lock, self._conn:
+            self._conn.execute('DELETE FROM measurements')
+            self._conn.execute('DELETE FROM days')
+        self.refresh()
+
+    def _row(self, day, dirname):
+        return (day, dirname, day + dirname[:6], dirname[7:],
+                os.path.join(day, dirname))
+
+    ###########################
+    # Queries                 #
+    ###########################
+
+    def _query(self, contains='', older_than=None, newer_than=None,
+               or_equal=False, day=None, tstamp=None, order='DESC',
+               limit=None, columns='day, dirname, timestamp'):
+        conditions = []
+        args = []
+        if isinstance(contains, str):
+            contains = [contains]
+        for c in contains:
+            if c:
+                conditions.append('instr(dirname, ?) > 0')
+                args.append(c)
+        if older_than is not None:
+            conditions.append('timestamp {} ?'.format(
+                '<=' if or_equal else '<'))
+            args.append(older_than)
+        if newer_than is not None:
+            conditions.append('timestamp {} ?'.format(
+                '>=' if or_equal else '>'))
+            args.append(newer_than)
+        if day is not None:
+            conditions.append('day = ?')
+            args.append(day)
+        if tstamp is not None:
+            conditions.append('substr(dirname, 1, 6) = ?')
+            args.append(tstamp)
+        query = 'SELECT {} FROM measurements'.format(columns)
+        if conditions:
+            query += ' WHERE ' + ' AND '.join(conditions)
+        query += ' ORDER BY timestamp {0}, dirname {0}'.format(order)
+        if limit is not None:
+            query += ' LIMIT {:d}'.format(limit)
+        with self._lock:
+            return self._conn.execute(query, args).fetchall()
+
+    def latest(self, contains='', older_than=None, newer_than=None,
+               or_equal=False):
+        '''
+        Returns (day, dirname) of the latest measurement with contains in
+        its name or None if there is no such measurement.
+        Timestamps are strings of the form "YYYYmmddHHMMSS".
+        '''
+        rows = self._query(contains, older_than, newer_than, or_equal,
+                           limit=1)
+        if len(rows) == 0:
+            return None
+        return rows[0][:2]
+
+    def find(self, day, tstamp):
+        '''
+        Returns the measurement folder names of a day with time
+        stamp tstamp ("HHMMSS").
+        '''
+        return [r[1] for r in self._query(day=day, tstamp=tstamp,
+                                          order='ASC')]
+
+    def day_measurements(self, day, contains='', older_than=None,
+                         newer_than=None, or_equal=False):
+        '''
+        Returns the sorted measurement folder names of a day matching the
+        filters.
+        '''
+        return [r[1] for r in self._query(contains, older_than, newer_than,
+                                          or_equal, day=day, order='ASC')]
+
+    def timestamps(self, contains='', older_than=None, newer_than=None,
+                   or_equal=False, n=None, order='ASC'):
+        '''
+        Returns the distinct timestamps ("YYYYmmddHHMMSS") of measurements
+        matching the filters. contains can be a string or a list of strings
+        that must all be in the name.
+        '''
+        rows = self._query(contains, older_than, newer_than, or_equal,
+                           order=order, limit=n,
+                           columns='DISTINCT timestamp')
+        return [r[0] for r in rows]
+
+    def is_day_indexed(self, day):
+        with self._lock:
+            return self._conn.execute(
+                'SELECT 1 FROM days WHERE day = ?', (day, )).fetchone() \
+                is not None
+
+
+def register_measurement(datadir, folder):
+    '''
+    Adds a newly created measurement folder to the catalog of datadir.
+    Errors are logged and not raised such that a broken catalog can never
+    prevent a measurement from being saved.
+    '''
+    try:
+        get_catalog(datadir).add_measurement(folder)
+    except Exception as e:
+        logging.warning('Could not add "{}" to the data catalog: {}'.format(
+            folder, e))
+
+
+if __name__ == '__main__':
+    import argparse
+    parser = argparse.ArgumentParser(
+        description='Refresh the catalog of a PycQED data directory.')
+    parser.add_argument('datadir')
+    parser.add_argument('--rebuild', action='store_true',
+                        help='rescan the full data directory')
+    args = parser.parse_args()
+    catalog = get_catalog(args.datadir)
+    if args.rebuild:
+        catalog.rebuild()
+    else:
+        catalog.refresh()
+    print('Catalog "{}" contains {} measurements'.format(
+        catalog.catalog_path, len(catalog.timestamps())))